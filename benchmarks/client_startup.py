@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""Compare the time taken to load the local WSDL with and without the
+on-disk WSDL cache.
+
+Each measurement runs in a fresh interpreter so that nothing is shared
+between runs, just like a cron job starting up.
+
+Example usage:
+python ./benchmarks/client_startup.py --runs 5
+
+If --server, --username and --password are given the complete Client()
+construction (including login) is timed instead of just the WSDL load.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import shutil
+import subprocess
+import sys
+import tempfile
+from optparse import OptionParser
+
+CHILD = """
+import time
+start = time.time()
+import suds.client
+from psphere.wsdlcache import WSDL_DIR, WsdlCache
+cache_dir, server = %(cache_dir)r, %(server)r
+kwargs = {}
+if cache_dir is not None:
+    kwargs = {"cache": WsdlCache(cache_dir), "cachingpolicy": 1}
+if server is None:
+    suds.client.Client("file://%%s/vimService.wsdl" %% WSDL_DIR, **kwargs)
+else:
+    from psphere.client import Client
+    Client(server=server, username=%(username)r, password=%(password)r,
+           wsdl_cache_dir=cache_dir)
+print(time.time() - start)
+"""
+
+
+def run(options, cache_dir):
+    code = CHILD % {"cache_dir": cache_dir, "server": options.server,
+                    "username": options.username,
+                    "password": options.password}
+    output = subprocess.check_output([sys.executable, "-c", code])
+    return float(output.decode("ascii").strip().splitlines()[-1])
+
+
+def main(options):
+    cache_dir = tempfile.mkdtemp(prefix="psphere-wsdl-cache-")
+    try:
+        uncached = [run(options, None) for _ in range(options.runs)]
+        cold = run(options, cache_dir)
+        warm = [run(options, cache_dir) for _ in range(options.runs)]
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print("No cache:            %.3fs (best of %s)" % (min(uncached),
+                                                     options.runs))
+    print("Cold cache (writes): %.3fs" % cold)
+    print("Warm cache:          %.3fs (best of %s)" % (min(warm), options.runs))
+    print("Speed up:            %.1fx" % (min(uncached) / min(warm)))
+
+
+if __name__ == "__main__":
+    parser = OptionParser(usage="Usage: %prog [options]")
+    parser.add_option("--runs", dest="runs", type="int", default=3,
+                      help="The number of runs for each measurement")
+    parser.add_option("--server", dest="server",
+                      help="The server to connect to")
+    parser.add_option("--username", dest="username",
+                      help="The username used to connect to the server")
+    parser.add_option("--password", dest="password",
+                      help="The password used to connect to the server")
+    (options, args) = parser.parse_args()
+    main(options)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""Compare the time taken to write the request of an inventory search by
+suds and by psphere.envelope.EnvelopeBuilder.
+
+No server is required, the requests are built but not sent.
+
+Example usage:
+python ./benchmarks/envelope.py --calls 1000
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import time
+from optparse import OptionParser
+
+from psphere.client import Client, ExtraConfigPlugin
+from psphere.envelope import EnvelopeBuilder
+from psphere.soap import ManagedObjectReference
+from psphere.wsdlcache import WSDL_DIR, get_shared_wsdl
+
+
+def main(options):
+    client = Client.__new__(Client)
+    shared = get_shared_wsdl("file://%s/vimService.wsdl" % WSDL_DIR)
+    shared.bind(client, plugins=[ExtraConfigPlugin()], nosend=True)
+    client._envelopes = EnvelopeBuilder()
+    client._search_select_sets = {}
+
+    collector = ManagedObjectReference("PropertyCollector",
+                                       "propertyCollector")
+    root = ManagedObjectReference("Folder", "group-d1")
+    property_spec = client.create("PropertySpec", type="VirtualMachine",
+                                  all=False, pathSet=["name", "runtime"])
+
+    def suds_envelope():
+        pfs = client.get_search_filter_spec(root, property_spec)
+        return client.service.RetrieveProperties(_this=collector,
+                                                 specSet=pfs).envelope
+
+    def direct_envelope():
+        pfs = client.get_search_filter_spec(root, property_spec)
+        return client._envelopes.build("RetrieveProperties", collector,
+                                       specSet=pfs)
+
+    for name, func in [("suds", suds_envelope),
+                       ("EnvelopeBuilder", direct_envelope)]:
+        start = time.time()
+        for i in range(options.calls):
+            envelope = func()
+        elapsed = time.time() - start
+        print("%-20s %8.3fms per call, %s bytes" % (
+            name, elapsed * 1000 / options.calls, len(envelope)))
+
+
+if __name__ == "__main__":
+    parser = OptionParser(usage="Usage: %prog [options]")
+    parser.add_option("--calls", dest="calls", type="int", default=1000,
+                      help="The number of requests to build")
+    (options, args) = parser.parse_args()
+    main(options)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""Measure the requests Client.get_views sends for a large number of
+managed objects.
+
+Without a server the size of the request for --mors VMs is compared
+between one PropertySpec per MOR, as get_views used to send, and one per
+type. With a server the time taken to load the name and runtime of up to
+--mors VMs is also measured for different batch sizes and concurrency.
+
+Example usage:
+python ./benchmarks/get_views.py --mors 10000
+python ./benchmarks/get_views.py --server <server> --username <user> --password <pass>
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import time
+from optparse import OptionParser
+
+from psphere.client import Client
+from psphere.envelope import EnvelopeBuilder
+from psphere.managedobjects import VirtualMachine
+from psphere.soap import ManagedObjectReference
+from psphere.wsdlcache import WSDL_DIR, get_shared_wsdl
+
+PROPERTIES = ["name", "runtime"]
+
+
+def request_size(client, mo_refs, per_type):
+    property_specs = []
+    for mo_ref in mo_refs[:1] if per_type else mo_refs:
+        property_specs.append(client.create(
+            "PropertySpec", type="VirtualMachine", all=False,
+            pathSet=PROPERTIES))
+    object_specs = [client.create("ObjectSpec", obj=mo_ref)
+                    for mo_ref in mo_refs]
+    pfs = client.create("PropertyFilterSpec", propSet=property_specs,
+                        objectSet=object_specs)
+    collector = ManagedObjectReference("PropertyCollector",
+                                       "propertyCollector")
+    return len(EnvelopeBuilder().build("RetrieveProperties", collector,
+                                       specSet=pfs))
+
+
+def offline(options):
+    client = Client.__new__(Client)
+    shared = get_shared_wsdl("file://%s/vimService.wsdl" % WSDL_DIR)
+    shared.bind(client)
+    mo_refs = [ManagedObjectReference("VirtualMachine", "vm-%s" % i)
+               for i in range(options.mors)]
+    for name, per_type in [("PropertySpec per MOR", False),
+                           ("PropertySpec per type", True)]:
+        print("%-25s %10d bytes for %s MORs" % (
+            name, request_size(client, mo_refs, per_type), len(mo_refs)))
+
+
+def online(options):
+    client = Client(server=options.server, username=options.username,
+                    password=options.password)
+    mo_refs = [vm._mo_ref for vm in
+               VirtualMachine.all(client, properties=[])[:options.mors]]
+    for batch_size, concurrency in [(len(mo_refs), 1), (1000, 1), (1000, 4)]:
+        client.cache.clear()
+        start = time.time()
+        client.get_views(mo_refs, PROPERTIES, batch_size=batch_size,
+                         concurrency=concurrency)
+        print("batch_size=%-6s concurrency=%s %8.3fs for %s MORs" % (
+            batch_size, concurrency, time.time() - start, len(mo_refs)))
+    client.logout()
+
+
+if __name__ == "__main__":
+    parser = OptionParser(usage="Usage: %prog [options]")
+    parser.add_option("--mors", dest="mors", type="int", default=10000,
+                      help="The number of MORs to load")
+    parser.add_option("--server", dest="server",
+                      help="The server to connect to")
+    parser.add_option("--username", dest="username",
+                      help="The username used to connect to the server")
+    parser.add_option("--password", dest="password",
+                      help="The password used to connect to the server")
+    (options, args) = parser.parse_args()
+    if options.server:
+        online(options)
+    else:
+        offline(options)
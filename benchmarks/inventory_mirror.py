@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""Compare the steady state cost of keeping an up to date copy of the VM
+inventory by polling with VirtualMachine.all against an InventoryMirror.
+
+Example usage:
+python ./benchmarks/inventory_mirror.py --server <server> --username <user> --password <pass> --polls 10 --interval 5
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import time
+from optparse import OptionParser
+
+from psphere.client import Client
+from psphere.managedobjects import VirtualMachine
+from psphere.mirror import InventoryMirror
+
+PROPERTIES = ["name", "runtime"]
+
+
+def received(client):
+    return sum(stats["bytes_received"]
+               for stats in client.transport.pool_statistics().values())
+
+
+def measure(client, name, polls, interval, func):
+    elapsed = 0
+    start_bytes = received(client)
+    for i in range(polls):
+        start = time.time()
+        func()
+        elapsed += time.time() - start
+        time.sleep(interval)
+    print("%-30s %8.3fs/poll %10d bytes/poll" % (
+        name, elapsed / polls, (received(client) - start_bytes) / polls))
+
+
+def main(options):
+    client = Client(server=options.server, username=options.username,
+                    password=options.password)
+
+    measure(client, "VirtualMachine.all", options.polls, options.interval,
+            lambda: VirtualMachine.all(client, properties=list(PROPERTIES)))
+
+    mirror = InventoryMirror(client, {"VirtualMachine": PROPERTIES})
+    start = time.time()
+    mirror.start()
+    print("%-30s %8.3fs for %s objects" % ("InventoryMirror.start",
+                                           time.time() - start, len(mirror)))
+    measure(client, "InventoryMirror.update", options.polls, options.interval,
+            mirror.update)
+    mirror.stop()
+    client.logout()
+
+
+if __name__ == "__main__":
+    parser = OptionParser(usage="Usage: %prog [options]")
+    parser.add_option("--server", dest="server",
+                      help="The server to connect to")
+    parser.add_option("--username", dest="username",
+                      help="The username used to connect to the server")
+    parser.add_option("--password", dest="password",
+                      help="The password used to connect to the server")
+    parser.add_option("--polls", dest="polls", type="int", default=10,
+                      help="The number of times to poll")
+    parser.add_option("--interval", dest="interval", type="int", default=5,
+                      help="The number of seconds between polls")
+    (options, args) = parser.parse_args()
+    main(options)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""Compare the time taken to find every entity of some types with each of
+the client's search engines.
+
+Each search is repeated, the first container_view search of a type
+includes creating its ContainerView, later ones reuse it. A large
+inventory is needed for the difference to show.
+
+Example usage:
+python ./benchmarks/search.py --server <server> --username <user> --password <pass>
+python ./benchmarks/search.py --types VirtualMachine --repeat 5 --server <server> ...
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import time
+from optparse import OptionParser
+
+from psphere.client import Client
+from psphere.search import SEARCH_ENGINES
+
+
+def main(options):
+    client = Client(server=options.server, username=options.username,
+                    password=options.password)
+    for view_type in options.types.split(","):
+        for search_engine in SEARCH_ENGINES:
+            times = []
+            for i in range(options.repeat):
+                start = time.time()
+                views = client.find_entity_views(
+                    view_type, properties=["name"],
+                    search_engine=search_engine)
+                times.append(time.time() - start)
+            print("%-20s %-15s %6d found, first %8.3fs, best %8.3fs" % (
+                view_type, search_engine, len(views), times[0], min(times)))
+    client.logout()
+
+
+if __name__ == "__main__":
+    parser = OptionParser(usage="Usage: %prog [options]")
+    parser.add_option("--server", dest="server",
+                      help="The server to connect to")
+    parser.add_option("--username", dest="username",
+                      help="The username used to connect to the server")
+    parser.add_option("--password", dest="password",
+                      help="The password used to connect to the server")
+    parser.add_option("--types", dest="types",
+                      default="VirtualMachine,HostSystem,Datastore",
+                      help="Comma separated types of entity to find")
+    parser.add_option("--repeat", dest="repeat", type="int", default=3,
+                      help="The number of times to search for each type")
+    (options, args) = parser.parse_args()
+    main(options)
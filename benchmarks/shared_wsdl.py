@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""Measure the cost of each additional client when the parsed WSDL is
+shared between clients, compared with every client parsing its own.
+
+Only the WSDL related part of client construction is measured, so no
+server is required.
+
+Example usage:
+python ./benchmarks/shared_wsdl.py --clients 100
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import time
+import tracemalloc
+from optparse import OptionParser
+
+import suds.cache
+import suds.client
+
+from psphere.client import ExtraConfigPlugin
+from psphere.wsdlcache import WSDL_DIR, get_shared_wsdl
+
+URL = "file://%s/vimService.wsdl" % WSDL_DIR
+
+
+def unshared_client():
+    return suds.client.Client(URL, cache=suds.cache.NoCache(),
+                              plugins=[ExtraConfigPlugin()])
+
+
+def shared_client():
+    client = suds.client.Client.__new__(suds.client.Client)
+    get_shared_wsdl(URL).bind(client, plugins=[ExtraConfigPlugin()])
+    return client
+
+
+def measure(factory, count):
+    clients = []
+    tracemalloc.start()
+    start = time.time()
+    for _ in range(count):
+        clients.append(factory())
+    elapsed = time.time() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed / count, memory / count
+
+
+def main(options):
+    # Load the shared definition up front, it is a one-off cost
+    get_shared_wsdl(URL)
+    results = [
+        ("Unshared", measure(unshared_client, options.unshared)),
+        ("Shared", measure(shared_client, options.clients)),
+    ]
+    for name, (latency, memory) in results:
+        print("%-9s %10.3f ms/client %12.1f KiB/client" %
+              (name, latency * 1000, memory / 1024))
+
+
+if __name__ == "__main__":
+    parser = OptionParser(usage="Usage: %prog [options]")
+    parser.add_option("--clients", dest="clients", type="int", default=100,
+                      help="The number of clients sharing the WSDL")
+    parser.add_option("--unshared", dest="unshared", type="int", default=3,
+                      help="The number of clients parsing their own WSDL")
+    (options, args) = parser.parse_args()
+    main(options)
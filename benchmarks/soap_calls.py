@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""Count the SOAP calls and time taken by common inventory queries.
+
+Example usage:
+python ./benchmarks/soap_calls.py --server <server> --username <user> --password <pass>
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import re
+import time
+from collections import Counter
+from optparse import OptionParser
+
+from suds.plugin import MessagePlugin
+
+from psphere.client import Client
+from psphere.managedobjects import HostSystem, VirtualMachine
+
+
+class CallCounter(MessagePlugin):
+    """Counts the SOAP operations sent by a client."""
+    body_re = re.compile(br"<[^>]*Body[^>]*>\s*<(?:\w+:)?(\w+)")
+
+    def __init__(self):
+        self.calls = Counter()
+
+    def sending(self, context):
+        match = self.body_re.search(context.envelope)
+        self.calls[match.group(1).decode("ascii") if match else "?"] += 1
+
+
+def measure(counter, name, func):
+    counter.calls.clear()
+    start = time.time()
+    result = func()
+    elapsed = time.time() - start
+    print("%-45s %8.3fs %6s calls %s" % (name, elapsed,
+                                        sum(counter.calls.values()),
+                                        dict(counter.calls)))
+    return result
+
+
+def main(options):
+    counter = CallCounter()
+    client = Client(server=options.server, username=options.username,
+                    password=options.password, plugins=[counter])
+
+    measure(counter, "VirtualMachine.all(name, runtime)",
+            lambda: VirtualMachine.all(client, properties=["name", "runtime"]))
+    measure(counter, "HostSystem.all(name)",
+            lambda: HostSystem.all(client, properties=["name"]))
+    client.logout()
+
+
+if __name__ == "__main__":
+    parser = OptionParser(usage="Usage: %prog [options]")
+    parser.add_option("--server", dest="server",
+                      help="The server to connect to")
+    parser.add_option("--username", dest="username",
+                      help="The username used to connect to the server")
+    parser.add_option("--password", dest="password",
+                      help="The password used to connect to the server")
+    (options, args) = parser.parse_args()
+    main(options)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""Measure the time taken to unmarshal a large RetrieveProperties response,
+i.e. to replace the ManagedObjectReferences in it with views.
+
+The response is parsed from a file, which can be recorded from a server
+with --record, or generated: by default it holds config.hardware.device
+of a number of VMs with a number of disks each.
+
+Example usage:
+python ./benchmarks/unmarshal.py --record devices.xml --server <server> --username <user> --password <pass>
+python ./benchmarks/unmarshal.py --reply devices.xml
+python ./benchmarks/unmarshal.py --vms 1000 --disks 20
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import time
+import weakref
+from optparse import OptionParser
+
+from suds.plugin import MessagePlugin
+
+from psphere import soap
+from psphere.cache import PropertyCache
+from psphere.client import Client
+from psphere.managedobjects import VirtualMachine
+from psphere.wsdlcache import WSDL_DIR, get_shared_wsdl
+
+DISK = (
+    '<VirtualDevice xsi:type="VirtualDisk"><key>%(key)s</key>'
+    '<deviceInfo><label>Hard disk %(key)s</label><summary>20,971,520 KB'
+    '</summary></deviceInfo><backing xsi:type="VirtualDiskFlatVer2BackingInfo">'
+    '<fileName>[datastore%(ds)s] vm%(vm)s/vm%(vm)s_%(key)s.vmdk</fileName>'
+    '<datastore type="Datastore">datastore-%(ds)s</datastore>'
+    '<diskMode>persistent</diskMode><thinProvisioned>true</thinProvisioned>'
+    '<uuid>6000C29a-%(vm)s-%(key)s</uuid></backing>'
+    '<connectable><startConnected>true</startConnected>'
+    '<allowGuestControl>false</allowGuestControl>'
+    '<connected>true</connected></connectable>'
+    '<controllerKey>1000</controllerKey><unitNumber>%(key)s</unitNumber>'
+    '<capacityInKB>20971520</capacityInKB></VirtualDevice>')
+
+
+def generate_reply(vms, disks):
+    objects = []
+    for vm in range(vms):
+        devices = "".join(DISK % {"key": key, "vm": vm, "ds": key % 4}
+                          for key in range(disks))
+        objects.append(
+            '<returnval><obj type="VirtualMachine">vm-%s</obj>'
+            '<propSet><name>config.hardware.device</name>'
+            '<val xsi:type="ArrayOfVirtualDevice">%s</val></propSet>'
+            '</returnval>' % (vm, devices))
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<soapenv:Envelope '
+        'xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" '
+        'xmlns:xsd="http://www.w3.org/2001/XMLSchema" '
+        'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+        '<soapenv:Body><RetrievePropertiesResponse xmlns="urn:vim25">%s'
+        '</RetrievePropertiesResponse></soapenv:Body></soapenv:Envelope>'
+        % "".join(objects)).encode("utf-8")
+
+
+class ReplyRecorder(MessagePlugin):
+    def __init__(self):
+        self.reply = None
+
+    def received(self, context):
+        self.reply = context.reply
+
+
+def record(options):
+    recorder = ReplyRecorder()
+    client = Client(server=options.server, username=options.username,
+                    password=options.password, plugins=[recorder])
+    VirtualMachine.all(client, properties=["config.hardware.device"])
+    client.logout()
+    with open(options.record, "wb") as f:
+        f.write(recorder.reply)
+    print("Recorded %s bytes to %s" % (len(recorder.reply), options.record))
+
+
+def offline_client():
+    """A Client which can unmarshal but isn't connected to a server."""
+    client = Client.__new__(Client)
+    shared = get_shared_wsdl("file://%s/vimService.wsdl" % WSDL_DIR)
+    shared.bind(client)
+    client._views = weakref.WeakValueDictionary()
+    client.cache = PropertyCache()
+    return client
+
+
+def main(options):
+    if options.record:
+        record(options)
+        return
+    if options.reply:
+        with open(options.reply, "rb") as f:
+            reply = f.read()
+    else:
+        reply = generate_reply(options.vms, options.disks)
+
+    client = offline_client()
+    collector = soap.ManagedObjectReference("PropertyCollector",
+                                            "propertyCollector")
+    best = None
+    for i in range(options.repeat):
+        # suds parses the injected reply instead of sending the request
+        result = client.service.RetrieveProperties(
+            _this=collector, __inject={"reply": reply})
+        start = time.time()
+        views = client._unmarshal(result)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print("%s objects from %s bytes: %.3fs" % (len(views), len(reply), best))
+
+
+if __name__ == "__main__":
+    parser = OptionParser(usage="Usage: %prog [options]")
+    parser.add_option("--reply", dest="reply",
+                      help="A recorded RetrieveProperties response")
+    parser.add_option("--record", dest="record",
+                      help="Record the response for all VMs to this file")
+    parser.add_option("--server", dest="server",
+                      help="The server to record from")
+    parser.add_option("--username", dest="username",
+                      help="The username used to connect to the server")
+    parser.add_option("--password", dest="password",
+                      help="The password used to connect to the server")
+    parser.add_option("--vms", dest="vms", type="int", default=1000,
+                      help="The number of VMs in a generated response")
+    parser.add_option("--disks", dest="disks", type="int", default=20,
+                      help="The number of disks of each generated VM")
+    parser.add_option("--repeat", dest="repeat", type="int", default=3,
+                      help="The number of times to measure")
+    (options, args) = parser.parse_args()
+    main(options)
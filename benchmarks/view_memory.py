@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+"""Measure the memory used by, and the time taken to create, a large
+number of VirtualMachine views.
+
+No server is required, the views are created without retrieving any
+properties.
+
+Example usage:
+python ./benchmarks/view_memory.py --views 100000
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import time
+import tracemalloc
+from optparse import OptionParser
+
+from psphere.managedobjects import VirtualMachine
+from psphere.soap import ManagedObjectReference
+
+
+def main(options):
+    mo_refs = [ManagedObjectReference("VirtualMachine", "vm-%s" % i)
+               for i in range(options.views)]
+
+    tracemalloc.start()
+    start = time.time()
+    views = [VirtualMachine(mo_ref, None) for mo_ref in mo_refs]
+    elapsed = time.time() - start
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print("%s views: %.3fs, %.1f MiB (%d bytes per view)" % (
+        len(views), elapsed, size / 2 ** 20, size / len(views)))
+
+
+if __name__ == "__main__":
+    parser = OptionParser(usage="Usage: %prog [options]")
+    parser.add_option("--views", dest="views", type="int", default=100000,
+                      help="The number of views to create")
+    (options, args) = parser.parse_args()
+    main(options)
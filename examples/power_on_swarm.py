@@ -19,12 +19,13 @@ if __name__ == '__main__':
     print("Estimated run time with %s seconds sleep between each power on: %s" %
           (scatter_secs, scatter_secs*len(nodes)))
 
+    vms = VirtualMachine.get_many(client, name=nodes,
+                                  properties=["name", "runtime"])
     for node in nodes:
-        try:
-            vm = VirtualMachine.get(client, name=node, properties=["name", "runtime"])
-        except ObjectNotFoundError:
+        vm = vms[node]
+        if vm is None:
             print("WARNING: Could not find VM with name %s" % node)
-            pass
+            continue
 
         print("Powering on %s" % vm.name)
         if vm.runtime.powerState == "poweredOn":
@@ -44,11 +44,10 @@ class Discovery(BaseScript):
 
         print('Cluster: %s (%s hosts)' % (ccr.name, len(ccr.host)))
 
-        ccr.preload("host", properties=["name", "vm"])
+        # Get the host and vm views in one fell swoop
+        ccr.preload({"host": {"props": ["name"], "vm": ["name"]}})
         for host in ccr.host:
             print('  Host: %s (%s VMs)' % (host.name, len(host.vm)))
-            # Get the vm views in one fell swoop
-            host.preload("vm", properties=["name"])
             for vm in host.vm:
                 print('    VM: %s' % vm.name)
     
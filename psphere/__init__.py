@@ -15,81 +15,100 @@
 from __future__ import absolute_import, division, print_function
 
 import logging
-import time
 
-from suds import MethodNotFound
+import six
+import suds
 
 logger = logging.getLogger(__name__)
 
 
 class cached_property(object):
-    """Decorator for read-only properties evaluated only once within TTL period.
+    """Decorator for read-only properties whose values are cached.
 
-    It can be used to created a cached property like this::
-
-        import random
-
-        # the class containing the property must be a new-style class
-        class MyClass(object):
-            # create property whose value is cached for ten minutes
-            @cached_property(ttl=600)
-            def randint(self):
-                # will only be evaluated every 10 min. at maximum.
-                return random.randint(0, 100)
-
-    The value is cached  in the '_cache' attribute of the object instance that
-    has the property getter method wrapped by this decorator. The '_cache'
-    attribute value is a dictionary which has a key for every property of the
-    object which is wrapped by this decorator. Each entry in the cache is
-    created only when the property is accessed for the first time and is a
-    two-element tuple with the last computed property value and the last time
-    it was updated in seconds since the epoch.
-
-    The default time-to-live (TTL) is 300 seconds (5 minutes). Set the TTL to
-    zero for the cached value to never expire.
+    The values are held in the property cache of the instance's client,
+    see :mod:`psphere.cache`, which decides how long each one is used for.
+    The decorated function is only called when the value isn't cached.
 
     To expire a cached property value manually just do::
-    
-        del instance._cache[<property name>]
+
+        instance.flush_cache([<property name>])
 
     """
     def __init__(self, fget, doc=None):
-        self.ttl = 300
         self.fget = fget
         self.__doc__ = doc or fget.__doc__
         self.__name__ = fget.__name__
         self.__module__ = fget.__module__
 
     def __get__(self, inst, owner):
-        now = time.time()
+        if inst is None:
+            return self
         try:
-            # Get the value from the cache
-            value, last_update = inst._cache[self.__name__]
-            logger.info("Found cached value for %s", self.__name__)
-            # If the value in the cache exceeds the TTL then raise
-            # AttributeError so that we retrieve the value again below
-            if self.ttl > 0 and now - last_update > self.ttl:
-                logger.info("Cached value has exceeded TTL")
-                raise AttributeError
-        except (KeyError, AttributeError):
-            # We end up here if the value hasn't been cached
-            # or the value exceeds the TTL. We call the decorated
-            # function to get the value.
-            logger.info("%s is not cached.", self.__name__)
+            return inst._get_cached(self.__name__)
+        except KeyError:
+            # We end up here if the value hasn't been cached or it has
+            # expired. We call the decorated function to get the value.
+            logger.debug("%s is not cached.", self.__name__)
             value = self.fget(inst)
-            try:
-                # See if the instance has a cache attribute
-                cache = inst._cache
-            except AttributeError:
-                # If it doesn't, initialise the attribute and use it
-                cache = inst._cache = {}
-            # Set the value in the cache dict to our values
-            cache[self.__name__] = (value, now)
-        # Finally, return either the value from the cache or the
-        # newly retrieved value
-        return value
+            inst._set_cached(self.__name__, value)
+            return value
+
+
+class ManagedObjectType(type):
+    """The metaclass of managed objects.
 
+    Merges the _valid_attrs of a class with those of its bases once, when
+    the class is created, so that instances can share the result.
+
+    """
+    def __init__(cls, name, bases, namespace):
+        super(ManagedObjectType, cls).__init__(name, bases, namespace)
+        valid_attrs = set(namespace.get("_valid_attrs", ()))
+        for base in bases:
+            valid_attrs.update(getattr(base, "_valid_attrs", ()))
+        cls._valid_attrs = frozenset(valid_attrs)
+
+
+def _soap_method(name):
+    """Create a method which invokes a SOAP method on the view's object."""
+    def method(self, **kwargs):
+        result = self._client.invoke(name, _this=self._mo_ref, **kwargs)
+        logger.debug("Invoke returned %s", result)
+        return result
+    method.__name__ = str(name)
+    return method
+
+
+def set_siblings(views, size=None):
+    """Group views which were retrieved together.
+
+    When a property of one of the views has to be retrieved from the
+    server, it is retrieved for all of the views in the group which
+    haven't loaded it yet in the same call. The views are split into
+    groups of at most size, so that one call never has to retrieve the
+    property for more of them than a page or batch holds.
+
+    :param views: The views, anything which isn't a ManagedObject is ignored.
+    :type views: list
+    :param size: The largest number of views in a group. The default is \
+    the client's get_views_batch_size.
+    :type size: int or None
 
+    """
+    views = [view for view in views if isinstance(view, ManagedObject)]
+    if len(views) < 2:
+        return
+    if size is None:
+        size = views[0]._client.get_views_batch_size
+    for i in range(0, len(views), size):
+        siblings = views[i:i + size]
+        if len(siblings) < 2:
+            continue
+        for view in siblings:
+            view._siblings = siblings
+
+
+@six.add_metaclass(ManagedObjectType)
 class ManagedObject(object):
     """The base class which all managed object's derive from.
     
@@ -101,28 +120,45 @@ class ManagedObject(object):
 
     """
     _valid_attrs = set([])
+    # There can be a very large number of views, so they don't have a
+    # __dict__. Subclasses should also define __slots__.
+    __slots__ = ("_mo_ref", "_key", "_client", "_object_content", "_mirror",
+                 "_siblings", "__weakref__")
     def __init__(self, mo_ref, client):
-        self._cache = {}
-        logger.debug("===== Have been passed %s as mo_ref: ", mo_ref)
         self._mo_ref = mo_ref
+        # Identifies the object in the client's property cache
+        self._key = (str(mo_ref._type), str(mo_ref.value))
         self._client = client
+        # Set on views handed out by an InventoryMirror, see psphere.mirror
+        self._mirror = None
+        # The views this one was retrieved with, see set_siblings
+        self._siblings = None
 
     def _get_dataobject(self, name, multivalued):
         """This function only gets called if the decorated property
         doesn't have a value in the cache."""
+        if self._mirror is not None and self in self._mirror:
+            try:
+                return self._mirror.get(self, name)
+            except KeyError:
+                pass
         logger.debug("Querying server for uncached data object %s", name)
-        # This will retrieve the value and inject it into the cache
-        self.update_view_data(properties=[name])
-        return self._cache[name][0]
+        # This will retrieve the value and inject it into the cache. The
+        # value is used as retrieved as the cache may already have evicted it
+        return self._load_property(name)[name]
 
     def _get_mor(self, name, multivalued):
         """This function only gets called if the decorated property
         doesn't have a value in the cache."""
+        if self._mirror is not None and self in self._mirror:
+            try:
+                return self._mirror.get(self, name)
+            except KeyError:
+                pass
         logger.debug("Querying server for uncached MOR %s", name)
         # This will retrieve the value and inject it into the cache
         logger.debug("Getting view for MOR")
-        self.update(properties=[name])
-        return self._cache[name][0]
+        return self._load_property(name)[name]
         
 #        return self._cache[name][0]
 #        if multivalued is True:
@@ -135,6 +171,47 @@ class ManagedObject(object):
 #            self.update(properties=[name])
 #            return self._cache[name][0]
 
+    def _load_property(self, name):
+        """Retrieve a property, along with any siblings which need it.
+
+        :returns: The values retrieved for this view, by property name.
+        :rtype: dict
+
+        """
+        siblings = self._siblings
+        if siblings is None or not getattr(self._client, "coalesce_loading",
+                                           False):
+            return self.update_view_data(properties=[name])
+
+        views = [self]
+        for view in siblings:
+            if (view is not self and name in view._valid_attrs and
+                    not view._is_cached(name)):
+                views.append(view)
+        if len(views) == 1:
+            return self.update_view_data(properties=[name])
+
+        logger.debug("Retrieving %s for %s sibling views", name, len(views))
+        try:
+            values = self._client._get_views(
+                [view._mo_ref for view in views], [name])[1]
+        except suds.WebFault as e:
+            # One of the siblings may have been deleted, which fails the
+            # whole call
+            logger.debug("Failed to retrieve %s for siblings: %s", name, e)
+            return self.update_view_data(properties=[name])
+        return values.get(self._key, {})
+
+    def _get_cached(self, name):
+        """Get a property from the cache, raising KeyError if it isn't."""
+        return self._client.cache.get(self._key, name)
+
+    def _set_cached(self, name, value):
+        self._client.cache.set(self._key, name, value)
+
+    def _is_cached(self, name):
+        return (self._key, name) in self._client.cache
+
     def flush_cache(self, properties=None):
         """Flushes the cache being held for this instance.
 
@@ -142,13 +219,7 @@ class ManagedObject(object):
         :type properties: list or None (default). If None, flush entire cache.
 
         """
-        if hasattr(self, '_cache'):
-            if properties is None:
-                del(self._cache)
-            else:
-                for prop in properties:
-                    if prop in self._cache:
-                        del(self._cache[prop])
+        self._client.cache.invalidate(self._key, properties)
 
     def update(self, properties=None):
         """Updates the properties being held for this instance.
@@ -159,11 +230,9 @@ class ManagedObject(object):
 
         """
         if properties is None:
-            try:
-                self.update_view_data(properties=list(self._cache.keys()))
-            except AttributeError:
-                # We end up here and ignore it self._cache doesn't exist
-                pass
+            properties = sorted(self._client.cache.names(self._key))
+            if properties:
+                self.update_view_data(properties=properties)
         else:
             self.update_view_data(properties=properties)
 
@@ -187,6 +256,8 @@ class ManagedObject(object):
 
         :param properties: A list of properties to update.
         :type properties: list
+        :returns: The values retrieved, by property name.
+        :rtype: dict
 
         """
         if properties is None:
@@ -221,20 +292,31 @@ class ManagedObject(object):
             # TODO: Improve error checking and reporting
             logger.error("Nothing returned from RetrieveProperties!")
 
-        self._set_view_data(object_content)
+        return self._set_view_data(object_content)
 
     def preload(self, name, properties=None):
         """Pre-loads the requested properties for each object in the "name"
         attribute.
 
+        Several levels of objects can be loaded at once by passing a dict
+        as name, see :mod:`psphere.preload`:
+
+        >>> ccr.preload({"host": {"props": ["name"], "vm": ["name"]}})
+
         :param name: The name of the attribute containing the list to
-        preload.
-        :type name: str
+        preload, or a nested preload specification.
+        :type name: str or dict
         :param properties: The properties to preload on the objects or the
         string all to preload all properties.
         :type properties: list or the string "all"
         
         """
+        if isinstance(name, dict):
+            # Imported here as psphere.preload needs the managed objects
+            from psphere.preload import preload
+            preload(self, name)
+            return
+
         if properties is None:
             raise ValueError("You must specify some properties to preload. To"
                              " preload all properties use the string \"all\".")
@@ -255,16 +337,29 @@ class ManagedObject(object):
         views = self._client.get_views(mo_refs, properties)
 
         # Populate the inst.attr item with the retrieved object/properties
-        self._cache[name] = (views, time.time())
+        self._set_cached(name, views)
 
     def _set_view_data(self, object_content):
-        """Update the local object from the passed in object_content."""
+        """Update the local object from the passed in object_content.
+
+        :returns: The values set, by property name.
+        :rtype: dict
+
+        """
         # A debugging convenience, allows inspection of the object_content
         # that was used to create the object
         logger.info("Setting view data for a %s", self.__class__)
         self._object_content = object_content
+        values = {}
+
+        # propSet is missing altogether when no properties were returned
+        for dynprop in getattr(object_content, "propSet", []):
+            # Nested properties (e.g. config.uuid) have been requested
+            # by a search and have nowhere to go in the cache
+            if "." in dynprop.name:
+                logger.debug("Ignoring nested property %s", dynprop.name)
+                continue
 
-        for dynprop in object_content.propSet:
             # If the class hasn't defined the property, don't use it
             if dynprop.name not in self._valid_attrs:
                 logger.error("Server returned a property '%s' but the object"
@@ -284,13 +379,6 @@ class ManagedObject(object):
                             dynprop.name, type(dynprop.val))
                 pass
 
-            try:
-                # See if we have a cache attribute
-                cache = self._cache
-            except AttributeError:
-                # If we don't create one and use it
-                cache = self._cache = {}
-
             # Values which contain classes starting with Array need
             # to be converted into a nicer Python list
             if dynprop.val.__class__.__name__.startswith('Array'):
@@ -299,15 +387,17 @@ class ManagedObject(object):
                 logger.info("Setting value of an Array* property")
                 logger.debug("%s being set to %s",
                              dynprop.name, dynprop.val[0])
-                now = time.time()
-                cache[dynprop.name] = (dynprop.val[0], now)
+                values[dynprop.name] = dynprop.val[0]
+                self._set_cached(dynprop.name, dynprop.val[0])
+                set_siblings(dynprop.val[0])
             else:
                 logger.info("Setting value of a single-valued property")
                 logger.debug("DynamicProperty value is a %s: ",
                              dynprop.val.__class__.__name__)
                 logger.debug("%s being set to %s", dynprop.name, dynprop.val)
-                now = time.time()
-                cache[dynprop.name] = (dynprop.val, now)
+                values[dynprop.name] = dynprop.val
+                self._set_cached(dynprop.name, dynprop.val)
+        return values
 
     def __getattr__(self, name):
         """Overridden so that SOAP methods can be proxied.
@@ -316,44 +406,30 @@ class ManagedObject(object):
         SOAP methods through the Python object, like:
         >>> client.si.content.rootFolder.CreateFolder(name="foo")
 
-        This is achieved by asking the underlying SOAP service if the
-        requested name is a valid method. If the method name is not valid
-        then we pass the attribute retrieval back to __getattribute__
-        which will use the default behaviour (i.e. just get the attribute).
+        The name is looked up in the client's index of the methods in the
+        WSDL. If it's one of them, a method which invokes it is added to
+        the class, so later lookups on any view of the class don't come
+        through here at all. Otherwise an AttributeError is raised.
+
+        TODO: Any method of the WSDL is accepted for any type of object,
+        e.g. folder.Login() or vm.RescanAllHba() are only rejected by the
+        server. The WSDL types _this as a plain ManagedObjectReference, so
+        checking this needs per type method lists in
+        resources/managed_object_graph.yaml, which doesn't have them yet.
 
-        TODO: There's no checking if the SOAP method is valid for the type
-        of object being called. e.g. You could do folder.Login() which would
-        be totally bogus.
-        
         :param name: The name of the method to call.
         :param type: str
 
         """
-        logger.debug("Entering overridden built-in __getattr__"
-                     " with %s" % name)
-        # Built-ins always use the default behaviour
-#        if name.startswith("__"):
-#            logger.debug("Returning built-in attribute %s", name)
-#            return object.__getattribute__(self, name)
-
+        cls = type(self)
         # Here we must access _client through __getattribute__, if we were
         # to use "self._client" we'd call recursively through __getattr__
         client = object.__getattribute__(self, "_client")
+        if name not in client._operations:
+            raise AttributeError("'%s' object has no attribute '%s'" %
+                                 (cls.__name__, name))
 
-        try:
-            getattr(client.service, name)
-        except MethodNotFound:
-            # It doesn't, so we let the object check if it's a standard
-            # attribute. This is cool because it 
-            return object.__getattribute__(self, name)
-
-        # Caller has requested a valid SOAP reference
         logger.debug("Constructing proxy method %s for a %s",
-                     name, self._mo_ref._type)
-        def func(**kwargs):
-            result = self._client.invoke(name, _this=self._mo_ref,
-                                        **kwargs)
-            logger.debug("Invoke returned %s", result)
-            return result
-
-        return func
+                     name, cls.__name__)
+        setattr(cls, name, _soap_method(name))
+        return getattr(self, name)
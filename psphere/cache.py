@@ -0,0 +1,223 @@
+"""
+:mod:`psphere.cache` - The cache of retrieved properties
+========================================================
+
+.. module:: cache
+
+Every property retrieved from the server is held in the client's
+:class:`PropertyCache`, keyed by the managed object and the property
+name. Values expire after a time to live which can be set per property
+and per type of managed object. The cache isn't limited in size unless a
+maximum number of values or estimated number of bytes is given, when the
+least recently used values are evicted to stay below it.
+
+>>> cache = PropertyCache(ttl=300, ttls={"name": 0, "runtime": 10,
+...                                      ("HostSystem", "runtime"): 60},
+...                       max_entries=50000, max_bytes=64 * 2 ** 20)
+>>> client = Client(cache=cache)
+
+A different backend can be used by passing any object with the same
+methods as the client's cache.
+
+"""
+
+# Copyright 2010 Jonathan Kinred
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import six
+import suds
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value, _depth=0):
+    """Roughly estimate the number of bytes used by a property value.
+
+    suds objects, lists and dicts are walked; references to other managed
+    objects are counted as a pointer since they aren't owned by the value.
+
+    """
+    # Imported here as psphere imports this module
+    from psphere import ManagedObject
+
+    size = sys.getsizeof(value)
+    if _depth > 20 or isinstance(value, ManagedObject):
+        return size
+    if isinstance(value, suds.sudsobject.Object):
+        for name, item in value:
+            size += estimate_size(item, _depth + 1)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += estimate_size(item, _depth + 1)
+    elif isinstance(value, dict):
+        for item in value.values():
+            size += estimate_size(item, _depth + 1)
+    return size
+
+
+class PropertyCache(object):
+    """An LRU cache of property values shared by the views of a client.
+
+    :param ttl: The default number of seconds a value is used for. 0 or \
+    None means forever.
+    :type ttl: float or None
+    :param ttls: Times to live for particular properties, keyed by the \
+    property name or by a (type, property name) tuple. The type is \
+    matched exactly, not including subtypes.
+    :type ttls: dict or None
+    :param max_entries: The maximum number of values to keep, or None for \
+    no limit.
+    :type max_entries: int or None (default)
+    :param max_bytes: The maximum estimated size of the values to keep, \
+    or None for no limit.
+    :type max_bytes: int or None (default)
+    :param sizeof: The function used to estimate the size of a value.
+    :type sizeof: callable
+
+    """
+    def __init__(self, ttl=300, ttls=None, max_entries=None,
+                 max_bytes=None, sizeof=estimate_size):
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._names = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def ttl_for(self, key, name):
+        """The time to live of a property of a managed object."""
+        for ttl_key in ((key[0], name), name):
+            if ttl_key in self.ttls:
+                return self.ttls[ttl_key]
+        return self.ttl
+
+    def get(self, key, name):
+        """Get a value.
+
+        :param key: The (type, value) of the managed object.
+        :type key: tuple
+        :param name: The name of the property.
+        :type name: str
+        :raises: KeyError if the value isn't cached or has expired.
+
+        """
+        with self._lock:
+            try:
+                value, expires, size = self._entries.pop((key, name))
+            except KeyError:
+                self.misses += 1
+                raise
+            if expires is not None and time.time() > expires:
+                logger.debug("Cached %s of %s has expired", name, key)
+                self._forget(key, name, size)
+                self.expirations += 1
+                self.misses += 1
+                raise KeyError((key, name))
+            # Move the entry to the most recently used end
+            self._entries[(key, name)] = (value, expires, size)
+            self.hits += 1
+            return value
+
+    def __contains__(self, key_name):
+        with self._lock:
+            entry = self._entries.get(key_name)
+            return entry is not None and (entry[1] is None or
+                                          time.time() <= entry[1])
+
+    def set(self, key, name, value):
+        """Store a value, evicting others if the cache is full."""
+        ttl = self.ttl_for(key, name)
+        expires = time.time() + ttl if ttl else None
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            old = self._entries.pop((key, name), None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[(key, name)] = (value, expires, size)
+            self._names.setdefault(key, set()).add(name)
+            self._bytes += size
+            self._evict()
+
+    def _forget(self, key, name, size):
+        self._bytes -= size
+        names = self._names.get(key)
+        if names is not None:
+            names.discard(name)
+            if not names:
+                del self._names[key]
+
+    def _evict(self):
+        while self._entries and (
+                (self.max_entries is not None and
+                 len(self._entries) > self.max_entries) or
+                (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            (key, name), (value, expires, size) = next(
+                six.iteritems(self._entries))
+            del self._entries[(key, name)]
+            self._forget(key, name, size)
+            self.evictions += 1
+
+    def names(self, key):
+        """The names of the properties cached for a managed object."""
+        with self._lock:
+            return set(self._names.get(key, ()))
+
+    def invalidate(self, key, names=None):
+        """Forget properties of a managed object, or all of them."""
+        with self._lock:
+            if names is None:
+                names = list(self._names.get(key, ()))
+            for name in names:
+                entry = self._entries.pop((key, name), None)
+                if entry is not None:
+                    self._forget(key, name, entry[2])
+
+    def invalidate_type(self, type_, names=None):
+        """Forget properties of every managed object of a type."""
+        with self._lock:
+            for key in [key for key in self._names if key[0] == type_]:
+                self.invalidate(key, names)
+
+    def clear(self):
+        """Forget everything."""
+        with self._lock:
+            self._entries.clear()
+            self._names.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def statistics(self):
+        """Return the hit, miss, expiry and eviction counters and size."""
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes,
+                    "hits": self.hits, "misses": self.misses,
+                    "expirations": self.expirations,
+                    "evictions": self.evictions}
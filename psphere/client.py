@@ -27,68 +27,52 @@ The main module for accessing a vSphere server.
 
 from __future__ import absolute_import, division, print_function
 
+import io
 import logging
 import os
-import socket
-import time
+import threading
+import weakref
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 
+import six
 import suds
-from six.moves import http_client
+import suds.transport
 from six.moves.urllib.error import URLError
-from six.moves.urllib.request import HTTPSHandler, build_opener
-from suds.plugin import MessagePlugin
-from suds.transport.http import HttpTransport, TransportError
+from suds.client import _SoapClient
+from suds.plugin import MessagePlugin, PluginContainer
+from suds.transport import TransportError
 
-from psphere import ManagedObject, soap
+from psphere import ManagedObject, set_siblings, soap
+from psphere.cache import PropertyCache
 from psphere.config import _config_value
-from psphere.errors import (
-    ConfigError, NotLoggedInError, ObjectNotFoundError, TaskFailedError,
+from psphere.envelope import OPERATIONS, EnvelopeBuilder
+from psphere.errors import ConfigError, NotLoggedInError, ObjectNotFoundError
+from psphere.managedobjects import ServiceInstance, classmapper
+from psphere.search import (SEARCH_ENGINES, SEARCH_INDEX_FILTERS,
+                            TRAVERSAL_SPECS, NameIndex, matches_filter,
+                            traversal_names)
+from psphere.stream import ObjectContentStream
+from psphere.tasks import TaskWaiter
+# HTTPSClientAuthHandler used to live here and is still importable from here
+from psphere.transport import (  # noqa: F401
+    HTTPSClientAuthHandler, HTTPSClientContextTransport, KeepAliveTransport,
 )
-from psphere.managedobjects import ServiceInstance, Task, classmapper
+from psphere.wsdlcache import (calling_client, get_shared_wsdl,
+                                make_thread_safe, operation_names)
 
 logger = logging.getLogger(__name__)
 
 
-class HTTPSClientAuthHandler(HTTPSHandler):
-    def __init__(self, context):
-        HTTPSHandler.__init__(self)
-        self.context = context
-
-    def https_open(self, req):
-        return self.do_open(self.getConnection, req)
-
-    def getConnection(self, host, timeout=300):
-        return http_client.HTTPSConnection(host, context=self.context)
-
-
-class HTTPSClientContextTransport(HttpTransport):
-    def __init__(self, context, *args, **kwargs):
-        HttpTransport.__init__(self, *args, **kwargs)
-        self.context = context
-
-    def u2open(self, u2request):
-        """
-        Open a connection.
-        @param u2request: A urllib2 request.
-        @type u2request: urllib2.Requet.
-        @return: The opened file-like urllib2 object.
-        @rtype: fp
-        """
-        tm = self.options.timeout
-        url = build_opener(HTTPSClientAuthHandler(self.context))
-        if self.u2ver() < 2.6:
-            socket.setdefaulttimeout(tm)
-            return url.open(u2request)
-        else:
-            return url.open(u2request, timeout=tm)
-
-
 class Client(suds.client.Client):
     """A client for communicating with a VirtualCenter/ESX/ESXi server
 
     >>> from psphere.client import Client
     >>> Client = Client(server="esx.foo.com", username="me", password="pass")
 
+    A client can be shared by several threads, which then share its
+    session, connections and views.
+
     :param server: The server of the server. e.g. https://esx.foo.com/sdk
     :type server: str
     :param username: The username to connect with
@@ -102,10 +86,92 @@ class Client(suds.client.Client):
     :param plugins: The plugins classes that will be used to process messages
                     before send them to the web service
     :type plugins: list of classes
+    :param wsdl_cache_dir: A directory in which to cache the parsed local \
+    WSDL between runs. Caching is disabled when not set. The local WSDL \
+    is always shared between clients in the same process.
+    :type wsdl_cache_dir: str or None (default)
+    :param compression: Ask the server to gzip its responses. Large \
+    RetrieveProperties responses compress very well, which helps on slow \
+    links to remote servers.
+    :type compression: bool (default=False)
+    :param name_index: Keep an index of entity names on the client so that \
+    looking entities up by name, e.g. VirtualMachine.get(client, \
+    name="foo"), doesn't traverse the whole inventory every time. The \
+    index holds a property collector on the server until logout.
+    :type name_index: bool (default=False)
+    :param coalesce_loading: When a property of a view which was retrieved \
+    as part of a list (e.g. host.vm or VirtualMachine.all()) isn't loaded, \
+    load it for every view in the list that needs it in one call.
+    :type coalesce_loading: bool (default=True)
+    :param cache: The cache of retrieved property values, shared by all \
+    views of the client. See :mod:`psphere.cache` for setting times to \
+    live and size limits.
+    :type cache: PropertyCache or None (default)
+    :param fast_envelopes: Write the requests of the PropertyCollector \
+    methods in :data:`psphere.envelope.OPERATIONS` directly rather than \
+    having suds marshal them. The marshalled hook of plugins isn't called \
+    for these requests, the sending hook is. Requests are always \
+    marshalled by suds while the soapheaders or wsse option is set.
+    :type fast_envelopes: bool (default=True)
+    :param stream_results: Decode the pages of results of \
+    :meth:`iter_object_contents` (and so :meth:`iter_entity_views` and \
+    :meth:`find_entity_views`) one object at a time as they are read from \
+    the connection, see :mod:`psphere.stream`. The received hook of \
+    plugins isn't called for these replies.
+    :type stream_results: bool (default=False)
+    :param search_engine: How :meth:`find_entity_views` and the other \
+    searches find entities. "traversal" follows the traversal specs of \
+    :meth:`get_search_filter_spec` from folder to datacenter to compute \
+    resource and so on. "container_view" asks the server for a \
+    ContainerView of the entities of the type instead, see \
+    :meth:`get_container_view_filter_spec`. Each search can also choose.
+    :type search_engine: str (default="traversal")
+    :param clone_ticket: Start with a clone of another client's session, \
+    from its SessionManager.AcquireCloneTicket(), instead of logging in \
+    with the password. The ticket can be passed to another process. See \
+    also :meth:`clone`.
+    :type clone_ticket: str or None (default)
     """
     def __init__(self, server=None, username=None, password=None,
-                 wsdl_location="local", timeout=30, plugins=[], sslcontext=None):
+                 wsdl_location="local", timeout=30, plugins=[], sslcontext=None,
+                 wsdl_cache_dir=None, compression=False, name_index=False,
+                 coalesce_loading=True, cache=None, fast_envelopes=True,
+                 stream_results=False, search_engine="traversal",
+                 clone_ticket=None):
+        if search_engine not in SEARCH_ENGINES:
+            raise ValueError("search_engine must be one of %s" %
+                             ", ".join(SEARCH_ENGINES))
+        # The options clones of this client are created with
+        self._clone_options = dict(
+            wsdl_location=wsdl_location, timeout=timeout, plugins=plugins,
+            sslcontext=sslcontext, wsdl_cache_dir=wsdl_cache_dir,
+            compression=compression, name_index=name_index,
+            coalesce_loading=coalesce_loading, fast_envelopes=fast_envelopes,
+            stream_results=stream_results, search_engine=search_engine)
         self._logged_in = False
+        # Guards the views and specs which are created on first use, so
+        # that threads sharing the client create each of them only once
+        self._lock = threading.RLock()
+        self._task_waiter = None
+        self.search_engine = search_engine
+        self.fast_envelopes = fast_envelopes
+        self.stream_results = stream_results
+        # The largest number of objects get_views retrieves in one call
+        self.get_views_batch_size = 1000
+        self._envelopes = EnvelopeBuilder()
+        self._search_select_sets = {}
+        # The ContainerViews created by searches, kept until logout
+        self._container_views = {}
+        self._container_view_select_set = None
+        if cache is None:
+            cache = PropertyCache()
+        self.cache = cache
+        self.coalesce_loading = coalesce_loading
+        # The psphere object of each managed object in use, see
+        # _mor_to_pobject
+        self._views = weakref.WeakValueDictionary()
+        self.name_index = name_index
+        self._name_indexes = {}
         if server is None:
             server = _config_value("general", "server")
         if username is None:
@@ -118,10 +184,13 @@ class Client(suds.client.Client):
             raise ConfigError("username must be set in config file or Client()")
         if password is None:
             raise ConfigError("password must be set in config file or Client()")
+        if wsdl_cache_dir is None:
+            wsdl_cache_dir = _config_value("general", "wsdl_cache_dir")
         if sslcontext is not None:
-            self.transport = HTTPSClientContextTransport(sslcontext)
+            self.transport = HTTPSClientContextTransport(
+                sslcontext, accept_encoding=compression)
         else:
-            self.transport = HttpTransport()
+            self.transport = KeepAliveTransport(accept_encoding=compression)
         self.server = server
         self.username = username
         self.password = password
@@ -138,11 +207,21 @@ class Client(suds.client.Client):
             wsdl_uri = url + "/vimService.wsdl"
         else:
             raise ValueError("wsdl_location must be \"local\" or \"remote\"")
+        # Add ExtraConfigPlugin to the plugins
+        plugins = list(plugins) + [ExtraConfigPlugin()]
         # Init the base class
         try:
-            # Add ExtraConfigPlugin to the plugins
-            plugins.append(ExtraConfigPlugin())
-            suds.client.Client.__init__(self, wsdl_uri, plugins=plugins, transport=self.transport)
+            if wsdl_location == "local":
+                # The local WSDL is the same for every client so only
+                # parse it once per process and share the result
+                shared = get_shared_wsdl(wsdl_uri, wsdl_cache_dir)
+                shared.bind(self, plugins=plugins, transport=self.transport)
+                operations = shared.operations
+            else:
+                suds.client.Client.__init__(self, wsdl_uri, plugins=plugins,
+                                            transport=self.transport)
+                make_thread_safe(self.wsdl)
+                operations = operation_names(self.wsdl)
         except URLError:
             logger.critical("Failed to connect to %s", self.server)
             raise
@@ -152,6 +231,14 @@ class Client(suds.client.Client):
         except TransportError:
             logger.critical("Failed to load the remote WSDL from %s", wsdl_uri)
             raise
+        # The names of the SOAP methods, used by views to look up methods
+        # without asking suds
+        self._operations = operations
+        self._soap_methods = dict(
+            (name, soap_method) for service in self.wsdl.services
+            for port in service.ports
+            for name, soap_method in port.methods.items()
+            if name in OPERATIONS)
         self.options.transport.options.timeout = timeout
         self.set_options(location=url, transport=self.transport)
         mo_ref = soap.ManagedObjectReference("ServiceInstance",
@@ -165,7 +252,10 @@ class Client(suds.client.Client):
             raise
 
         if self._logged_in is False:
-            self.login(self.username, self.password)
+            if clone_ticket is not None:
+                self.clone_session(clone_ticket)
+            else:
+                self.login(self.username, self.password)
 
     def login(self, username=None, password=None):
         """Login to a vSphere server.
@@ -184,53 +274,115 @@ class Client(suds.client.Client):
         logger.debug("Logging into server")
         self.sc.sessionManager.Login(userName=username, password=password)
         self._logged_in = True
+        # Views and collectors created by an earlier session are gone
+        self._container_views.clear()
+        self._name_indexes.clear()
+        self._task_waiter = None
+
+    def clone_session(self, clone_ticket):
+        """Log in with a clone of another client's session.
+
+        >>> ticket = client.sc.sessionManager.AcquireCloneTicket()
+        >>> other_client.clone_session(ticket)
+
+        :param clone_ticket: A ticket from SessionManager.AcquireCloneTicket, \
+        which can only be used once.
+        :type clone_ticket: str
+        """
+        logger.debug("Cloning a session")
+        self.sc.sessionManager.CloneSession(cloneTicket=clone_ticket)
+        self._logged_in = True
+        self._container_views.clear()
+        self._name_indexes.clear()
+        self._task_waiter = None
+
+    def clone(self):
+        """Create a client with a session cloned from this client's.
+
+        The new client has a session and connections of its own, but
+        doesn't log in with the password again.
+
+        >>> worker_client = client.clone()
+
+        :returns: A new, logged in client.
+        :rtype: Client
+        """
+        clone_ticket = self.sc.sessionManager.AcquireCloneTicket()
+        return Client(self.server, self.username, self.password,
+                      clone_ticket=clone_ticket, **self._clone_options)
 
     def logout(self):
         """Logout of a vSphere server."""
         if self._logged_in is True:
             self.si.flush_cache()
+            self.destroy_container_views()
+            with self._lock:
+                name_indexes = list(self._name_indexes.values())
+                self._name_indexes.clear()
+                task_waiter, self._task_waiter = self._task_waiter, None
+            for name_index in name_indexes:
+                name_index.close()
+            if task_waiter is not None:
+                task_waiter.close()
             self.sc.sessionManager.Logout()
             self._logged_in = False
+            if isinstance(self.transport, KeepAliveTransport):
+                self.transport.close()
 
-    def invoke(self, method, _this, **kwargs):
+    def invoke(self, method, _this, _lazy=False, **kwargs):
         """Invoke a method on the server.
 
         >>> client.invoke('CurrentTime', client.si)
 
+        Large results of which only a few values are read, e.g. from
+        QueryPerf, can be returned lazily so that MORs are only converted
+        to psphere objects when they're accessed:
+
+        >>> perf_manager.QueryPerf(querySpec=[spec], _lazy=True)
+
         :param method: The method to invoke, as found in the SDK.
         :type method: str
         :param _this: The managed object reference against which to invoke \
         the method.
         :type _this: ManagedObject
+        :param _lazy: Return the result wrapped in a \
+        :class:`psphere.soap.LazyResult` (or LazyList) rather than \
+        converting it up front.
+        :type _lazy: bool (default=False)
         :param kwargs: The arguments to pass to the method, as \
         found in the SDK.
         :type kwargs: TODO
 
         """
         if (self._logged_in is False and
-            method not in ["Login", "RetrieveServiceContent"]):
+            method not in ["Login", "CloneSession", "RetrieveServiceContent"]):
             logger.critical("Cannot exec %s unless logged in", method)
             raise NotLoggedInError("Cannot exec %s unless logged in" % method)
 
-        for kwarg in kwargs:
-            kwargs[kwarg] = self._marshal(kwargs[kwarg])
-
-        result = getattr(self.service, method)(_this=_this, **kwargs)
+        if (self.fast_envelopes and method in OPERATIONS and
+                self._can_build_envelopes()):
+            result = self._send_envelope(
+                method, self._envelopes.build(method, _this, **kwargs))
+        else:
+            for kwarg in kwargs:
+                kwargs[kwarg] = self._marshal(kwargs[kwarg])
+            with calling_client(self):
+                result = getattr(self.service, method)(_this=_this,
+                                                       **kwargs)
         if hasattr(result, '__iter__') is False:
             logger.debug("Returning non-iterable result")
             return result
+        if _lazy:
+            return soap.lazy_value(result, self)
 
         # We must traverse the result and convert any ManagedObjectReference
         # to a psphere class, this will then be lazy initialised on use
         logger.debug(result.__class__)
         logger.debug("Result: %s", result)
         logger.debug("Length: %s", len(result))
-        if type(result) == list:
-            new_result = []
-            for item in result:
-                new_result.append(self._unmarshal(item))
-        else:
-            new_result = self._unmarshal(result)
+        new_result = self._unmarshal(result)
+        if type(new_result) == list:
+            set_siblings(new_result)
             
         logger.debug("Finished in invoke.")
         #property = self.find_and_destroy(property)
@@ -238,11 +390,75 @@ class Client(suds.client.Client):
         # Return the modified result to the caller
         return new_result
 
+    def _send_envelope(self, method, envelope, stream=False):
+        """Send a request written by the EnvelopeBuilder.
+
+        The reply is parsed by suds as it would be for any other method,
+        unless stream is set in which case an ObjectContentStream of the
+        reply is returned. Faults are raised by suds either way.
+
+        """
+        soap_client = _SoapClient(self, self._soap_methods[method])
+        context = PluginContainer(self.options.plugins).message.sending(
+            envelope=envelope)
+        request = suds.transport.Request(self.options.location,
+                                         context.envelope)
+        action = soap_client.method.soap.action
+        if isinstance(action, six.text_type):
+            action = action.encode("utf-8")
+        request.headers = {"Content-Type": "text/xml; charset=utf-8",
+                           "SOAPAction": action}
+        request.headers.update(self.options.headers)
+        transport = self.options.transport
+        try:
+            if not stream:
+                reply = transport.send(request)
+            elif hasattr(transport, "send_streaming"):
+                reply = transport.send_streaming(request)
+            else:
+                reply = transport.send(request)
+                reply.message = io.BytesIO(reply.message)
+        except TransportError as e:
+            content = e.fp and e.fp.read() or ""
+            with calling_client(self):
+                return soap_client.process_reply(content, e.httpcode, str(e))
+        if stream:
+            return ObjectContentStream(self.wsdl.schema, reply.message, method)
+        with calling_client(self):
+            return soap_client.process_reply(reply.message, None, None)
+
+    def _can_build_envelopes(self):
+        """Whether the EnvelopeBuilder can write requests for this client.
+
+        It doesn't write SOAP headers, so requests which need them are
+        marshalled by suds.
+
+        """
+        headers = self.options.soapheaders
+        # A single header may be given rather than a list of them
+        if not isinstance(headers, (list, tuple, dict)) or headers:
+            return False
+        return self.options.wsse is None
+
     def _mor_to_pobject(self, mo_ref):
-        """Converts a MOR to a psphere object."""
-        kls = classmapper(mo_ref._type)
-        new_object = kls(mo_ref, self)
-        return new_object
+        """Converts a MOR to a psphere object.
+
+        Every reference to the same managed object is converted to the
+        same psphere object for as long as it's in use, so properties
+        retrieved through one reference are cached for all of them.
+
+        """
+        key = (str(mo_ref._type), str(mo_ref.value))
+        try:
+            return self._views[key]
+        except KeyError:
+            pass
+        with self._lock:
+            view = self._views.get(key)
+            if view is None:
+                kls = classmapper(mo_ref._type)
+                view = self._views[key] = kls(mo_ref, self)
+            return view
 
     def _marshal(self, obj):
         """Walks an object and marshals any psphere object into MORs."""
@@ -251,6 +467,10 @@ class Client(suds.client.Client):
             logger.debug("obj is a psphere object, converting to MOR")
             return obj._mo_ref
 
+        if isinstance(obj, (soap.LazyResult, soap.LazyList)):
+            # The wrapped object still holds the MORs
+            return obj.unwrap()
+
         if isinstance(obj, list):
             logger.debug("obj is a list, recursing it")
             new_list = []
@@ -273,55 +493,38 @@ class Client(suds.client.Client):
         return obj
 
     def _unmarshal(self, obj):
-        """Walks an object and unmarshals any MORs into psphere objects."""
-        if isinstance(obj, suds.sudsobject.Object) is False:
-            logger.debug("%s is not a suds instance, skipping", obj)
-            return obj
-
-        logger.debug("Processing:")
-        logger.debug(obj)
-        logger.debug("...with keylist:")
-        logger.debug(obj.__keylist__)
-        # If the obj that we're looking at has a _type key
-        # then create a class of that type and return it immediately
-        if "_type" in obj.__keylist__:
-            logger.debug("obj is a MOR, converting to psphere class")
-            return self._mor_to_pobject(obj)
+        """Walks an object and unmarshals any MORs into psphere objects.
 
-        new_object = obj.__class__()
-        for sub_obj in obj:
-            logger.debug("Looking at %s of type %s", sub_obj, type(sub_obj))
+        The object is modified in place, which is safe as it has just been
+        created by suds from a response. Lists and nested objects are
+        walked with a stack rather than by recursion.
 
-            if isinstance(sub_obj[1], list):
-                new_embedded_objs = []
-                for emb_obj in sub_obj[1]:
-                    new_emb_obj = self._unmarshal(emb_obj)
-                    new_embedded_objs.append(new_emb_obj)
-                setattr(new_object, sub_obj[0], new_embedded_objs)
-                continue
-
-            if not issubclass(sub_obj[1].__class__, suds.sudsobject.Object):
-                logger.debug("%s is not a sudsobject subclass, skipping",
-                             sub_obj[1].__class__)
-                setattr(new_object, sub_obj[0], sub_obj[1])
-                continue
+        """
+        Object = suds.sudsobject.Object
+        if isinstance(obj, Object) and "_type" in obj.__keylist__:
+            return self._mor_to_pobject(obj)
+        if not isinstance(obj, (Object, list)):
+            return obj
 
-            logger.debug("Obj keylist: %s", sub_obj[1].__keylist__)
-            if "_type" in sub_obj[1].__keylist__:
-                logger.debug("Converting nested MOR to psphere class:")
-                logger.debug(sub_obj[1])
-                kls = classmapper(sub_obj[1]._type)
-                logger.debug("Setting %s.%s to %s",
-                             new_object.__class__.__name__,
-                             sub_obj[0],
-                             sub_obj[1])
-                setattr(new_object, sub_obj[0], kls(sub_obj[1], self))
+        stack = [obj]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                # Lists are updated by index, objects through __dict__
+                # which is where suds keeps their values
+                values, keys = node, range(len(node))
             else:
-                logger.debug("Didn't find _type in:")
-                logger.debug(sub_obj[1])
-                setattr(new_object, sub_obj[0], self._unmarshal(sub_obj[1]))
-
-        return new_object
+                values, keys = node.__dict__, node.__keylist__
+            for key in keys:
+                value = values[key]
+                if isinstance(value, Object):
+                    if "_type" in value.__keylist__:
+                        values[key] = self._mor_to_pobject(value)
+                    else:
+                        stack.append(value)
+                elif isinstance(value, list):
+                    stack.append(value)
+        return obj
 
     def create(self, type_, **kwargs):
         """Create a SOAP object of the requested type.
@@ -364,167 +567,292 @@ class Client(suds.client.Client):
 
         """
         # This maps the mo_ref into a psphere class and then instantiates it
-        kls = classmapper(mo_ref._type)
-        view = kls(mo_ref, self)
+        view = self._mor_to_pobject(mo_ref)
         # Update the requested properties of the instance
         #view.update_view_data(properties=properties)
 
         return view
 
-    def get_views(self, mo_refs, properties=None):
+    def get_views(self, mo_refs, properties=None, batch_size=None,
+                  concurrency=1):
         """Get a list of local view's for multiple managed objects.
 
+        The properties are retrieved with one PropertySpec per type of
+        managed object. Large lists are retrieved in batches, each of which
+        is paged with RetrievePropertiesEx, and the views are updated as
+        each page (or with stream_results, each object) arrives.
+
         :param mo_refs: The list of ManagedObjectReference's that views are \
         to be created for.
         :type mo_refs: ManagedObjectReference
         :param properties: The properties to retrieve in the views.
         :type properties: list
+        :param batch_size: The maximum number of managed objects to \
+        retrieve in one call, the default is get_views_batch_size.
+        :type batch_size: int or None
+        :param concurrency: The number of batches to retrieve at the same \
+        time, each from a thread of its own.
+        :type concurrency: int (default=1)
         :returns: A list of local instances representing the server-side \
         managed objects.
         :rtype: list of ManagedObject's
 
         """
-        property_specs = []
+        return self._get_views(mo_refs, properties, batch_size,
+                               concurrency)[0]
+
+    def _get_views(self, mo_refs, properties=None, batch_size=None,
+                   concurrency=1):
+        """Like get_views, but also return the values retrieved.
+
+        The values are keyed by the views' keys and then property names.
+        Callers which need a value should use these, as the cache may have
+        evicted it already.
+
+        """
+        if batch_size is None:
+            batch_size = self.get_views_batch_size
+        # Each managed object only needs to be retrieved once
+        unique = OrderedDict()
         for mo_ref in mo_refs:
-            property_spec = self.create('PropertySpec')
-            property_spec.type = str(mo_ref._type)
-            if properties is None:
-                properties = []
-            else:
-                # Only retrieve the requested properties
+            if isinstance(mo_ref, ManagedObject):
+                mo_ref = mo_ref._mo_ref
+            unique.setdefault((str(mo_ref._type), str(mo_ref.value)), mo_ref)
+        mo_refs = list(unique.values())
+        batches = [mo_refs[i:i + batch_size]
+                   for i in range(0, len(mo_refs), batch_size)]
+
+        if concurrency > 1 and len(batches) > 1:
+            pool = ThreadPool(min(concurrency, len(batches)))
+            try:
+                results = pool.map(
+                    lambda batch: self._get_views_batch(batch, properties),
+                    batches)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [self._get_views_batch(batch, properties)
+                       for batch in batches]
+
+        views = []
+        values = {}
+        for result in results:
+            for view, view_values in result:
+                views.append(view)
+                values[view._key] = view_values
+        set_siblings(views, batch_size)
+        return views, values
+
+    def _get_views_batch(self, mo_refs, properties):
+        property_specs = OrderedDict()
+        object_specs = []
+        for mo_ref in mo_refs:
+            type_ = str(mo_ref._type)
+            if type_ not in property_specs:
+                property_spec = self.create('PropertySpec')
+                property_spec.type = type_
                 if properties == "all":
                     property_spec.all = True
-                else:
+                elif properties is not None:
+                    # Only retrieve the requested properties
                     property_spec.all = False
                     property_spec.pathSet = properties
-            property_specs.append(property_spec)
-
-        object_specs = []
-        for mo_ref in mo_refs:
+                property_specs[type_] = property_spec
             object_spec = self.create('ObjectSpec')
             object_spec.obj = mo_ref
             object_specs.append(object_spec)
 
         pfs = self.create('PropertyFilterSpec')
-        pfs.propSet = property_specs
+        pfs.propSet = list(property_specs.values())
         pfs.objectSet = object_specs
 
-        object_contents = self.sc.propertyCollector.RetrieveProperties(
-            specSet=pfs)
-        views = []
-        for object_content in object_contents:
+        results = []
+        for object_content in self.iter_object_contents(pfs):
             # Update the instance with the data in object_content
-            object_content.obj._set_view_data(object_content=object_content)
-            views.append(object_content.obj)
+            view = object_content.obj
+            results.append((view, view._set_view_data(
+                object_content=object_content)))
+        return results
 
-        return views
-        
-    def get_search_filter_spec(self, begin_entity, property_spec):
+    def get_search_filter_spec(self, begin_entity, property_spec,
+                               traversals=None):
         """Build a PropertyFilterSpec capable of full inventory traversal.
         
         By specifying all valid traversal specs we are creating a PFS that
         can recursively select any object under the given entity.
 
+        The traversal specs are built once per client for each type of
+        begin entity and are shared by every spec returned, so they must
+        not be modified.
+
+        >>> client.get_search_filter_spec(datacenter, property_spec,
+        ...     traversals=["datacenter_datastore_traversal_spec",
+        ...                 "folder_traversal_spec"])
+
         :param begin_entity: The place in the MOB to start the search.
         :type begin_entity: ManagedEntity
         :param property_spec: TODO
         :type property_spec: TODO
+        :param traversals: Only follow these traversals, named as in \
+        :data:`psphere.search.TRAVERSAL_SPECS`, rather than all of them.
+        :type traversals: list or None
         :returns: A PropertyFilterSpec, suitable for recursively searching \
         under the given ManagedEntity.
         :rtype: PropertyFilterSpec
 
         """
-        # The selection spec for additional objects we want to filter
-        ss_strings = ['resource_pool_traversal_spec',
-                      'resource_pool_vm_traversal_spec',
-                      'folder_traversal_spec',
-                      'datacenter_host_traversal_spec',
-                      'datacenter_vm_traversal_spec',
-                      'compute_resource_rp_traversal_spec',
-                      'compute_resource_host_traversal_spec',
-                      'host_vm_traversal_spec',
-                      'datacenter_datastore_traversal_spec']
-
-        # Create a selection spec for each of the strings specified above
-        selection_specs = [
-            self.create('SelectionSpec', name=ss_string)
-            for ss_string in ss_strings
-        ]
-
-        # A traversal spec for deriving ResourcePool's from found VMs
-        rpts = self.create('TraversalSpec')
-        rpts.name = 'resource_pool_traversal_spec'
-        rpts.type = 'ResourcePool'
-        rpts.path = 'resourcePool'
-        rpts.selectSet = [selection_specs[0], selection_specs[1]]
-
-        # A traversal spec for deriving ResourcePool's from found VMs
-        rpvts = self.create('TraversalSpec')
-        rpvts.name = 'resource_pool_vm_traversal_spec'
-        rpvts.type = 'ResourcePool'
-        rpvts.path = 'vm'
-
-        crrts = self.create('TraversalSpec')
-        crrts.name = 'compute_resource_rp_traversal_spec'
-        crrts.type = 'ComputeResource'
-        crrts.path = 'resourcePool'
-        crrts.selectSet = [selection_specs[0], selection_specs[1]]
-
-        crhts = self.create('TraversalSpec')
-        crhts.name = 'compute_resource_host_traversal_spec'
-        crhts.type = 'ComputeResource'
-        crhts.path = 'host'
-         
-        dhts = self.create('TraversalSpec')
-        dhts.name = 'datacenter_host_traversal_spec'
-        dhts.type = 'Datacenter'
-        dhts.path = 'hostFolder'
-        dhts.selectSet = [selection_specs[2]]
-
-        dsts = self.create('TraversalSpec')
-        dsts.name = 'datacenter_datastore_traversal_spec'
-        dsts.type = 'Datacenter'
-        dsts.path = 'datastoreFolder'
-        dsts.selectSet = [selection_specs[2]]
-
-        dvts = self.create('TraversalSpec')
-        dvts.name = 'datacenter_vm_traversal_spec'
-        dvts.type = 'Datacenter'
-        dvts.path = 'vmFolder'
-        dvts.selectSet = [selection_specs[2]]
-
-        hvts = self.create('TraversalSpec')
-        hvts.name = 'host_vm_traversal_spec'
-        hvts.type = 'HostSystem'
-        hvts.path = 'vm'
-        hvts.selectSet = [selection_specs[2]]
-      
-        fts = self.create('TraversalSpec')
-        fts.name = 'folder_traversal_spec'
-        fts.type = 'Folder'
-        fts.path = 'childEntity'
-        fts.selectSet = [selection_specs[2], selection_specs[3],
-                          selection_specs[4], selection_specs[5],
-                          selection_specs[6], selection_specs[7],
-                          selection_specs[1], selection_specs[8]]
-
+        if isinstance(begin_entity, ManagedObject):
+            begin_entity = begin_entity._mo_ref
         obj_spec = self.create('ObjectSpec')
         obj_spec.obj = begin_entity
-        obj_spec.selectSet = [fts, dvts, dhts, crhts, crrts,
-                               rpts, hvts, rpvts, dsts]
+        obj_spec.selectSet = self._get_search_select_set(
+            str(begin_entity._type), traversals)
 
         pfs = self.create('PropertyFilterSpec')
         pfs.propSet = [property_spec]
         pfs.objectSet = [obj_spec]
         return pfs
 
-    def invoke_task(self, method, **kwargs):
-        """Execute a \*_Task method and wait for it to complete.
-        
+    def _get_search_select_set(self, begin_type, traversals=None):
+        """Build the traversal specs used by get_search_filter_spec.
+
+        They're the same for every search from the same type of entity, so
+        they're only built once and the EnvelopeBuilder only serialises
+        them once.
+
+        """
+        key = (begin_type,
+               None if traversals is None else frozenset(traversals))
+        try:
+            return self._search_select_sets[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._search_select_sets:
+                self._search_select_sets[key] = self._envelopes.cache(
+                    self._build_search_select_set(begin_type, traversals))
+            return self._search_select_sets[key]
+
+    def _build_search_select_set(self, begin_type, traversals):
+        names = traversal_names(begin_type, traversals)
+        select_set = []
+        for name in names:
+            type_, path, next_names = TRAVERSAL_SPECS[name]
+            traversal_spec = self.create('TraversalSpec')
+            traversal_spec.name = name
+            traversal_spec.type = type_
+            traversal_spec.path = path
+            traversal_spec.skip = False
+            # The specs are all defined here and referred to by name
+            traversal_spec.selectSet = [
+                self.create('SelectionSpec', name=next_name)
+                for next_name in next_names if next_name in names]
+            select_set.append(traversal_spec)
+        return select_set
+
+    def get_container_view_filter_spec(self, view_type, begin_entity,
+                                       property_spec):
+        """Build a PropertyFilterSpec selecting entities with a ContainerView.
+
+        The server keeps a ContainerView of every entity of the type under
+        the begin entity, so a search doesn't follow the inventory a level
+        at a time. Each view is created the first time it is needed and
+        reused by later searches until :meth:`destroy_container_views`,
+        which :meth:`logout` calls.
+
+        :param view_type: The type of ManagedEntity's to select.
+        :type view_type: str
+        :param begin_entity: The container to select entities under.
+        :type begin_entity: ManagedEntity
+        :param property_spec: The properties to retrieve.
+        :type property_spec: PropertySpec
+        :returns: A PropertyFilterSpec selecting the entities.
+        :rtype: PropertyFilterSpec
+
+        """
+        if isinstance(begin_entity, ManagedObject):
+            begin_entity = begin_entity._mo_ref
+        key = (str(begin_entity._type), str(begin_entity.value), view_type)
+        container_view = self._container_views.get(key)
+        if container_view is None:
+            with self._lock:
+                container_view = self._container_views.get(key)
+                if container_view is None:
+                    logger.debug("Creating a ContainerView of %s under %s",
+                                 view_type, begin_entity.value)
+                    container_view = self.sc.viewManager.CreateContainerView(
+                        container=begin_entity, type=[view_type],
+                        recursive=True)
+                    self._container_views[key] = container_view
+
+        if self._container_view_select_set is None:
+            traversal_spec = self.create('TraversalSpec')
+            traversal_spec.name = 'container_view_traversal_spec'
+            traversal_spec.type = 'ContainerView'
+            traversal_spec.path = 'view'
+            traversal_spec.skip = False
+            with self._lock:
+                if self._container_view_select_set is None:
+                    self._container_view_select_set = self._envelopes.cache(
+                        [traversal_spec])
+
+        obj_spec = self.create('ObjectSpec')
+        obj_spec.obj = container_view._mo_ref
+        obj_spec.skip = True
+        obj_spec.selectSet = self._container_view_select_set
+
+        pfs = self.create('PropertyFilterSpec')
+        pfs.propSet = [property_spec]
+        pfs.objectSet = [obj_spec]
+        return pfs
+
+    def destroy_container_views(self):
+        """Destroy the ContainerViews created by searches on the server."""
+        with self._lock:
+            container_views = list(self._container_views.values())
+            self._container_views.clear()
+        for container_view in container_views:
+            try:
+                container_view.DestroyView()
+            except Exception:
+                logger.warning("Failed to destroy %s",
+                               container_view._mo_ref.value, exc_info=True)
+
+    def _get_entity_filter_spec(self, view_type, begin_entity, property_spec,
+                                traversals=None, search_engine=None):
+        """Build the PropertyFilterSpec of a search with a search engine."""
+        if search_engine is None:
+            search_engine = self.search_engine
+        if search_engine == "traversal":
+            return self.get_search_filter_spec(begin_entity, property_spec,
+                                               traversals)
+        if search_engine != "container_view":
+            raise ValueError("search_engine must be one of %s" %
+                             ", ".join(SEARCH_ENGINES))
+        if traversals is not None:
+            raise ValueError("traversals can't be used with the "
+                             "container_view search engine")
+        return self.get_container_view_filter_spec(view_type, begin_entity,
+                                                   property_spec)
+
+    def invoke_task(self, method, progress_callback=None, timeout=None,
+                    **kwargs):
+        r"""Execute a \*_Task method and wait for it to complete.
+
+        >>> client.invoke_task("PowerOnVM_Task", _this=vm)
+
         :param method: The \*_Task method to invoke.
         :type method: str
+        :param progress_callback: Called with the task and its progress \
+        percentage whenever the progress changes.
+        :type progress_callback: callable or None
+        :param timeout: The maximum number of seconds to wait for the task.
+        :type timeout: float or None
         :param kwargs: The arguments to pass to the method.
         :type kwargs: TODO
+        :returns: The completed task.
+        :rtype: Task
 
         """
         # Don't execute methods which don't return a Task object
@@ -533,33 +861,199 @@ class Client(suds.client.Client):
                   'return a ManagedObjectReference to a Task.')
             return None
 
-        task_mo_ref = self.invoke(method=method, **kwargs)
-        task = Task(task_mo_ref, self)
-        task.update_view_data(properties=['info'])
-        # TODO: This returns true when there is an error
-        while True:
-            if task.info.state == 'success':
-                return task
-            elif task.info.state == 'error':
-                # TODO: Handle error checking properly
-                raise TaskFailedError(task.info.error.localizedMessage)
-
-            # TODO: Implement progresscallbackfunc
-            # Sleep two seconds and then refresh the data from the server
-            time.sleep(2)
-            task.update_view_data(properties=['info'])
-
-    def find_entity_views(self, view_type, begin_entity=None, properties=None):
+        task = self.invoke(method=method, **kwargs)
+        return self.wait_for_tasks([task], progress_callback=progress_callback,
+                                   timeout=timeout)[0]
+
+    @property
+    def task_waiter(self):
+        """The :class:`psphere.tasks.TaskWaiter` shared by this client."""
+        if self._task_waiter is None:
+            with self._lock:
+                if self._task_waiter is None:
+                    self._task_waiter = TaskWaiter(self)
+        return self._task_waiter
+
+    def wait_for_tasks(self, tasks, progress_callback=None, timeout=None):
+        """Wait for tasks to complete.
+
+        All of the tasks are watched with a single WaitForUpdatesEx call,
+        so each one is noticed as soon as it completes no matter how many
+        there are.
+
+        >>> tasks = [vm.PowerOnVM_Task() for vm in vms]
+        >>> client.wait_for_tasks(tasks, timeout=600)
+
+        :param tasks: The tasks to wait for.
+        :type tasks: list of Task
+        :param progress_callback: Called with a task and its progress \
+        percentage whenever the progress of one of the tasks changes.
+        :type progress_callback: callable or None
+        :param timeout: The maximum number of seconds to wait.
+        :type timeout: float or None
+        :returns: The completed tasks.
+        :rtype: list of Task
+        :raises: TaskFailedError if a task failed, TaskTimeoutError if the \
+        tasks haven't all completed within the timeout.
+
+        """
+        futures = self.task_waiter.add(tasks, progress_callback)
+        self.task_waiter.wait(futures, timeout=timeout)
+        return [future.result() for future in futures]
+
+    def find_entity_views(self, view_type, begin_entity=None, properties=None,
+                          traversals=None, search_engine=None):
         """Find all ManagedEntity's of the requested type.
 
+        The requested properties are retrieved in the same call that finds
+        the entities, so the views are ready to use without any further
+        round trips to the server.
+
         :param view_type: The type of ManagedEntity's to find.
         :type view_type: str
         :param begin_entity: The MOR to start searching for the entity. \
         The default is to start the search at the root folder.
         :type begin_entity: ManagedObjectReference or None
+        :param properties: The properties to retrieve in the views.
+        :type properties: list
+        :param traversals: Only follow these traversals, named as in \
+        :data:`psphere.search.TRAVERSAL_SPECS`, rather than all of them.
+        :type traversals: list or None
+        :param search_engine: The search engine to use, "traversal" or \
+        "container_view". The default is the client's search_engine.
+        :type search_engine: str or None
         :returns: A list of ManagedEntity's
         :rtype: list
 
+        """
+        views = list(self.iter_entity_views(view_type,
+                                            begin_entity=begin_entity,
+                                            properties=properties,
+                                            traversals=traversals,
+                                            search_engine=search_engine))
+        set_siblings(views)
+        return views
+
+    def iter_object_contents(self, specs, max_objects=None):
+        """Retrieve properties a page at a time, yielding each ObjectContent.
+
+        Uses RetrievePropertiesEx and ContinueRetrievePropertiesEx so only
+        one page of results is held in memory at a time. If the caller
+        stops iterating before the last page the remaining results are
+        discarded on the server with CancelRetrievePropertiesEx.
+
+        :param specs: The PropertyFilterSpec, or list of them, to retrieve.
+        :type specs: PropertyFilterSpec or list
+        :param max_objects: The maximum number of objects in each page. \
+        The server chooses the page size if not specified.
+        :type max_objects: int or None
+        :returns: A generator of ObjectContent's
+        :rtype: generator
+
+        """
+        if self.stream_results and self._can_build_envelopes():
+            for object_content in self._iter_streamed(specs, max_objects):
+                yield object_content
+            return
+        pages = self._iter_pages(specs, max_objects)
+        try:
+            for page in pages:
+                for object_content in page:
+                    yield object_content
+        finally:
+            pages.close()
+
+    def _iter_pages(self, specs, max_objects=None):
+        """Like iter_object_contents but yields a list for each page."""
+        pc = self.sc.propertyCollector
+        options = self.create('RetrieveOptions')
+        options.maxObjects = max_objects
+        token = None
+        try:
+            result = pc.RetrievePropertiesEx(specSet=specs, options=options)
+            while result is not None:
+                token = getattr(result, "token", None)
+                yield result.objects
+                if token is None:
+                    break
+                logger.debug("Retrieving next page of results")
+                result = pc.ContinueRetrievePropertiesEx(token=token)
+                token = None
+        finally:
+            if token is not None:
+                logger.debug("Cancelling retrieval of remaining results")
+                try:
+                    pc.CancelRetrievePropertiesEx(token=token)
+                except Exception:
+                    logger.warning("Failed to cancel property retrieval",
+                                   exc_info=True)
+
+    def _iter_streamed(self, specs, max_objects=None):
+        """Like iter_object_contents but decodes each page as it arrives."""
+        pc = self.sc.propertyCollector._mo_ref
+        options = self.create('RetrieveOptions')
+        options.maxObjects = max_objects
+        stream = None
+        try:
+            stream = self._send_envelope(
+                "RetrievePropertiesEx",
+                self._envelopes.build("RetrievePropertiesEx", pc,
+                                      specSet=specs, options=options),
+                stream=True)
+            while True:
+                for object_content in stream:
+                    yield self._unmarshal(object_content)
+                stream.close()
+                if stream.token is None:
+                    stream = None
+                    break
+                logger.debug("Retrieving next page of results")
+                token = stream.token
+                stream = self._send_envelope(
+                    "ContinueRetrievePropertiesEx",
+                    self._envelopes.build("ContinueRetrievePropertiesEx", pc,
+                                          token=token),
+                    stream=True)
+        finally:
+            if stream is not None:
+                stream.close()
+                if stream.token is not None:
+                    logger.debug("Cancelling retrieval of remaining results")
+                    try:
+                        self.sc.propertyCollector.CancelRetrievePropertiesEx(
+                            token=stream.token)
+                    except Exception:
+                        logger.warning("Failed to cancel property retrieval",
+                                       exc_info=True)
+
+    def iter_entity_views(self, view_type, begin_entity=None, properties=None,
+                          page_size=None, traversals=None,
+                          search_engine=None):
+        """Find all ManagedEntity's of the requested type, one at a time.
+
+        Unlike :meth:`find_entity_views` the views are yielded as each
+        page of results arrives from the server, so memory use is bounded
+        by the page size rather than the size of the inventory.
+
+        :param view_type: The type of ManagedEntity's to find.
+        :type view_type: str
+        :param begin_entity: The MOR to start searching for the entity. \
+        The default is to start the search at the root folder.
+        :type begin_entity: ManagedObjectReference or None
+        :param properties: The properties to retrieve in the views.
+        :type properties: list
+        :param page_size: The maximum number of views to retrieve from \
+        the server at a time.
+        :type page_size: int or None
+        :param traversals: Only follow these traversals, named as in \
+        :data:`psphere.search.TRAVERSAL_SPECS`, rather than all of them.
+        :type traversals: list or None
+        :param search_engine: The search engine to use, "traversal" or \
+        "container_view". The default is the client's search_engine.
+        :type search_engine: str or None
+        :returns: A generator of ManagedEntity's
+        :rtype: generator
+
         """
         if properties is None:
             properties = []
@@ -573,25 +1067,108 @@ class Client(suds.client.Client):
         property_spec.all = False
         property_spec.pathSet = properties
 
-        pfs = self.get_search_filter_spec(begin_entity, property_spec)
+        pfs = self._get_entity_filter_spec(view_type, begin_entity,
+                                           property_spec, traversals,
+                                           search_engine)
+
+        if self.stream_results and self._can_build_envelopes():
+            siblings = []
+            for obj_content in self._iter_streamed(pfs, page_size):
+                view = obj_content.obj
+                view._set_view_data(obj_content)
+                # Group views like the pages below, sharing the list so
+                # that views which have arrived load properties together
+                if len(siblings) >= (page_size or self.get_views_batch_size):
+                    siblings = []
+                siblings.append(view)
+                view._siblings = siblings
+                yield view
+            return
+
+        pages = self._iter_pages(pfs, page_size)
+        try:
+            for page in pages:
+                views = []
+                for obj_content in page:
+                    obj_content.obj._set_view_data(obj_content)
+                    views.append(obj_content.obj)
+                set_siblings(views, page_size)
+                for view in views:
+                    yield view
+        finally:
+            pages.close()
+
+    def find_entity_views_by_name(self, view_type, names, begin_entity=None,
+                                  properties=None):
+        """Find the ManagedEntity's of the requested type with the given names.
+
+        All of the names are resolved in a single traversal of the
+        inventory, which stops as soon as every name has been found.
+
+        :param view_type: The type of ManagedEntity's to find.
+        :type view_type: str
+        :param names: The names of the entities to find.
+        :type names: list
+        :param begin_entity: The MOR to start searching for the entities. \
+        The default is to start the search at the root folder.
+        :type begin_entity: ManagedObjectReference or None
+        :param properties: The properties to retrieve in the views.
+        :type properties: list
+        :returns: A dict of name to ManagedEntity, where names which \
+        weren't found map to None.
+        :rtype: dict
+
+        """
+        if properties is None:
+            properties = []
 
-        # Retrieve properties from server and update entity
-        obj_contents = self.sc.propertyCollector.RetrieveProperties(specSet=pfs)
+        views = dict((name, None) for name in names)
+        remaining = set(views)
+        if not remaining:
+            return views
 
-        views = []
-        for obj_content in obj_contents:
-            logger.debug("In find_entity_view with object of type %s",
-                         obj_content.obj.__class__.__name__)
-            obj_content.obj.update_view_data(properties=properties)
-            views.append(obj_content.obj)
+        if not begin_entity:
+            begin_entity = self.sc.rootFolder._mo_ref
 
+        property_spec = self.create('PropertySpec')
+        property_spec.type = view_type
+        property_spec.all = False
+        property_spec.pathSet = ["name"] + [prop for prop in properties
+                                            if prop != "name"]
+
+        pfs = self._get_entity_filter_spec(view_type, begin_entity,
+                                           property_spec)
+
+        for obj_content in self.iter_object_contents(pfs):
+            for prop in getattr(obj_content, "propSet", []):
+                if prop.name == "name":
+                    name = prop.val
+                    break
+            else:
+                continue
+            # Like find_entity_view, the first entity with a name wins
+            if name not in remaining:
+                continue
+            obj_content.obj._set_view_data(obj_content)
+            views[name] = obj_content.obj
+            remaining.discard(name)
+            if not remaining:
+                break
+
+        if remaining:
+            logger.debug("No %s found named %s", view_type,
+                         ", ".join(sorted(remaining)))
+        set_siblings(views.values())
         return views
 
     def find_entity_view(self, view_type, begin_entity=None, filter={},
                          properties=None):
         """Find a ManagedEntity of the requested type.
 
-        Traverses the MOB looking for an entity matching the filter.
+        Traverses the MOB looking for an entity matching the filter. When
+        the whole inventory is searched, filters on VM UUIDs, IP addresses
+        and DNS names are answered by the SearchIndex instead and name
+        filters by the client's name index if it's enabled.
 
         :param view_type: The type of ManagedEntity to find.
         :type view_type: str
@@ -602,6 +1179,8 @@ class Client(suds.client.Client):
         a valid parameter of the ManagedEntity type. The value is what \
         that parameter should match.
         :type filter: dict
+        :param properties: The properties to retrieve in the view.
+        :type properties: list
         :returns: If an entity is found, a ManagedEntity matching the search.
         :rtype: ManagedEntity
 
@@ -609,76 +1188,144 @@ class Client(suds.client.Client):
         if properties is None:
             properties = []
 
-        kls = classmapper(view_type)
         # Start the search at the root folder if no begin_entity was given
         if not begin_entity:
             begin_entity = self.sc.rootFolder._mo_ref
             logger.debug("Using %s", self.sc.rootFolder._mo_ref)
+            # Searches of the whole inventory can use an index instead
+            if filter and list(filter.keys()) == ["name"] and self.name_index:
+                view = self._get_name_index(view_type).lookup(filter["name"],
+                                                              properties)
+                if view is None:
+                    raise ObjectNotFoundError("No matching objects for filter")
+                return view
+            view = self._find_with_search_index(view_type, filter, properties)
+            if view is not None:
+                return view
 
         property_spec = self.create('PropertySpec')
         property_spec.type = view_type
         property_spec.all = False
-        property_spec.pathSet = list(filter.keys())
-
-        pfs = self.get_search_filter_spec(begin_entity, property_spec)
-
-        # Retrieve properties from server and update entity
-        #obj_contents = self.propertyCollector.RetrieveProperties(specSet=pfs)
-        obj_contents = self.sc.propertyCollector.RetrieveProperties(specSet=pfs)
-
-        # TODO: Implement filtering
-        if not filter:
-            logger.warning('No filter specified, returning first match.')
-            # If no filter is specified we just return the first item
-            # in the list of returned objects
-            logger.debug("Creating class in find_entity_view (filter)")
-            view = kls(obj_contents[0].obj._mo_ref, self)
-            logger.debug("Completed creating class in find_entity_view (filter)")
-            #view.update_view_data(properties)
+        property_spec.pathSet = list(filter.keys()) + [
+            prop for prop in properties if prop not in filter]
+
+        pfs = self._get_entity_filter_spec(view_type, begin_entity,
+                                           property_spec)
+
+        # Retrieve properties from server a page at a time, stopping as
+        # soon as we find a match
+        for obj_content in self.iter_object_contents(pfs):
+            if not filter:
+                logger.warning('No filter specified, returning first match.')
+            elif not matches_filter(obj_content, filter):
+                continue
+
+            view = obj_content.obj
+            view._set_view_data(obj_content)
             return view
 
-        matched = False
-        # Iterate through obj_contents retrieved
-        for obj_content in obj_contents:
-            # If there are is no propSet, skip this one
-            if not obj_content.propSet:
-                continue
+        # There were no matches
+        raise ObjectNotFoundError("No matching objects for filter")
 
-            matches = 0
-            # Iterate through each property in the set
-            for prop in obj_content.propSet:
-                for key in filter.keys():
-                    # If the property name is in the defined filter
-                    if prop.name == key:
-                        # ...and it matches the value specified
-                        # TODO: Regex this?
-                        if prop.val == filter[prop.name]:
-                            # We've found a match
-                            matches += 1
-                        else:
-                            break
-                    else:
-                        continue
-            if matches == len(filter):
-                filtered_obj_content = obj_content
-                matched = True
-                break
-            else:
+    def _get_name_index(self, view_type):
+        try:
+            return self._name_indexes[view_type]
+        except KeyError:
+            pass
+        with self._lock:
+            if view_type not in self._name_indexes:
+                self._name_indexes[view_type] = NameIndex(self, view_type)
+            return self._name_indexes[view_type]
+
+    def _find_with_search_index(self, view_type, filter, properties):
+        """Try to find an entity matching the filter with the SearchIndex.
+
+        :returns: The matching view or None if the SearchIndex can't be \
+        used or didn't find a match.
+
+        """
+        kls = classmapper(view_type)
+        for key, value in filter.items():
+            try:
+                method, argument, kwargs = SEARCH_INDEX_FILTERS[(view_type,
+                                                                 key)]
+            except KeyError:
                 continue
+            kwargs = dict(kwargs)
+            kwargs[argument] = value
+            logger.debug("Searching for %s with SearchIndex.%s",
+                         view_type, method)
+            found = getattr(self.sc.searchIndex, method)(**kwargs)
+            if isinstance(found, kls):
+                view = self._get_matching_view(found._mo_ref, filter,
+                                               properties)
+                if view is not None:
+                    return view
+        return None
+
+    def _get_matching_view(self, mo_ref, filter, properties):
+        """Get a view of an object if its properties match the filter.
+
+        :returns: The view with the filter and requested properties \
+        loaded, or None if it doesn't match or no longer exists.
 
-        if matched is not True:
-            # There were no matches
-            raise ObjectNotFoundError("No matching objects for filter")
+        """
+        property_spec = self.create('PropertySpec')
+        property_spec.type = str(mo_ref._type)
+        property_spec.all = False
+        property_spec.pathSet = list(filter.keys()) + [
+            prop for prop in properties if prop not in filter]
 
-        logger.debug("Creating class in find_entity_view")
-        view = kls(filtered_obj_content.obj._mo_ref, self)
-        logger.debug("Completed creating class in find_entity_view")
-        #view.update_view_data(properties=properties)
+        object_spec = self.create('ObjectSpec')
+        object_spec.obj = mo_ref
+
+        pfs = self.create('PropertyFilterSpec')
+        pfs.propSet = [property_spec]
+        pfs.objectSet = [object_spec]
+
+        try:
+            obj_contents = self.sc.propertyCollector.RetrieveProperties(
+                specSet=pfs)
+        except suds.WebFault as e:
+            # Most likely the object was deleted
+            logger.debug("Failed to retrieve %s: %s", mo_ref, e)
+            return None
+        if not obj_contents or not matches_filter(obj_contents[0], filter):
+            return None
+
+        view = obj_contents[0].obj
+        view._set_view_data(obj_contents[0])
         return view
 
+    def find_by_inventory_path(self, inventory_path, properties=None):
+        """Find a ManagedEntity by its path in the inventory.
+
+        >>> client.find_by_inventory_path("dc1/vm/web/web01")
+
+        :param inventory_path: The path made up of the names of the \
+        entities, e.g. datacenter/vm/folder/vm.
+        :type inventory_path: str
+        :param properties: The properties to retrieve in the view.
+        :type properties: list
+        :returns: The ManagedEntity at the path.
+        :rtype: ManagedEntity
+
+        """
+        if properties is None:
+            properties = []
+
+        found = self.sc.searchIndex.FindByInventoryPath(
+            inventoryPath=inventory_path)
+        if found is None:
+            raise ObjectNotFoundError("Nothing found at %s" % inventory_path)
+        if properties:
+            found.update_view_data(properties=properties)
+        return found
+
 class ExtraConfigPlugin(MessagePlugin):
     def addAttributeForValue(self, node):
-        if node.parent.name == 'extraConfig' and node.name == 'value':
+        if (node.parent is not None and node.parent.name == 'extraConfig'
+                and node.name == 'value'):
             node.set('xsi:type', 'xsd:string')
     def marshalled(self, context):
         context.envelope.walk(self.addAttributeForValue)
@@ -30,6 +30,10 @@ class TaskFailedError(Exception):
     pass
 
 
+class TaskTimeoutError(Exception):
+    pass
+
+
 class TemplateNotFoundError(Exception):
     pass
 
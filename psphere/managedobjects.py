@@ -5,9 +5,7 @@ from psphere import ManagedObject, cached_property
 
 class ExtensibleManagedObject(ManagedObject):
     _valid_attrs = set(['availableField', 'value'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def availableField(self):
        return self._get_dataobject("availableField", True)
@@ -18,9 +16,7 @@ class ExtensibleManagedObject(ManagedObject):
 
 class Alarm(ExtensibleManagedObject):
     _valid_attrs = set(['info'])
-    def __init__(self, mo_ref, client):
-        ExtensibleManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ExtensibleManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def info(self):
        return self._get_dataobject("info", False)
@@ -28,9 +24,7 @@ class Alarm(ExtensibleManagedObject):
 
 class AlarmManager(ManagedObject):
     _valid_attrs = set(['defaultExpression', 'description'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def defaultExpression(self):
        return self._get_dataobject("defaultExpression", True)
@@ -41,9 +35,7 @@ class AlarmManager(ManagedObject):
 
 class AuthorizationManager(ManagedObject):
     _valid_attrs = set(['description', 'privilegeList', 'roleList'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def description(self):
        return self._get_dataobject("description", False)
@@ -57,9 +49,7 @@ class AuthorizationManager(ManagedObject):
 
 class ManagedEntity(ExtensibleManagedObject):
     _valid_attrs = set(['alarmActionsEnabled', 'configIssue', 'configStatus', 'customValue', 'declaredAlarmState', 'disabledMethod', 'effectiveRole', 'name', 'overallStatus', 'parent', 'permission', 'recentTask', 'tag', 'triggeredAlarmState'])
-    def __init__(self, mo_ref, client):
-        ExtensibleManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ExtensibleManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def alarmActionsEnabled(self):
        return self._get_dataobject("alarmActionsEnabled", False)
@@ -112,6 +102,17 @@ class ManagedEntity(ExtensibleManagedObject):
             properties.append("name")
 
         return client.find_entity_views(cls.__name__, properties=properties)
+
+    @classmethod
+    def iter_all(cls, client, properties=None, page_size=None):
+        if properties is None:
+            properties = []
+
+        if "name" not in properties:
+            properties.append("name")
+
+        return client.iter_entity_views(cls.__name__, properties=properties,
+                                        page_size=page_size)
     
     @classmethod
     def get(cls, client, **kwargs):
@@ -131,6 +132,21 @@ class ManagedEntity(ExtensibleManagedObject):
                                        filter=filter,
                                        properties=properties)
 
+    @classmethod
+    def get_many(cls, client, name, properties=None):
+        """Get the entities with each of the given names.
+
+        >>> vms = VirtualMachine.get_many(client, name=["web01", "web02"])
+        >>> missing = [n for n, vm in vms.items() if vm is None]
+
+        :returns: A dict of name to view, where names which weren't \
+        found map to None.
+        :rtype: dict
+
+        """
+        return client.find_entity_views_by_name(cls.__name__, name,
+                                                properties=properties)
+
     def __cmp__(self, other):
        if self.name == other.name:
            return 0
@@ -145,9 +161,7 @@ class ManagedEntity(ExtensibleManagedObject):
 
 class ComputeResource(ManagedEntity):
     _valid_attrs = set(['configurationEx', 'datastore', 'environmentBrowser', 'host', 'network', 'resourcePool', 'summary'])
-    def __init__(self, mo_ref, client):
-        ManagedEntity.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedEntity._valid_attrs)
+    __slots__ = ()
     @cached_property
     def configurationEx(self):
        return self._get_dataobject("configurationEx", False)
@@ -173,9 +187,7 @@ class ComputeResource(ManagedEntity):
 
 class ClusterComputeResource(ComputeResource):
     _valid_attrs = set(['actionHistory', 'configuration', 'drsFault', 'drsRecommendation', 'migrationHistory', 'recommendation'])
-    def __init__(self, mo_ref, client):
-        ComputeResource.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ComputeResource._valid_attrs)
+    __slots__ = ()
     @cached_property
     def actionHistory(self):
        return self._get_dataobject("actionHistory", True)
@@ -198,9 +210,7 @@ class ClusterComputeResource(ComputeResource):
 
 class Profile(ManagedObject):
     _valid_attrs = set(['complianceStatus', 'config', 'createdTime', 'description', 'entity', 'modifiedTime', 'name'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def complianceStatus(self):
        return self._get_dataobject("complianceStatus", False)
@@ -226,16 +236,12 @@ class Profile(ManagedObject):
 
 class ClusterProfile(Profile):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        Profile.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, Profile._valid_attrs)
+    __slots__ = ()
 
 
 class ProfileManager(ManagedObject):
     _valid_attrs = set(['profile'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def profile(self):
        return self._get_mor("profile", True)
@@ -243,23 +249,17 @@ class ProfileManager(ManagedObject):
 
 class ClusterProfileManager(ProfileManager):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ProfileManager.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ProfileManager._valid_attrs)
+    __slots__ = ()
 
 
 class View(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class ManagedObjectView(View):
     _valid_attrs = set(['view'])
-    def __init__(self, mo_ref, client):
-        View.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, View._valid_attrs)
+    __slots__ = ()
     @cached_property
     def view(self):
        return self._get_mor("view", True)
@@ -267,9 +267,7 @@ class ManagedObjectView(View):
 
 class ContainerView(ManagedObjectView):
     _valid_attrs = set(['container', 'recursive', 'type'])
-    def __init__(self, mo_ref, client):
-        ManagedObjectView.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObjectView._valid_attrs)
+    __slots__ = ()
     @cached_property
     def container(self):
        return self._get_mor("container", False)
@@ -283,9 +281,7 @@ class ContainerView(ManagedObjectView):
 
 class CustomFieldsManager(ManagedObject):
     _valid_attrs = set(['field'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def field(self):
        return self._get_dataobject("field", True)
@@ -293,9 +289,7 @@ class CustomFieldsManager(ManagedObject):
 
 class CustomizationSpecManager(ManagedObject):
     _valid_attrs = set(['encryptionKey', 'info'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def encryptionKey(self):
        return self._get_dataobject("encryptionKey", True)
@@ -306,9 +300,7 @@ class CustomizationSpecManager(ManagedObject):
 
 class Datacenter(ManagedEntity):
     _valid_attrs = set(['datastore', 'datastoreFolder', 'hostFolder', 'network', 'networkFolder', 'vmFolder'])
-    def __init__(self, mo_ref, client):
-        ManagedEntity.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedEntity._valid_attrs)
+    __slots__ = ()
     @cached_property
     def datastore(self):
        return self._get_mor("datastore", True)
@@ -331,9 +323,7 @@ class Datacenter(ManagedEntity):
 
 class Datastore(ManagedEntity):
     _valid_attrs = set(['browser', 'capability', 'host', 'info', 'iormConfiguration', 'summary', 'vm'])
-    def __init__(self, mo_ref, client):
-        ManagedEntity.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedEntity._valid_attrs)
+    __slots__ = ()
     @cached_property
     def browser(self):
        return self._get_mor("browser", False)
@@ -359,16 +349,12 @@ class Datastore(ManagedEntity):
 
 class DiagnosticManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class Network(ManagedEntity):
     _valid_attrs = set(['host', 'name', 'summary', 'vm'])
-    def __init__(self, mo_ref, client):
-        ManagedEntity.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedEntity._valid_attrs)
+    __slots__ = ()
     @cached_property
     def host(self):
        return self._get_mor("host", True)
@@ -385,9 +371,7 @@ class Network(ManagedEntity):
 
 class DistributedVirtualPortgroup(Network):
     _valid_attrs = set(['config', 'key', 'portKeys'])
-    def __init__(self, mo_ref, client):
-        Network.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, Network._valid_attrs)
+    __slots__ = ()
     @cached_property
     def config(self):
        return self._get_dataobject("config", False)
@@ -401,9 +385,7 @@ class DistributedVirtualPortgroup(Network):
 
 class DistributedVirtualSwitch(ManagedEntity):
     _valid_attrs = set(['capability', 'config', 'networkResourcePool', 'portgroup', 'summary', 'uuid'])
-    def __init__(self, mo_ref, client):
-        ManagedEntity.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedEntity._valid_attrs)
+    __slots__ = ()
     @cached_property
     def capability(self):
        return self._get_dataobject("capability", False)
@@ -426,16 +408,12 @@ class DistributedVirtualSwitch(ManagedEntity):
 
 class DistributedVirtualSwitchManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class EnvironmentBrowser(ManagedObject):
     _valid_attrs = set(['datastoreBrowser'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def datastoreBrowser(self):
        return self._get_mor("datastoreBrowser", False)
@@ -443,9 +421,7 @@ class EnvironmentBrowser(ManagedObject):
 
 class HistoryCollector(ManagedObject):
     _valid_attrs = set(['filter'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def filter(self):
        return self._get_dataobject("filter", False)
@@ -453,9 +429,7 @@ class HistoryCollector(ManagedObject):
 
 class EventHistoryCollector(HistoryCollector):
     _valid_attrs = set(['latestPage'])
-    def __init__(self, mo_ref, client):
-        HistoryCollector.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, HistoryCollector._valid_attrs)
+    __slots__ = ()
     @cached_property
     def latestPage(self):
        return self._get_dataobject("latestPage", True)
@@ -463,9 +437,7 @@ class EventHistoryCollector(HistoryCollector):
 
 class EventManager(ManagedObject):
     _valid_attrs = set(['description', 'latestEvent', 'maxCollector'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def description(self):
        return self._get_dataobject("description", False)
@@ -479,9 +451,7 @@ class EventManager(ManagedObject):
 
 class ExtensionManager(ManagedObject):
     _valid_attrs = set(['extensionList'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def extensionList(self):
        return self._get_dataobject("extensionList", True)
@@ -489,16 +459,12 @@ class ExtensionManager(ManagedObject):
 
 class FileManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class Folder(ManagedEntity):
     _valid_attrs = set(['childEntity', 'childType'])
-    def __init__(self, mo_ref, client):
-        ManagedEntity.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedEntity._valid_attrs)
+    __slots__ = ()
     @cached_property
     def childEntity(self):
        return self._get_mor("childEntity", True)
@@ -509,23 +475,17 @@ class Folder(ManagedEntity):
 
 class GuestAuthManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class GuestFileManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class GuestOperationsManager(ManagedObject):
     _valid_attrs = set(['authManager', 'fileManager', 'processManager'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def authManager(self):
        return self._get_mor("authManager", False)
@@ -539,15 +499,11 @@ class GuestOperationsManager(ManagedObject):
 
 class GuestProcessManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 class HostAuthenticationStore(ManagedObject):
     _valid_attrs = set(['info'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def info(self):
        return self._get_dataobject("info", False)
@@ -555,23 +511,17 @@ class HostAuthenticationStore(ManagedObject):
 
 class HostDirectoryStore(HostAuthenticationStore):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        HostAuthenticationStore.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, HostAuthenticationStore._valid_attrs)
+    __slots__ = ()
 
 
 class HostActiveDirectoryAuthentication(HostDirectoryStore):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        HostDirectoryStore.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, HostDirectoryStore._valid_attrs)
+    __slots__ = ()
 
 
 class HostAuthenticationManager(ManagedObject):
     _valid_attrs = set(['info', 'supportedStore'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def info(self):
        return self._get_dataobject("info", False)
@@ -582,9 +532,7 @@ class HostAuthenticationManager(ManagedObject):
 
 class HostAutoStartManager(ManagedObject):
     _valid_attrs = set(['config'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def config(self):
        return self._get_dataobject("config", False)
@@ -592,24 +540,18 @@ class HostAutoStartManager(ManagedObject):
 
 class HostBootDeviceSystem(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 class HostCacheConfigurationManager(ManagedObject):
     _valid_attrs = set(['cacheConfigurationInfo'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def cacheConfigurationInfo(self):
        return self._get_dataobject("cacheConfigurationInfo", True)
 
 class HostCpuSchedulerSystem(ExtensibleManagedObject):
     _valid_attrs = set(['hyperthreadInfo'])
-    def __init__(self, mo_ref, client):
-        ExtensibleManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ExtensibleManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def hyperthreadInfo(self):
        return self._get_dataobject("hyperthreadInfo", False)
@@ -617,9 +559,7 @@ class HostCpuSchedulerSystem(ExtensibleManagedObject):
 
 class HostDatastoreBrowser(ManagedObject):
     _valid_attrs = set(['datastore', 'supportedType'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def datastore(self):
        return self._get_mor("datastore", True)
@@ -630,9 +570,7 @@ class HostDatastoreBrowser(ManagedObject):
 
 class HostDatastoreSystem(ManagedObject):
     _valid_attrs = set(['capabilities', 'datastore'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def capabilities(self):
        return self._get_dataobject("capabilities", False)
@@ -643,9 +581,7 @@ class HostDatastoreSystem(ManagedObject):
 
 class HostDateTimeSystem(ManagedObject):
     _valid_attrs = set(['dateTimeInfo'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def dateTimeInfo(self):
        return self._get_dataobject("dateTimeInfo", False)
@@ -653,27 +589,21 @@ class HostDateTimeSystem(ManagedObject):
 
 class HostDiagnosticSystem(ManagedObject):
     _valid_attrs = set(['activePartition'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def activePartition(self):
        return self._get_dataobject("activePartition", False)
 
 class HostEsxAgentHostManager(ManagedObject):
     _valid_attrs = set(['configInfo'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def configInfo(self):
        return self._get_dataobject("configInfo", False)
 
 class HostFirewallSystem(ExtensibleManagedObject):
     _valid_attrs = set(['firewallInfo'])
-    def __init__(self, mo_ref, client):
-        ExtensibleManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ExtensibleManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def firewallInfo(self):
        return self._get_dataobject("firewallInfo", False)
@@ -681,52 +611,38 @@ class HostFirewallSystem(ExtensibleManagedObject):
 
 class HostFirmwareSystem(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class HostHealthStatusSystem(ManagedObject):
     _valid_attrs = set(['runtime'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def runtime(self):
        return self._get_dataobject("runtime", False)
 
 class HostImageConfigManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 class HostKernelModuleSystem(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class HostLocalAccountManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class HostLocalAuthentication(HostAuthenticationStore):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        HostAuthenticationStore.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, HostAuthenticationStore._valid_attrs)
+    __slots__ = ()
 
 
 class HostMemorySystem(ExtensibleManagedObject):
     _valid_attrs = set(['consoleReservationInfo', 'virtualMachineReservationInfo'])
-    def __init__(self, mo_ref, client):
-        ExtensibleManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ExtensibleManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def consoleReservationInfo(self):
        return self._get_dataobject("consoleReservationInfo", False)
@@ -737,9 +653,7 @@ class HostMemorySystem(ExtensibleManagedObject):
 
 class HostNetworkSystem(ExtensibleManagedObject):
     _valid_attrs = set(['capabilities', 'consoleIpRouteConfig', 'dnsConfig', 'ipRouteConfig', 'networkConfig', 'networkInfo', 'offloadCapabilities'])
-    def __init__(self, mo_ref, client):
-        ExtensibleManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ExtensibleManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def capabilities(self):
        return self._get_dataobject("capabilities", False)
@@ -765,16 +679,12 @@ class HostNetworkSystem(ExtensibleManagedObject):
 
 class HostPatchManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class HostPciPassthruSystem(ExtensibleManagedObject):
     _valid_attrs = set(['pciPassthruInfo'])
-    def __init__(self, mo_ref, client):
-        ExtensibleManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ExtensibleManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def pciPassthruInfo(self):
        return self._get_dataobject("pciPassthruInfo", True)
@@ -782,9 +692,7 @@ class HostPciPassthruSystem(ExtensibleManagedObject):
 
 class HostPowerSystem(ManagedObject):
     _valid_attrs = set(['capability', 'info'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def capability(self):
        return self._get_dataobject("capability", False)
@@ -795,9 +703,7 @@ class HostPowerSystem(ManagedObject):
 
 class HostProfile(Profile):
     _valid_attrs = set(['referenceHost'])
-    def __init__(self, mo_ref, client):
-        Profile.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, Profile._valid_attrs)
+    __slots__ = ()
     @cached_property
     def referenceHost(self):
        return self._get_mor("referenceHost", False)
@@ -805,16 +711,12 @@ class HostProfile(Profile):
 
 class HostProfileManager(ProfileManager):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ProfileManager.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ProfileManager._valid_attrs)
+    __slots__ = ()
 
 
 class HostServiceSystem(ExtensibleManagedObject):
     _valid_attrs = set(['serviceInfo'])
-    def __init__(self, mo_ref, client):
-        ExtensibleManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ExtensibleManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def serviceInfo(self):
        return self._get_dataobject("serviceInfo", False)
@@ -822,9 +724,7 @@ class HostServiceSystem(ExtensibleManagedObject):
 
 class HostSnmpSystem(ManagedObject):
     _valid_attrs = set(['configuration', 'limits'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def configuration(self):
        return self._get_dataobject("configuration", False)
@@ -835,9 +735,7 @@ class HostSnmpSystem(ManagedObject):
 
 class HostStorageSystem(ExtensibleManagedObject):
     _valid_attrs = set(['fileSystemVolumeInfo', 'multipathStateInfo', 'storageDeviceInfo', 'systemFile'])
-    def __init__(self, mo_ref, client):
-        ExtensibleManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ExtensibleManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def fileSystemVolumeInfo(self):
        return self._get_dataobject("fileSystemVolumeInfo", False)
@@ -854,9 +752,7 @@ class HostStorageSystem(ExtensibleManagedObject):
 
 class HostSystem(ManagedEntity):
     _valid_attrs = set(['capability', 'config', 'configManager', 'datastore', 'datastoreBrowser', 'hardware', 'licensableResource', 'network', 'runtime', 'summary', 'systemResources', 'vm'])
-    def __init__(self, mo_ref, client):
-        ManagedEntity.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedEntity._valid_attrs)
+    __slots__ = ()
     @cached_property
     def capability(self):
        return self._get_dataobject("capability", False)
@@ -897,9 +793,7 @@ class HostSystem(ManagedEntity):
 
 class HostVirtualNicManager(ExtensibleManagedObject):
     _valid_attrs = set(['info'])
-    def __init__(self, mo_ref, client):
-        ExtensibleManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ExtensibleManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def info(self):
        return self._get_dataobject("info", False)
@@ -907,9 +801,7 @@ class HostVirtualNicManager(ExtensibleManagedObject):
 
 class HostVMotionSystem(ExtensibleManagedObject):
     _valid_attrs = set(['ipConfig', 'netConfig'])
-    def __init__(self, mo_ref, client):
-        ExtensibleManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ExtensibleManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def ipConfig(self):
        return self._get_dataobject("ipConfig", False)
@@ -920,9 +812,7 @@ class HostVMotionSystem(ExtensibleManagedObject):
 
 class HttpNfcLease(ManagedObject):
     _valid_attrs = set(['error', 'info', 'initializeProgress', 'state'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def error(self):
        return self._get_dataobject("error", False)
@@ -939,35 +829,25 @@ class HttpNfcLease(ManagedObject):
 
 class InventoryView(ManagedObjectView):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObjectView.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObjectView._valid_attrs)
+    __slots__ = ()
 
 
 class IpPoolManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 class IscsiManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 class LicenseAssignmentManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class LicenseManager(ManagedObject):
     _valid_attrs = set(['diagnostics', 'evaluation', 'featureInfo', 'licenseAssignmentManager', 'licensedEdition', 'licenses', 'source', 'sourceAvailable'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def diagnostics(self):
        return self._get_dataobject("diagnostics", False)
@@ -996,16 +876,12 @@ class LicenseManager(ManagedObject):
 
 class ListView(ManagedObjectView):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObjectView.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObjectView._valid_attrs)
+    __slots__ = ()
 
 
 class LocalizationManager(ManagedObject):
     _valid_attrs = set(['catalog'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def catalog(self):
        return self._get_dataobject("catalog", True)
@@ -1013,9 +889,7 @@ class LocalizationManager(ManagedObject):
 
 class OptionManager(ManagedObject):
     _valid_attrs = set(['setting', 'supportedOption'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def setting(self):
        return self._get_dataobject("setting", True)
@@ -1026,16 +900,12 @@ class OptionManager(ManagedObject):
 
 class OvfManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class PerformanceManager(ManagedObject):
     _valid_attrs = set(['description', 'historicalInterval', 'perfCounter'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def description(self):
        return self._get_dataobject("description", False)
@@ -1049,16 +919,12 @@ class PerformanceManager(ManagedObject):
 
 class ProfileComplianceManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class PropertyCollector(ManagedObject):
     _valid_attrs = set(['filter'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def filter(self):
        return self._get_mor("filter", True)
@@ -1066,9 +932,7 @@ class PropertyCollector(ManagedObject):
 
 class PropertyFilter(ManagedObject):
     _valid_attrs = set(['partialUpdates', 'spec'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def partialUpdates(self):
        return self._get_dataobject("partialUpdates", False)
@@ -1079,16 +943,12 @@ class PropertyFilter(ManagedObject):
 
 class ResourcePlanningManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class ResourcePool(ManagedEntity):
     _valid_attrs = set(['childConfiguration', 'config', 'owner', 'resourcePool', 'runtime', 'summary', 'vm'])
-    def __init__(self, mo_ref, client):
-        ManagedEntity.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedEntity._valid_attrs)
+    __slots__ = ()
     @cached_property
     def childConfiguration(self):
        return self._get_dataobject("childConfiguration", True)
@@ -1114,9 +974,7 @@ class ResourcePool(ManagedEntity):
 
 class ScheduledTask(ExtensibleManagedObject):
     _valid_attrs = set(['info'])
-    def __init__(self, mo_ref, client):
-        ExtensibleManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ExtensibleManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def info(self):
        return self._get_dataobject("info", False)
@@ -1124,9 +982,7 @@ class ScheduledTask(ExtensibleManagedObject):
 
 class ScheduledTaskManager(ManagedObject):
     _valid_attrs = set(['description', 'scheduledTask'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def description(self):
        return self._get_dataobject("description", False)
@@ -1137,16 +993,12 @@ class ScheduledTaskManager(ManagedObject):
 
 class SearchIndex(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class ServiceInstance(ManagedObject):
     _valid_attrs = set(['capability', 'content', 'serverClock'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def capability(self):
        return self._get_dataobject("capability", False)
@@ -1160,9 +1012,7 @@ class ServiceInstance(ManagedObject):
 
 class SessionManager(ManagedObject):
     _valid_attrs = set(['currentSession', 'defaultLocale', 'message', 'messageLocaleList', 'sessionList', 'supportedLocaleList'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def currentSession(self):
        return self._get_dataobject("currentSession", False)
@@ -1184,9 +1034,7 @@ class SessionManager(ManagedObject):
 
 class StoragePod(Folder):
     _valid_attrs = set(['podStorageDrsEntry', 'summary'])
-    def __init__(self, mo_ref, client):
-        Folder.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, Folder._valid_attrs)
+    __slots__ = ()
     @cached_property
     def podStorageDrsEntry(self):
        return self._get_dataobject("podStorageDrsEntry", False)
@@ -1196,16 +1044,12 @@ class StoragePod(Folder):
 
 class StorageResourceManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class Task(ExtensibleManagedObject):
     _valid_attrs = set(['info'])
-    def __init__(self, mo_ref, client):
-        ExtensibleManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ExtensibleManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def info(self):
        return self._get_dataobject("info", False)
@@ -1213,9 +1057,7 @@ class Task(ExtensibleManagedObject):
 
 class TaskHistoryCollector(HistoryCollector):
     _valid_attrs = set(['latestPage'])
-    def __init__(self, mo_ref, client):
-        HistoryCollector.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, HistoryCollector._valid_attrs)
+    __slots__ = ()
     @cached_property
     def latestPage(self):
        return self._get_dataobject("latestPage", True)
@@ -1223,9 +1065,7 @@ class TaskHistoryCollector(HistoryCollector):
 
 class TaskManager(ManagedObject):
     _valid_attrs = set(['description', 'maxCollector', 'recentTask'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def description(self):
        return self._get_dataobject("description", False)
@@ -1239,9 +1079,7 @@ class TaskManager(ManagedObject):
 
 class UserDirectory(ManagedObject):
     _valid_attrs = set(['domainList'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def domainList(self):
        return self._get_dataobject("domainList", True)
@@ -1249,9 +1087,7 @@ class UserDirectory(ManagedObject):
 
 class ViewManager(ManagedObject):
     _valid_attrs = set(['viewList'])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def viewList(self):
        return self._get_mor("viewList", True)
@@ -1259,9 +1095,7 @@ class ViewManager(ManagedObject):
 
 class VirtualApp(ResourcePool):
     _valid_attrs = set(['childLink', 'datastore', 'network', 'parentFolder', 'parentVApp', 'vAppConfig'])
-    def __init__(self, mo_ref, client):
-        ResourcePool.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ResourcePool._valid_attrs)
+    __slots__ = ()
     @cached_property
     def childLink(self):
        return self._get_dataobject("childLink", True)
@@ -1284,23 +1118,17 @@ class VirtualApp(ResourcePool):
 
 class VirtualDiskManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class VirtualizationManager(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class VirtualMachine(ManagedEntity):
     _valid_attrs = set(['capability', 'config', 'datastore', 'environmentBrowser', 'guest', 'guestHeartbeatStatus', 'layout', 'layoutEx', 'network', 'parentVApp', 'resourceConfig', 'resourcePool', 'rootSnapshot', 'runtime', 'snapshot', 'storage', 'summary'])
-    def __init__(self, mo_ref, client):
-        ManagedEntity.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedEntity._valid_attrs)
+    __slots__ = ()
     @cached_property
     def capability(self):
        return self._get_dataobject("capability", False)
@@ -1356,23 +1184,17 @@ class VirtualMachine(ManagedEntity):
 
 class VirtualMachineCompatibilityChecker(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class VirtualMachineProvisioningChecker(ManagedObject):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        ManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ManagedObject._valid_attrs)
+    __slots__ = ()
 
 
 class VirtualMachineSnapshot(ExtensibleManagedObject):
     _valid_attrs = set(['childSnapshot', 'config'])
-    def __init__(self, mo_ref, client):
-        ExtensibleManagedObject.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, ExtensibleManagedObject._valid_attrs)
+    __slots__ = ()
     @cached_property
     def childSnapshot(self):
        return self._get_mor("childSnapshot", True)
@@ -1383,9 +1205,7 @@ class VirtualMachineSnapshot(ExtensibleManagedObject):
 
 class VmwareDistributedVirtualSwitch(DistributedVirtualSwitch):
     _valid_attrs = set([])
-    def __init__(self, mo_ref, client):
-        DistributedVirtualSwitch.__init__(self, mo_ref, client)
-        self._valid_attrs = set.union(self._valid_attrs, DistributedVirtualSwitch._valid_attrs)
+    __slots__ = ()
 
 
 classmap = dict((x.__name__, x) for x in (
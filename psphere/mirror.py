@@ -0,0 +1,376 @@
+"""
+:mod:`psphere.mirror` - An incrementally updated copy of the inventory
+======================================================================
+
+.. module:: mirror
+
+Polling the inventory with RetrieveProperties transfers every selected
+property of every object on each poll, even when almost nothing has
+changed. An :class:`InventoryMirror` instead registers a PropertyFilter
+with the server once and then asks WaitForUpdatesEx for the changes since
+the last version it saw, applying them to an in-memory copy of the
+selected properties. Views handed out by the mirror read their properties
+from that copy without contacting the server.
+
+>>> mirror = InventoryMirror(client, {"VirtualMachine": ["name", "runtime"]})
+>>> mirror.start()
+>>> while True:
+...     mirror.update(timeout=60)
+...     for vm in mirror.views("VirtualMachine"):
+...         print(vm.name, vm.runtime.powerState)
+
+"""
+
+# Copyright 2010 Jonathan Kinred
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+
+import suds
+
+from psphere import ManagedObject
+from psphere.managedobjects import classmapper
+
+logger = logging.getLogger(__name__)
+
+
+def _key(mo_ref):
+    """A hashable key for a ManagedObjectReference or psphere object."""
+    if isinstance(mo_ref, ManagedObject):
+        mo_ref = mo_ref._mo_ref
+    return (str(mo_ref._type), str(mo_ref.value))
+
+
+def _unwrap(value):
+    # Array* values contain a single item which is the real list, see
+    # ManagedObject._set_view_data
+    if value.__class__.__name__.startswith('Array'):
+        return value[0]
+    return value
+
+
+def is_fault(error, fault_type):
+    """Check whether a suds.WebFault was caused by a type of vSphere fault.
+
+    :param error: The exception raised by suds.
+    :type error: suds.WebFault
+    :param fault_type: The name of the fault, e.g. InvalidCollectorVersion.
+    :type fault_type: str
+    :rtype: bool
+
+    """
+    detail = getattr(error.fault, "detail", None)
+    if detail is None:
+        return False
+    for name, value in detail:
+        if (name == fault_type + "Fault" or
+                value.__class__.__name__ == fault_type):
+            return True
+    return False
+
+
+class InventoryMirror(object):
+    """An in-memory copy of selected properties of the inventory.
+
+    Call :meth:`start` to create the filter and load the initial copy,
+    then call :meth:`update` periodically (or in a loop with a timeout) to
+    apply the changes made on the server since the last call.
+
+    The mirror uses a property collector of its own, so it doesn't
+    interfere with other users of the session's property collector.
+
+    :param client: The client to mirror the inventory of.
+    :type client: Client
+    :param properties: The properties to mirror, keyed by the type of \
+    entity, e.g. {"VirtualMachine": ["name", "runtime"]}. Nested \
+    properties such as "runtime.powerState" can be mirrored but are only \
+    available from :meth:`get`, not as attributes of the views.
+    :type properties: dict
+    :param begin_entity: The entity to mirror the inventory below. The \
+    default is the root folder.
+    :type begin_entity: ManagedObjectReference or None
+
+    """
+    def __init__(self, client, properties, begin_entity=None):
+        self.client = client
+        self.properties = properties
+        self.begin_entity = begin_entity
+        self.version = None
+        self._collector = None
+        self._filter = None
+        self._objects = {}
+        self._mo_refs = {}
+        self._views = {}
+
+    def _filter_spec(self):
+        property_specs = []
+        for view_type, paths in self.properties.items():
+            property_spec = self.client.create('PropertySpec')
+            property_spec.type = view_type
+            property_spec.all = False
+            property_spec.pathSet = list(paths)
+            property_specs.append(property_spec)
+
+        begin_entity = self.begin_entity
+        if not begin_entity:
+            begin_entity = self.client.sc.rootFolder._mo_ref
+        pfs = self.client.get_search_filter_spec(begin_entity,
+                                                 property_specs[0])
+        pfs.propSet = property_specs
+        return pfs
+
+    def start(self):
+        """Create the filter on the server and load the initial copy."""
+        if self._collector is not None:
+            return
+        logger.debug("Creating property collector for inventory mirror")
+        pc = self.client.sc.propertyCollector
+        self._collector = pc.CreatePropertyCollector()
+        self._filter = self._collector.CreateFilter(spec=self._filter_spec(),
+                                                    partialUpdates=True)
+        self.version = None
+        self.update()
+
+    def stop(self):
+        """Destroy the filter on the server. The copy is kept."""
+        if self._collector is None:
+            return
+        try:
+            self._collector.DestroyPropertyCollector()
+        except Exception:
+            logger.warning("Failed to destroy property collector",
+                           exc_info=True)
+        self._collector = None
+        self._filter = None
+
+    def resync(self):
+        """Discard the copy and load it again from the server."""
+        logger.info("Resynchronising inventory mirror")
+        self.stop()
+        self._objects.clear()
+        self._mo_refs.clear()
+        self._views.clear()
+        self.start()
+
+    def update(self, timeout=0):
+        """Apply the changes made on the server since the last update.
+
+        :param timeout: The number of seconds to wait for a change if \
+        there aren't any yet, or None to wait until there is one. This \
+        must be shorter than the client's timeout.
+        :type timeout: int or None
+        :returns: The number of objects which entered, changed or left.
+        :rtype: int
+
+        """
+        if self._collector is None:
+            raise RuntimeError("The mirror has not been started")
+
+        options = self.client.create('WaitOptions')
+        options.maxWaitSeconds = timeout
+        changed = 0
+        while True:
+            try:
+                update_set = self._collector.WaitForUpdatesEx(
+                    version=self.version or "", options=options)
+            except suds.WebFault as e:
+                if not is_fault(e, "InvalidCollectorVersion"):
+                    raise
+                logger.warning("Mirror version %s is no longer valid",
+                               self.version)
+                self.resync()
+                return len(self._objects)
+            if update_set is None:
+                # Timed out without any changes
+                break
+
+            refetch = {}
+            for filter_update in getattr(update_set, "filterSet", []):
+                for object_update in getattr(filter_update, "objectSet", []):
+                    self._apply(object_update, refetch)
+                    changed += 1
+            self._refetch(refetch)
+            self.version = update_set.version
+
+            if not getattr(update_set, "truncated", False):
+                break
+            # The rest of the changes are available straight away
+            options.maxWaitSeconds = 0
+        logger.debug("Inventory mirror at version %s, %s objects changed",
+                     self.version, changed)
+        return changed
+
+    def _apply(self, object_update, refetch):
+        key = _key(object_update.obj)
+        kind = str(object_update.kind)
+        if kind == "leave":
+            self._objects.pop(key, None)
+            self._mo_refs.pop(key, None)
+            self._views.pop(key, None)
+            return
+
+        if kind == "enter":
+            self._objects[key] = {}
+            self._mo_refs[key] = object_update.obj._mo_ref
+        props = self._objects.setdefault(key, {})
+        updated = set()
+        for change in getattr(object_update, "changeSet", []):
+            name = str(change.name)
+            op = str(change.op)
+            value = _unwrap(getattr(change, "val", None))
+            if name in props or ("." not in name and "[" not in name):
+                if op in ("remove", "indirectRemove"):
+                    props.pop(name, None)
+                else:
+                    props[name] = value
+                updated.add(name)
+                continue
+
+            # A partial update of a property we hold, e.g. runtime.powerState
+            # when runtime is mirrored
+            prop = self._enclosing(props, name)
+            if prop is None:
+                props[name] = value
+                updated.add(name)
+            elif "[" in name or not self._assign(props, prop, name, op,
+                                                 value):
+                # Changes to elements of arrays can't be applied in place,
+                # so get the whole property again
+                refetch.setdefault(key, (object_update.obj, set()))[1].add(
+                    prop)
+            else:
+                updated.add(prop)
+
+        view = self._views.get(key)
+        if view is not None:
+            self._update_view(view, props, updated)
+
+    def _enclosing(self, props, name):
+        """Find the mirrored property which contains a nested property."""
+        parts = name.split(".")
+        for i in range(len(parts) - 1, 0, -1):
+            prop = ".".join(parts[:i])
+            if prop in props:
+                return prop
+        return None
+
+    def _assign(self, props, prop, name, op, value):
+        obj = props[prop]
+        parts = name[len(prop) + 1:].split(".")
+        try:
+            for part in parts[:-1]:
+                obj = getattr(obj, part)
+            if op in ("remove", "indirectRemove"):
+                value = None
+            setattr(obj, parts[-1], value)
+        except (AttributeError, TypeError):
+            return False
+        return True
+
+    def _refetch(self, refetch):
+        if not refetch:
+            return
+        pfs_list = []
+        for key, (obj, names) in refetch.items():
+            logger.debug("Retrieving %s of %s again", ", ".join(names), key)
+            property_spec = self.client.create('PropertySpec')
+            property_spec.type = key[0]
+            property_spec.all = False
+            property_spec.pathSet = sorted(names)
+            object_spec = self.client.create('ObjectSpec')
+            object_spec.obj = obj._mo_ref
+            pfs = self.client.create('PropertyFilterSpec')
+            pfs.propSet = [property_spec]
+            pfs.objectSet = [object_spec]
+            pfs_list.append(pfs)
+
+        pc = self.client.sc.propertyCollector
+        for object_content in pc.RetrieveProperties(specSet=pfs_list) or []:
+            key = _key(object_content.obj)
+            props = self._objects.get(key)
+            if props is None:
+                continue
+            updated = set()
+            for dynprop in getattr(object_content, "propSet", []):
+                props[dynprop.name] = _unwrap(dynprop.val)
+                updated.add(dynprop.name)
+            view = self._views.get(key)
+            if view is not None:
+                self._update_view(view, props, updated)
+
+    def _update_view(self, view, props, names):
+        for name in names:
+            if name in props and name in view._valid_attrs:
+                view._set_cached(name, props[name])
+            else:
+                view.flush_cache([name])
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __contains__(self, mo_ref):
+        return _key(mo_ref) in self._objects
+
+    def get(self, mo_ref, name):
+        """Get the mirrored value of a property.
+
+        :param mo_ref: The object to get the property of.
+        :type mo_ref: ManagedObjectReference or ManagedObject
+        :param name: The name of the property.
+        :type name: str
+        :raises: KeyError if the object or property isn't mirrored.
+
+        """
+        return self._objects[_key(mo_ref)][name]
+
+    def view(self, mo_ref):
+        """Get a view of a mirrored object.
+
+        The view's properties are kept up to date by :meth:`update` and
+        reading them never contacts the server, unless a property which
+        isn't mirrored is used.
+
+        :param mo_ref: The object to get a view of.
+        :type mo_ref: ManagedObjectReference or ManagedObject
+        :rtype: ManagedObject
+        :raises: KeyError if the object isn't mirrored.
+
+        """
+        key = _key(mo_ref)
+        try:
+            return self._views[key]
+        except KeyError:
+            props = self._objects[key]
+        view = self.client._mor_to_pobject(self._mo_refs[key])
+        view._mirror = self
+        self._update_view(view, props, props.keys())
+        self._views[key] = view
+        return view
+
+    def views(self, view_type=None):
+        """Get views of every mirrored object, optionally of one type.
+
+        :param view_type: The type of the objects, including subtypes.
+        :type view_type: str or None
+        :rtype: list
+
+        """
+        kls = classmapper(view_type) if view_type else ManagedObject
+        result = []
+        for key, mo_ref in list(self._mo_refs.items()):
+            if issubclass(classmapper(key[0]), kls):
+                result.append(self.view(mo_ref))
+        return result
@@ -0,0 +1,270 @@
+"""
+:mod:`psphere.pool` - A pool of cloned sessions
+===============================================
+
+.. module:: pool
+
+A single session handles one call at a time on the server, so bulk jobs
+are faster with several sessions working in parallel. Logging in each of
+them with the password is slow and fills the server's event log, so a
+:class:`ClientPool` logs in once and creates the other sessions as they're
+needed by cloning the first with SessionManager.AcquireCloneTicket and
+CloneSession. Sessions are handed out to one thread at a time and reused
+once they are returned.
+
+>>> pool = ClientPool(server="vcenter", username="me", password="pass",
+...                   size=8)
+>>> def power_on(client, name):
+...     vm = VirtualMachine.get(client, name=name)
+...     return client.invoke_task("PowerOnVM_Task", _this=vm)
+>>> tasks = pool.map(power_on, names)
+>>> pool.close()
+
+To use a session from another process, pass a clone ticket to
+``Client(clone_ticket=...)`` in that process:
+
+>>> ticket = pool.client.sc.sessionManager.AcquireCloneTicket()
+
+"""
+
+# Copyright 2010 Jonathan Kinred
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
+
+import suds
+
+from psphere.client import Client
+from psphere.mirror import is_fault
+
+logger = logging.getLogger(__name__)
+
+
+class ClientPool(object):
+    """A pool of clients with sessions cloned from one login.
+
+    :param server: The server to connect to, as for :class:`Client`.
+    :type server: str
+    :param username: The username to log in with.
+    :type username: str
+    :param password: The password to log in with.
+    :type password: str
+    :param size: The largest number of sessions, including the one \
+    which logged in.
+    :type size: int (default=4)
+    :param kwargs: Other options of :class:`Client`, used for every \
+    session.
+
+    """
+    def __init__(self, server=None, username=None, password=None, size=4,
+                 **kwargs):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        # The client which logged in, the others are cloned from it
+        self.client = Client(server, username, password, **kwargs)
+        self._clients = [self.client]
+        self._idle = [self.client]
+        # The number of clients being cloned
+        self._pending = 0
+        self._closed = False
+        self._lock = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """Take a client from the pool, cloning a session if none is idle.
+
+        The client must be given back with :meth:`release`.
+
+        :param timeout: The longest to wait for a client when the pool \
+        is at its size, or None to wait for as long as it takes.
+        :type timeout: float or None
+        :returns: A logged in client.
+        :rtype: Client
+        :raises: RuntimeError if the pool is closed or no client became \
+        free within the timeout.
+
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise RuntimeError("The pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if len(self._clients) + self._pending < self.size:
+                    self._pending += 1
+                    break
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise RuntimeError("No client became free within "
+                                           "%s seconds" % timeout)
+                self._lock.wait(remaining)
+
+        # Clone outside of the lock so that clients can be returned and
+        # taken meanwhile
+        client = None
+        try:
+            logger.debug("Cloning a session for the pool")
+            client = self.client.clone()
+        finally:
+            with self._lock:
+                self._pending -= 1
+                if client is not None:
+                    self._clients.append(client)
+                self._lock.notify()
+        return client
+
+    def release(self, client, discard=False):
+        """Give a client back to the pool.
+
+        :param client: A client from :meth:`acquire`.
+        :type client: Client
+        :param discard: Log the client out rather than reuse it, e.g. \
+        because its session has expired. The client which logged in is \
+        kept, and logged in again if its session has expired.
+        :type discard: bool (default=False)
+        :raises: The error of logging the pool's client in again, which \
+        stays in the pool to be tried again on its next release.
+
+        """
+        with self._lock:
+            reuse = client._logged_in and not (discard or self._closed)
+            if reuse:
+                self._idle.append(client)
+            elif client is not self.client or self._closed:
+                self._clients.remove(client)
+            self._lock.notify()
+        if reuse:
+            return
+        if client is self.client and not self._closed:
+            # The other sessions are cloned from this one, so it has to
+            # stay usable
+            if not (client._logged_in and self._has_session(client)):
+                logger.warning("Logging in to the pool's session again")
+                try:
+                    client.login()
+                except Exception:
+                    # Keep the client in the pool, the login is tried
+                    # again the next time it's released
+                    with self._lock:
+                        self._idle.append(client)
+                        self._lock.notify()
+                    raise
+            self.release(client)
+            return
+        self._logout(client)
+
+    @contextmanager
+    def session(self, timeout=None):
+        """Use a client from the pool for the duration of a with block.
+
+        >>> with pool.session() as client:
+        ...     vm = client.find_entity_view("VirtualMachine",
+        ...                                  filter={"name": "vm1"})
+
+        The client is given back afterwards, or discarded if its session
+        was no longer authenticated.
+
+        """
+        client = self.acquire(timeout)
+        discard = False
+        try:
+            yield client
+        except suds.WebFault as e:
+            discard = is_fault(e, "NotAuthenticated")
+            raise
+        finally:
+            self.release(client, discard=discard)
+
+    def map(self, func, items, concurrency=None):
+        """Call a function for each item with a client from the pool.
+
+        The calls are made by a number of threads at a time, each with a
+        client of its own. Views belong to the client which created them,
+        so pass MORs or names as the items rather than views.
+
+        >>> pool.map(lambda client, mo_ref: client.invoke(
+        ...     "ReconfigVM_Task", _this=mo_ref, spec=spec),
+        ...     [vm._mo_ref for vm in vms])
+
+        :param func: Called as func(client, item).
+        :type func: callable
+        :param items: The items to call the function for.
+        :type items: iterable
+        :param concurrency: The number of calls to make at a time. The \
+        default is the size of the pool.
+        :type concurrency: int or None
+        :returns: The results of the calls, in the order of the items.
+        :rtype: list
+        :raises: The first exception raised by a call.
+
+        """
+        if concurrency is None:
+            concurrency = self.size
+        items = list(items)
+        if not items:
+            return []
+
+        def call(item):
+            with self.session() as client:
+                return func(client, item)
+
+        threads = ThreadPool(min(concurrency, len(items)))
+        try:
+            return threads.map(call, items, chunksize=1)
+        finally:
+            threads.close()
+            threads.join()
+
+    def close(self):
+        """Log out every session, once the clients in use are released."""
+        with self._lock:
+            self._closed = True
+            clients, self._idle = self._idle, []
+            for client in clients:
+                self._clients.remove(client)
+            self._lock.notify_all()
+        for client in clients:
+            self._logout(client)
+
+    def _has_session(self, client):
+        """Check whether a client's session is still authenticated."""
+        try:
+            values = client.sc.sessionManager.update_view_data(
+                properties=["currentSession"])
+        except suds.WebFault as e:
+            logger.debug("Failed to retrieve the current session: %s", e)
+            return False
+        return values.get("currentSession") is not None
+
+    def _logout(self, client):
+        try:
+            client.logout()
+        except Exception:
+            logger.warning("Failed to log out of a pooled session",
+                           exc_info=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
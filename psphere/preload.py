@@ -0,0 +1,215 @@
+"""
+:mod:`psphere.preload` - Loading properties of related objects together
+=======================================================================
+
+.. module:: preload
+
+Compiles a nested preload specification into a single PropertyFilterSpec
+whose TraversalSpecs follow the named references, so that a tree of
+related views can be loaded with one RetrieveProperties call.
+
+A specification maps the name of a reference property to the properties
+to load on the objects it refers to. Those can be a list, or a dict with
+the list under "props" and further references as the other keys:
+
+>>> ccr.preload({"host": {"props": ["name"],
+...                       "vm": ["name", "runtime"]}})
+
+The type of the objects a reference refers to is looked up in
+:data:`REFERENCE_TYPES`. It can be given with a "type" key for
+references which aren't listed there.
+
+"""
+
+# Copyright 2010 Jonathan Kinred
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from __future__ import absolute_import, division, print_function
+
+import itertools
+import logging
+
+from psphere.managedobjects import classmap, classmapper
+
+logger = logging.getLogger(__name__)
+
+# The type of object referred to by each reference property of the
+# inventory, keyed by the class which defines the property.
+REFERENCE_TYPES = {
+    ("ComputeResource", "datastore"): "Datastore",
+    ("ComputeResource", "environmentBrowser"): "EnvironmentBrowser",
+    ("ComputeResource", "host"): "HostSystem",
+    ("ComputeResource", "network"): "Network",
+    ("ComputeResource", "resourcePool"): "ResourcePool",
+    ("Datacenter", "datastore"): "Datastore",
+    ("Datacenter", "datastoreFolder"): "Folder",
+    ("Datacenter", "hostFolder"): "Folder",
+    ("Datacenter", "network"): "Network",
+    ("Datacenter", "networkFolder"): "Folder",
+    ("Datacenter", "vmFolder"): "Folder",
+    ("Datastore", "browser"): "HostDatastoreBrowser",
+    ("Datastore", "vm"): "VirtualMachine",
+    ("DistributedVirtualSwitch", "portgroup"):
+        "DistributedVirtualPortgroup",
+    ("Folder", "childEntity"): "ManagedEntity",
+    ("HostSystem", "datastore"): "Datastore",
+    ("HostSystem", "datastoreBrowser"): "HostDatastoreBrowser",
+    ("HostSystem", "network"): "Network",
+    ("HostSystem", "vm"): "VirtualMachine",
+    ("ManagedEntity", "parent"): "ManagedEntity",
+    ("ManagedEntity", "recentTask"): "Task",
+    ("Network", "host"): "HostSystem",
+    ("Network", "vm"): "VirtualMachine",
+    ("ResourcePool", "owner"): "ComputeResource",
+    ("ResourcePool", "resourcePool"): "ResourcePool",
+    ("ResourcePool", "vm"): "VirtualMachine",
+    ("VirtualApp", "datastore"): "Datastore",
+    ("VirtualApp", "network"): "Network",
+    ("VirtualApp", "parentFolder"): "Folder",
+    ("VirtualApp", "parentVApp"): "ManagedEntity",
+    ("VirtualMachine", "datastore"): "Datastore",
+    ("VirtualMachine", "environmentBrowser"): "EnvironmentBrowser",
+    ("VirtualMachine", "network"): "Network",
+    ("VirtualMachine", "parentVApp"): "ManagedEntity",
+    ("VirtualMachine", "resourcePool"): "ResourcePool",
+    ("VirtualMachine", "rootSnapshot"): "VirtualMachineSnapshot",
+    ("VirtualMachineSnapshot", "childSnapshot"): "VirtualMachineSnapshot",
+}
+
+
+def _defining_classes(kls, name):
+    """Find the most general classes, kls or its subclasses, with a property.
+
+    A reference to a ManagedEntity can't be followed through "vm" for
+    example, but one to any of the subclasses which have "vm" can.
+
+    """
+    if name in kls._valid_attrs:
+        return [kls]
+    candidates = [cls for cls in classmap.values()
+                  if issubclass(cls, kls) and name in cls._valid_attrs]
+    return [cls for cls in candidates
+            if not any(base in candidates for base in cls.__mro__[1:])]
+
+
+def _reference_type(kls, name):
+    for cls in kls.__mro__:
+        try:
+            return classmapper(REFERENCE_TYPES[(cls.__name__, name)])
+        except KeyError:
+            pass
+    raise ValueError("The type of object %s.%s refers to isn't known, "
+                     "specify it with \"type\"" % (kls.__name__, name))
+
+
+def _parse(spec):
+    """Split one level of a specification into properties and references."""
+    if isinstance(spec, dict):
+        spec = dict(spec)
+        props = list(spec.pop("props", []))
+        type_ = spec.pop("type", None)
+        return props, type_, spec
+    return list(spec), None, {}
+
+
+class _Compiler(object):
+    def __init__(self, client):
+        self.client = client
+        self.paths = {}
+        self.names = ("preload_%s" % i for i in itertools.count())
+
+    def add_paths(self, kls, paths):
+        for path in paths:
+            # Views only cache whole properties, so nested properties such
+            # as runtime.powerState load the whole of runtime
+            path = path.split(".")[0]
+            for cls in _defining_classes(kls, path):
+                type_paths = self.paths.setdefault(cls.__name__, [])
+                if path not in type_paths:
+                    type_paths.append(path)
+
+    def traversals(self, kls, references):
+        """TraversalSpecs following each reference from objects of kls."""
+        self.add_paths(kls, references.keys())
+        select_set = []
+        for name, spec in sorted(references.items()):
+            props, type_, nested = _parse(spec)
+            for cls in _defining_classes(kls, name):
+                if type_ is None:
+                    target = _reference_type(cls, name)
+                else:
+                    target = classmapper(type_)
+                self.add_paths(target, props)
+                traversal = self.client.create('TraversalSpec')
+                traversal.name = next(self.names)
+                traversal.type = cls.__name__
+                traversal.path = name
+                traversal.skip = False
+                traversal.selectSet = self.traversals(target, nested)
+                select_set.append(traversal)
+        return select_set
+
+    def property_specs(self):
+        property_specs = []
+        for type_, paths in sorted(self.paths.items()):
+            property_spec = self.client.create('PropertySpec')
+            property_spec.type = type_
+            property_spec.all = False
+            property_spec.pathSet = paths
+            property_specs.append(property_spec)
+        return property_specs
+
+
+def preload_spec(client, view, spec):
+    """Compile a preload specification into a PropertyFilterSpec.
+
+    :param client: The client to create the spec with.
+    :type client: Client
+    :param view: The view at the root of the specification.
+    :type view: ManagedObject
+    :param spec: The specification, see the module documentation.
+    :type spec: dict
+    :rtype: PropertyFilterSpec
+
+    """
+    compiler = _Compiler(client)
+    object_spec = client.create('ObjectSpec')
+    object_spec.obj = view._mo_ref
+    object_spec.skip = False
+    object_spec.selectSet = compiler.traversals(view.__class__, spec)
+
+    pfs = client.create('PropertyFilterSpec')
+    pfs.propSet = compiler.property_specs()
+    pfs.objectSet = [object_spec]
+    return pfs
+
+
+def preload(view, spec):
+    """Load a tree of related views with a single RetrieveProperties.
+
+    :param view: The view at the root of the specification.
+    :type view: ManagedObject
+    :param spec: The specification, see the module documentation.
+    :type spec: dict
+
+    """
+    client = view._client
+    pfs = preload_spec(client, view, spec)
+    object_contents = client.sc.propertyCollector.RetrieveProperties(
+        specSet=pfs) or []
+    logger.debug("Preloaded %s objects", len(object_contents))
+    for object_content in object_contents:
+        # Thanks to the client's identity map these are the same views
+        # that the references in the tree resolve to
+        object_content.obj._set_view_data(object_content)
@@ -0,0 +1,224 @@
+"""
+:mod:`psphere.search` - Fast lookups of managed entities
+========================================================
+
+.. module:: search
+
+Finding an entity by traversing the inventory means retrieving every
+entity of the type, which gets slow when it is done repeatedly. This
+module holds the helpers the client uses to avoid that: a table of the
+filters which the server's SearchIndex can answer directly, an index of
+entity names kept on the client and the graph of traversals the
+searches follow, which can be narrowed to the parts of the inventory of
+interest.
+
+"""
+
+# Copyright 2010 Jonathan Kinred
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+import threading
+from collections import OrderedDict
+
+from psphere.managedobjects import classmapper
+from psphere.mirror import InventoryMirror
+
+logger = logging.getLogger(__name__)
+
+# Filters which a SearchIndex method can resolve, keyed by the entity type
+# and the filtered property. The values are the method, the name of the
+# argument which takes the filter value and any other arguments. The
+# SearchIndex methods don't all match on exactly the same thing as the
+# property (FindByIp matches any IP of the guest for example), so a match
+# must always be checked against the property itself.
+SEARCH_INDEX_FILTERS = {
+    ("VirtualMachine", "config.uuid"):
+        ("FindByUuid", "uuid", {"vmSearch": True}),
+    ("VirtualMachine", "config.instanceUuid"):
+        ("FindByUuid", "uuid", {"vmSearch": True, "instanceUuid": True}),
+    ("VirtualMachine", "guest.ipAddress"):
+        ("FindByIp", "ip", {"vmSearch": True}),
+    ("VirtualMachine", "guest.hostName"):
+        ("FindByDnsName", "dnsName", {"vmSearch": True}),
+    ("HostSystem", "hardware.systemInfo.uuid"):
+        ("FindByUuid", "uuid", {"vmSearch": False}),
+}
+
+
+# The ways Client searches can find entities, see Client(search_engine=...)
+SEARCH_ENGINES = ("traversal", "container_view")
+
+
+# The TraversalSpecs followed to search the inventory: their type, path
+# and the names of the traversals to follow from the objects they reach
+TRAVERSAL_SPECS = OrderedDict([
+    ("folder_traversal_spec",
+     ("Folder", "childEntity",
+      ["folder_traversal_spec", "datacenter_host_traversal_spec",
+       "datacenter_vm_traversal_spec", "compute_resource_rp_traversal_spec",
+       "compute_resource_host_traversal_spec", "host_vm_traversal_spec",
+       "resource_pool_vm_traversal_spec",
+       "datacenter_datastore_traversal_spec"])),
+    ("datacenter_vm_traversal_spec",
+     ("Datacenter", "vmFolder", ["folder_traversal_spec"])),
+    ("datacenter_host_traversal_spec",
+     ("Datacenter", "hostFolder", ["folder_traversal_spec"])),
+    ("compute_resource_host_traversal_spec",
+     ("ComputeResource", "host", [])),
+    ("compute_resource_rp_traversal_spec",
+     ("ComputeResource", "resourcePool",
+      ["resource_pool_traversal_spec", "resource_pool_vm_traversal_spec"])),
+    ("resource_pool_traversal_spec",
+     ("ResourcePool", "resourcePool",
+      ["resource_pool_traversal_spec", "resource_pool_vm_traversal_spec"])),
+    ("host_vm_traversal_spec",
+     ("HostSystem", "vm", ["folder_traversal_spec"])),
+    ("resource_pool_vm_traversal_spec", ("ResourcePool", "vm", [])),
+    ("datacenter_datastore_traversal_spec",
+     ("Datacenter", "datastoreFolder", ["folder_traversal_spec"])),
+])
+
+
+def traversal_names(begin_type, traversals=None):
+    """Find the traversals a search starting at an entity type can follow.
+
+    :param begin_type: The type of the entity the search starts at.
+    :type begin_type: str
+    :param traversals: The names of the traversals in \
+    :data:`TRAVERSAL_SPECS` which may be followed, or None for all of them.
+    :type traversals: list or None
+    :returns: The names, in the order of :data:`TRAVERSAL_SPECS`.
+    :rtype: list
+
+    """
+    allowed = set(TRAVERSAL_SPECS if traversals is None else traversals)
+    unknown = allowed.difference(TRAVERSAL_SPECS)
+    if unknown:
+        raise ValueError("Unknown traversals: %s" % ", ".join(sorted(unknown)))
+    begin_class = classmapper(begin_type)
+    pending = [name for name in TRAVERSAL_SPECS if name in allowed and
+               issubclass(begin_class, classmapper(TRAVERSAL_SPECS[name][0]))]
+    found = set()
+    while pending:
+        name = pending.pop()
+        if name not in found:
+            found.add(name)
+            pending.extend(next_name for next_name in TRAVERSAL_SPECS[name][2]
+                           if next_name in allowed)
+    return [name for name in TRAVERSAL_SPECS if name in found]
+
+
+def matches_filter(obj_content, filter):
+    """Check whether the properties in an ObjectContent match a filter.
+
+    :param obj_content: The ObjectContent to check.
+    :type obj_content: ObjectContent
+    :param filter: The property name/value pairs which must match.
+    :type filter: dict
+    :rtype: bool
+
+    """
+    values = dict((prop.name, prop.val)
+                  for prop in getattr(obj_content, "propSet", []))
+    for key, value in filter.items():
+        if key not in values or values[key] != value:
+            return False
+    return True
+
+
+class NameIndex(object):
+    """A client side index of entity names for one type of entity.
+
+    The index is an :class:`~psphere.mirror.InventoryMirror` of the names
+    of the entities, so it is loaded with a single traversal of the
+    inventory and afterwards only the names which changed are transferred
+    by WaitForUpdatesEx. Lookups cost one retrieval of the requested
+    properties of the entity found, which also checks that the entity
+    still has the name. If it doesn't, or a name isn't in the index, the
+    index is brought up to date once before giving up, so a name which
+    doesn't exist costs a single WaitForUpdatesEx call rather than a
+    traversal.
+
+    :param client: The client to search with.
+    :type client: Client
+    :param view_type: The type of entity to index.
+    :type view_type: str
+
+    """
+    def __init__(self, client, view_type):
+        self.client = client
+        self.view_type = view_type
+        self._mirror = None
+        self._mo_refs = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Apply the changes made to the names since the last refresh."""
+        with self._lock:
+            if self._mirror is None:
+                logger.debug("Building name index for %s", self.view_type)
+                mirror = InventoryMirror(self.client,
+                                         {self.view_type: ["name"]})
+                mirror.start()
+                self._mirror = mirror
+            elif not self._mirror.update() and self._mo_refs is not None:
+                return
+
+            mo_refs = {}
+            for key, mo_ref in self._mirror._mo_refs.items():
+                name = self._mirror._objects[key].get("name")
+                if name is not None:
+                    mo_refs.setdefault(name, mo_ref)
+            self._mo_refs = mo_refs
+
+    def close(self):
+        """Destroy the index's property collector on the server."""
+        with self._lock:
+            mirror, self._mirror = self._mirror, None
+            self._mo_refs = None
+        if mirror is not None:
+            mirror.stop()
+
+    def lookup(self, name, properties=None):
+        """Find the entity with the given name.
+
+        :param name: The name of the entity.
+        :type name: str
+        :param properties: The properties to retrieve in the view.
+        :type properties: list
+        :returns: The view, or None if there is no entity with the name.
+        :rtype: ManagedEntity or None
+
+        """
+        refreshed = False
+        if self._mo_refs is None:
+            self.refresh()
+            refreshed = True
+
+        while True:
+            mo_ref = self._mo_refs.get(name)
+            if mo_ref is not None:
+                view = self.client._get_matching_view(mo_ref,
+                                                      {"name": name},
+                                                      properties or [])
+                if view is not None:
+                    return view
+            if refreshed:
+                return None
+            logger.debug("%s not found in name index, refreshing", name)
+            self.refresh()
+            refreshed = True
@@ -96,3 +96,89 @@ class ManagedObjectReference(suds.sudsobject.Property):
     def __init__(self, _type, value):
         suds.sudsobject.Property.__init__(self, value)
         self._type = _type
+
+
+def lazy_value(value, client):
+    """Wrap a value from a response so that its MORs are converted on use.
+
+    :param value: A value from a suds response.
+    :param client: The client converting the MORs to psphere objects.
+    :type client: Client
+
+    """
+    if isinstance(value, suds.sudsobject.Object):
+        if "_type" in value.__keylist__:
+            return client._mor_to_pobject(value)
+        return LazyResult(value, client)
+    if isinstance(value, list):
+        return LazyList(value, client)
+    return value
+
+
+class LazyResult(object):
+    """A read-only wrapper of a suds object from a response.
+
+    The values of the object are converted, MORs to psphere objects and
+    objects and lists to further wrappers, each time they're accessed.
+    The suds object itself is never modified, use :meth:`unwrap` to get it.
+
+    """
+    __slots__ = ("_obj", "_client")
+
+    def __init__(self, obj, client):
+        self._obj = obj
+        self._client = client
+
+    def __getattr__(self, name):
+        return lazy_value(getattr(self._obj, name), self._client)
+
+    def __getitem__(self, name):
+        return lazy_value(self._obj[name], self._client)
+
+    def __iter__(self):
+        for name, value in self._obj:
+            yield name, lazy_value(value, self._client)
+
+    def __contains__(self, name):
+        return name in self._obj
+
+    def __len__(self):
+        return len(self._obj)
+
+    def __repr__(self):
+        return repr(self._obj)
+
+    def __str__(self):
+        return str(self._obj)
+
+    def unwrap(self):
+        """Return the suds object."""
+        return self._obj
+
+
+class LazyList(object):
+    """A read-only wrapper of a list from a response, see LazyResult."""
+    __slots__ = ("_items", "_client")
+
+    def __init__(self, items, client):
+        self._items = items
+        self._client = client
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return LazyList(self._items[index], self._client)
+        return lazy_value(self._items[index], self._client)
+
+    def __iter__(self):
+        for item in self._items:
+            yield lazy_value(item, self._client)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __repr__(self):
+        return repr(self._items)
+
+    def unwrap(self):
+        """Return the list."""
+        return self._items
@@ -0,0 +1,130 @@
+"""
+:mod:`psphere.stream` - Decoding PropertyCollector replies as they arrive
+=========================================================================
+
+.. module:: stream
+
+suds parses the whole of a reply into a document before turning it into
+objects, so a large page of RetrievePropertiesEx results needs several
+times its size in memory. :class:`ObjectContentStream` instead feeds the
+reply to the parser a chunk at a time as it is read from the connection,
+and turns each ObjectContent into an object as soon as its end tag has
+been parsed, dropping its elements from the document. Memory use is then
+bounded by the size of a single ObjectContent rather than the page.
+
+"""
+
+# Copyright 2010 Jonathan Kinred
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+from xml.sax import make_parser
+from xml.sax.handler import feature_external_ges
+
+from suds.sax.parser import Handler
+from suds.umx.typed import Typed
+
+logger = logging.getLogger(__name__)
+
+# Where the ObjectContents are in the reply of each method: their depth
+# below the document (Envelope is 1) and their tag
+LOCATIONS = {
+    "RetrieveProperties": (4, "returnval"),
+    "RetrievePropertiesEx": (5, "objects"),
+    "ContinueRetrievePropertiesEx": (5, "objects"),
+}
+
+# The token of a RetrieveResult, Envelope/Body/Response/returnval/token
+TOKEN_DEPTH = 5
+
+
+class _Handler(Handler):
+    """Builds the document like suds, but hands over ObjectContents."""
+    def __init__(self, depth, name):
+        Handler.__init__(self)
+        self.depth = depth
+        self.name = name
+        self.completed = []
+        self.token = None
+
+    def endElement(self, name):
+        node = self.top()
+        depth = len(self.nodes) - 1
+        Handler.endElement(self, name)
+        if depth == self.depth and node.name == self.name:
+            # Leave node.parent set so that the namespace prefixes declared
+            # above it can still be resolved while it is unmarshalled
+            node.parent.children.remove(node)
+            self.completed.append(node)
+        elif depth == TOKEN_DEPTH and node.name == "token":
+            self.token = node.getText()
+
+
+class ObjectContentStream(object):
+    """Iterate over the ObjectContents of a PropertyCollector reply.
+
+    >>> stream = ObjectContentStream(client.wsdl.schema, reply_body,
+    ...                              "RetrievePropertiesEx")
+    >>> for object_content in stream:
+    ...     print(object_content.obj)
+    >>> stream.token
+
+    :param schema: The schema of the WSDL.
+    :type schema: suds.xsd.schema.Schema
+    :param fp: The reply body, anything with a read(size) method.
+    :type fp: file
+    :param method: The method which was invoked, a key of \
+    :data:`LOCATIONS`.
+    :type method: str
+    :param read_size: The number of bytes to read at a time.
+    :type read_size: int
+
+    """
+    def __init__(self, schema, fp, method, read_size=65536):
+        self.fp = fp
+        self.read_size = read_size
+        self._type = schema.types[("ObjectContent", "urn:vim25")].resolve(
+            nobuiltin=True)
+        self._unmarshaller = Typed(schema)
+        self._handler = _Handler(*LOCATIONS[method])
+        self._parser = make_parser()
+        self._parser.setFeature(feature_external_ges, 0)
+        self._parser.setContentHandler(self._handler)
+
+    @property
+    def token(self):
+        """The token to continue retrieving with, once iteration is done."""
+        return self._handler.token
+
+    def close(self):
+        """Stop reading the reply."""
+        close = getattr(self.fp, "close", None)
+        if close is not None:
+            close()
+
+    def __iter__(self):
+        completed = self._handler.completed
+        while True:
+            chunk = self.fp.read(self.read_size)
+            if chunk:
+                self._parser.feed(chunk)
+            else:
+                self._parser.close()
+            while completed:
+                node = completed.pop(0)
+                yield self._unmarshaller.process(node, self._type)
+            if not chunk:
+                return
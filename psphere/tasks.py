@@ -0,0 +1,321 @@
+"""
+:mod:`psphere.tasks` - Waiting for tasks to complete
+====================================================
+
+.. module:: tasks
+
+Instead of polling each task in turn, a :class:`TaskWaiter` registers the
+tasks with a property collector of its own and blocks in WaitForUpdatesEx
+until one of them changes. Waiting on any number of tasks therefore costs
+a single outstanding call, and a task is noticed as soon as it completes.
+
+>>> waiter = TaskWaiter(client)
+>>> futures = waiter.add([vm.PowerOnVM_Task() for vm in vms])
+>>> waiter.wait(futures, timeout=600)
+>>> for future in futures:
+...     print(future.task.info.state)
+
+"""
+
+# Copyright 2010 Jonathan Kinred
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from __future__ import absolute_import, division, print_function
+
+import logging
+import math
+import threading
+import time
+
+from psphere import ManagedObject
+from psphere.errors import TaskFailedError, TaskTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+def _key(mo_ref):
+    return (str(mo_ref._type), str(mo_ref.value))
+
+
+class TaskFuture(object):
+    """The eventual outcome of a task registered with a :class:`TaskWaiter`.
+
+    :param task: The task.
+    :type task: Task
+    :param waiter: The waiter the task is registered with.
+    :type waiter: TaskWaiter
+    :param progress_callback: Called with the task and its progress \
+    percentage whenever the progress changes.
+    :type progress_callback: callable or None
+
+    """
+    def __init__(self, task, waiter, progress_callback=None):
+        self.task = task
+        self.waiter = waiter
+        self.progress_callback = progress_callback
+        self.state = None
+        self.progress = None
+        self.error = None
+        # The TaskInfo as of the last update, which partial updates are
+        # applied to. It's only written through to the client's cache,
+        # which may have dropped it since.
+        self.info = None
+        self._callbacks = []
+
+    def done(self):
+        """Whether the task has completed, successfully or not."""
+        return self.state in ("success", "error")
+
+    def add_done_callback(self, func):
+        """Call func with this future when the task completes."""
+        if self.done():
+            func(self)
+        else:
+            self._callbacks.append(func)
+
+    def result(self, timeout=None):
+        """Wait for the task to complete and return it.
+
+        :param timeout: The maximum number of seconds to wait.
+        :type timeout: float or None
+        :returns: The task, with its info loaded.
+        :rtype: Task
+        :raises: TaskFailedError if the task failed, TaskTimeoutError if \
+        it hasn't completed within the timeout.
+
+        """
+        self.waiter.wait([self], timeout=timeout)
+        if self.state == "error":
+            raise TaskFailedError(self.error)
+        return self.task
+
+    def _update(self, info):
+        state = str(getattr(info, "state", self.state))
+        progress = getattr(info, "progress", None)
+        if progress is not None and progress != self.progress:
+            self.progress = progress
+            if self.progress_callback is not None:
+                self.progress_callback(self.task, progress)
+        if state == self.state:
+            return
+        self.state = state
+        if state == "error":
+            error = getattr(info, "error", None)
+            self.error = getattr(error, "localizedMessage", "Unknown error")
+        if self.done():
+            logger.debug("%s completed with state %s", self.task._mo_ref.value,
+                         state)
+            for func in self._callbacks:
+                func(self)
+            self._callbacks = []
+
+
+class TaskWaiter(object):
+    """Waits for any number of tasks with a single property collector.
+
+    Each call to :meth:`add` creates one PropertyFilter on the waiter's
+    property collector covering all of the tasks passed to it. The filter
+    is destroyed once every one of its tasks has completed.
+
+    A waiter can be shared by several threads. One of the threads which
+    are waiting calls WaitForUpdatesEx at a time, on behalf of all of
+    them, while the others wait for it.
+
+    :param client: The client the tasks were created with.
+    :type client: Client
+
+    """
+    # The longest a single WaitForUpdatesEx call will block for. It must be
+    # less than the client's timeout.
+    max_wait_seconds = 10
+
+    def __init__(self, client):
+        self.client = client
+        self.version = None
+        self._collector = None
+        self._futures = {}
+        self._filters = {}
+        # Guards the above, and is notified when a thread stops polling
+        self._lock = threading.Condition(threading.RLock())
+        self._polling = False
+
+    def _get_collector(self):
+        with self._lock:
+            if self._collector is None:
+                logger.debug("Creating property collector for tasks")
+                pc = self.client.sc.propertyCollector
+                self._collector = pc.CreatePropertyCollector()
+                self.version = None
+            return self._collector
+
+    def add(self, tasks, progress_callback=None):
+        """Start watching tasks.
+
+        :param tasks: The tasks to watch.
+        :type tasks: list of Task
+        :param progress_callback: Called with a task and its progress \
+        percentage whenever the progress of one of the tasks changes.
+        :type progress_callback: callable or None
+        :returns: A future for each task, in the same order.
+        :rtype: list of TaskFuture
+
+        """
+        futures = []
+        object_specs = []
+        for task in tasks:
+            if not isinstance(task, ManagedObject):
+                task = self.client._mor_to_pobject(task)
+            future = TaskFuture(task, self, progress_callback)
+            futures.append(future)
+            object_spec = self.client.create('ObjectSpec')
+            object_spec.obj = task._mo_ref
+            object_specs.append(object_spec)
+        if not futures:
+            return futures
+
+        property_spec = self.client.create('PropertySpec')
+        property_spec.type = 'Task'
+        property_spec.all = False
+        property_spec.pathSet = ['info']
+
+        pfs = self.client.create('PropertyFilterSpec')
+        pfs.propSet = [property_spec]
+        pfs.objectSet = object_specs
+
+        with self._lock:
+            # The futures are registered before the filter exists so that
+            # a thread polling meanwhile doesn't miss their first update
+            for future in futures:
+                self._futures[_key(future.task._mo_ref)] = future
+            filter_ = self._get_collector().CreateFilter(spec=pfs,
+                                                         partialUpdates=True)
+            self._filters[_key(filter_._mo_ref)] = (filter_, futures)
+        return futures
+
+    def poll(self, timeout=0):
+        """Process the changes to the tasks, waiting for one if necessary.
+
+        :param timeout: The number of seconds to wait for a change.
+        :type timeout: int
+        :returns: Whether anything changed.
+        :rtype: bool
+
+        """
+        collector = self._collector
+        if collector is None:
+            return False
+        options = self.client.create('WaitOptions')
+        options.maxWaitSeconds = int(math.ceil(timeout))
+        update_set = collector.WaitForUpdatesEx(
+            version=self.version or "", options=options)
+        if update_set is None:
+            return False
+        self.version = update_set.version
+
+        for filter_update in getattr(update_set, "filterSet", []):
+            for object_update in getattr(filter_update, "objectSet", []):
+                with self._lock:
+                    future = self._futures.get(
+                        _key(object_update.obj._mo_ref))
+                if future is not None:
+                    self._apply(future, object_update)
+        self._destroy_completed_filters()
+        return True
+
+    def _apply(self, future, object_update):
+        info = future.info
+        for change in getattr(object_update, "changeSet", []):
+            name = str(change.name)
+            value = getattr(change, "val", None)
+            if name == "info":
+                info = value
+            elif info is not None:
+                # A partial update such as info.progress
+                obj = info
+                parts = name.split(".")[1:]
+                for part in parts[:-1]:
+                    obj = getattr(obj, part)
+                setattr(obj, parts[-1], value)
+        if info is None:
+            return
+        future.info = info
+        future.task._set_cached("info", info)
+        future._update(info)
+
+    def _destroy_completed_filters(self):
+        completed = []
+        with self._lock:
+            for key, (filter_, futures) in list(self._filters.items()):
+                if not all(future.done() for future in futures):
+                    continue
+                del self._filters[key]
+                for future in futures:
+                    self._futures.pop(_key(future.task._mo_ref), None)
+                completed.append(filter_)
+        for filter_ in completed:
+            try:
+                filter_.DestroyPropertyFilter()
+            except Exception:
+                logger.warning("Failed to destroy task filter", exc_info=True)
+
+    def wait(self, futures, timeout=None):
+        """Wait for tasks to complete.
+
+        :param futures: The futures of the tasks to wait for.
+        :type futures: list of TaskFuture
+        :param timeout: The maximum number of seconds to wait, or None to \
+        wait for as long as it takes.
+        :type timeout: float or None
+        :raises: TaskTimeoutError if the tasks haven't all completed \
+        within the timeout.
+
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._lock:
+                if all(future.done() for future in futures):
+                    return
+                wait = self.max_wait_seconds
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise TaskTimeoutError("Timed out waiting for tasks")
+                    wait = min(wait, remaining)
+                if self._polling:
+                    # Another thread is waiting for updates, which will
+                    # include those to these tasks
+                    self._lock.wait(wait)
+                    continue
+                self._polling = True
+            try:
+                self.poll(timeout=wait)
+            finally:
+                with self._lock:
+                    self._polling = False
+                    self._lock.notify_all()
+
+    def close(self):
+        """Stop watching every task and destroy the property collector."""
+        with self._lock:
+            collector = self._collector
+            self._collector = None
+            self._filters = {}
+            self._futures = {}
+        if collector is None:
+            return
+        try:
+            collector.DestroyPropertyCollector()
+        except Exception:
+            logger.warning("Failed to destroy property collector",
+                           exc_info=True)
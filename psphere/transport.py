@@ -0,0 +1,577 @@
+"""
+:mod:`psphere.transport` - HTTP transports for the SOAP client
+==============================================================
+
+.. module:: transport
+
+suds sends every request through a new urllib opener, which means a new
+TCP connection and TLS handshake for every SOAP call. The transports in
+this module keep connections to the server open and reuse them, and can
+optionally compress the XML sent over them.
+
+"""
+
+# Copyright 2010 Jonathan Kinred
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import logging
+import socket
+import ssl
+import threading
+import time
+import zlib
+
+from six.moves import http_client
+from six.moves.urllib.parse import urlsplit
+from six.moves.urllib.request import HTTPSHandler, Request, build_opener
+from suds.transport import Reply, TransportError
+from suds.transport.http import HttpTransport
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPSClientAuthHandler(HTTPSHandler):
+    def __init__(self, context):
+        HTTPSHandler.__init__(self)
+        self.context = context
+
+    def https_open(self, req):
+        return self.do_open(self.getConnection, req)
+
+    def getConnection(self, host, timeout=300):
+        return http_client.HTTPSConnection(host, context=self.context)
+
+
+class _HTTPSConnection(http_client.HTTPSConnection):
+    """An HTTPSConnection which resumes the TLS session of its pool."""
+    def __init__(self, host, pool, **kwargs):
+        http_client.HTTPSConnection.__init__(self, host,
+                                             context=pool.context, **kwargs)
+        self._pool = pool
+
+    def connect(self):
+        http_client.HTTPConnection.connect(self)
+        server_hostname = getattr(self, "_tunnel_host", None) or self.host
+        try:
+            self.sock = self._pool.context.wrap_socket(
+                self.sock, server_hostname=server_hostname,
+                session=self._pool.tls_session)
+        except TypeError:
+            # Python 2 can't resume sessions
+            self.sock = self._pool.context.wrap_socket(
+                self.sock, server_hostname=server_hostname)
+        if getattr(self.sock, "session_reused", False):
+            self._pool.count("tls_resumed")
+
+
+class ConnectionPool(object):
+    """A bounded pool of keep-alive connections to a single host.
+
+    At most ``maxsize`` connections are open at any time; callers asking
+    for a connection when all of them are in use wait for one to be
+    returned. Connections which have been idle for longer than
+    ``idle_timeout`` seconds are closed instead of being reused, as the
+    server has most likely dropped them already.
+
+    :param scheme: Either "http" or "https".
+    :type scheme: str
+    :param host: The host (and optional port) to connect to.
+    :type host: str
+    :param context: The SSL context for https connections.
+    :type context: ssl.SSLContext
+    :param maxsize: The maximum number of connections.
+    :type maxsize: int
+    :param idle_timeout: Seconds after which an idle connection is closed.
+    :type idle_timeout: int
+
+    """
+    def __init__(self, scheme, host, context=None, maxsize=4,
+                 idle_timeout=60):
+        self.scheme = scheme
+        self.host = host
+        self.context = context
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.tls_session = None
+        self._idle = []
+        self._in_use = 0
+        self._lock = threading.Condition()
+        self.stats = {"created": 0, "reused": 0, "evicted": 0,
+                      "discarded": 0, "requests": 0, "tls_resumed": 0,
+                      "bytes_sent": 0, "bytes_sent_uncompressed": 0,
+                      "bytes_received": 0,
+                      "bytes_received_uncompressed": 0}
+
+    def count(self, stat, value=1):
+        with self._lock:
+            self.stats[stat] += value
+
+    def count_bytes(self, sent, sent_uncompressed, received,
+                    received_uncompressed):
+        with self._lock:
+            self.stats["bytes_sent"] += sent
+            self.stats["bytes_sent_uncompressed"] += sent_uncompressed
+            self.stats["bytes_received"] += received
+            self.stats["bytes_received_uncompressed"] += received_uncompressed
+
+    def _new_connection(self, timeout):
+        self.stats["created"] += 1
+        if self.scheme == "https":
+            return _HTTPSConnection(self.host, self, timeout=timeout)
+        return http_client.HTTPConnection(self.host, timeout=timeout)
+
+    def _evict_idle(self, now):
+        """Close idle connections that have exceeded the idle timeout.
+
+        Must be called with the lock held.
+        """
+        keep = []
+        for conn, last_used in self._idle:
+            if now - last_used > self.idle_timeout:
+                self.stats["evicted"] += 1
+                conn.close()
+            else:
+                keep.append((conn, last_used))
+        self._idle = keep
+
+    def get(self, timeout=None):
+        """Take a connection from the pool, opening one if needed.
+
+        :param timeout: The socket timeout for the connection.
+        :type timeout: int
+        :returns: A connection and whether it was reused.
+        :rtype: tuple
+
+        """
+        with self._lock:
+            while not self._idle and self._in_use >= self.maxsize:
+                self._lock.wait()
+            self._evict_idle(time.time())
+            self._in_use += 1
+            self.stats["requests"] += 1
+            if self._idle:
+                # Use the most recently returned connection, it is the one
+                # least likely to have been closed by the server
+                conn = self._idle.pop()[0]
+                self.stats["reused"] += 1
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+            return self._new_connection(timeout), False
+
+    def put(self, conn):
+        """Return a connection to the pool once its response is read."""
+        with self._lock:
+            self._in_use -= 1
+            session = getattr(conn.sock, "session", None)
+            if session is not None:
+                self.tls_session = session
+            self._idle.append((conn, time.time()))
+            self._lock.notify()
+
+    def discard(self, conn):
+        """Close a connection which can't be reused."""
+        conn.close()
+        with self._lock:
+            self._in_use -= 1
+            self.stats["discarded"] += 1
+            self._lock.notify()
+
+    def evict_idle(self):
+        """Close connections which have been idle for too long."""
+        with self._lock:
+            self._evict_idle(time.time())
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            for conn, last_used in self._idle:
+                conn.close()
+            self._idle = []
+
+    def statistics(self):
+        """Return the counters of this pool along with its current size."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._in_use
+            return stats
+
+
+class _CookieResponse(object):
+    """Adapts an HTTPResponse for CookieJar.extract_cookies."""
+    def __init__(self, response):
+        self._response = response
+
+    def info(self):
+        return self._response.msg
+
+
+def _compress(data):
+    """gzip compress data."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+class _Decompressor(object):
+    """Incrementally decompress a gzip or deflate encoded response body.
+
+    Some servers send "deflate" as a raw deflate stream rather than with
+    the zlib header the specification asks for, so fall back to that when
+    the first chunk can't be decoded.
+    """
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        else:
+            self._obj = zlib.decompressobj()
+        self._first = True
+
+    def decompress(self, data):
+        if self._first and self.encoding == "deflate":
+            self._first = False
+            try:
+                return self._obj.decompress(data)
+            except zlib.error:
+                self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._obj.decompress(data)
+
+    def flush(self):
+        return self._obj.flush()
+
+
+def _can_resend(error, sent):
+    """Whether a request on a kept-alive connection failed because the
+    server had already closed it, so it can't have been handled.
+
+    Requests which timed out, or whose connection failed once a response
+    may have been on its way, mustn't be sent again as the server may have
+    handled them: methods such as PowerOnVM_Task would then run twice.
+
+    :param error: The exception raised.
+    :param sent: Whether the request had been written to the connection.
+    :type sent: bool
+    :rtype: bool
+
+    """
+    if isinstance(error, socket.timeout):
+        return False
+    if not sent:
+        return isinstance(error, socket.error)
+    remote_disconnected = getattr(http_client, "RemoteDisconnected", None)
+    if (remote_disconnected is not None and
+            isinstance(error, remote_disconnected)):
+        return True
+    # Python 2 reports a connection closed without a response like this
+    return (isinstance(error, http_client.BadStatusLine) and
+            error.line in ("", "''"))
+
+
+class _StreamingBody(object):
+    """The body of a response, decoded as it is read.
+
+    See :meth:`KeepAliveTransport.send_streaming`.
+
+    """
+    def __init__(self, transport, pool, conn, response, sent,
+                 sent_uncompressed):
+        self._transport = transport
+        self._pool = pool
+        self._conn = conn
+        self._response = response
+        self._sent = (sent, sent_uncompressed)
+        self._received = 0
+        self._decoded = 0
+        self._done = False
+        encoding = (response.getheader("Content-Encoding") or "").lower()
+        self._decompressor = None
+        if encoding in ("gzip", "deflate"):
+            self._decompressor = _Decompressor(encoding)
+
+    def read(self, size=-1):
+        """Read and decode about size bytes, returning b"" at the end."""
+        while not self._done:
+            try:
+                chunk = self._response.read(
+                    size if size > 0 else self._transport.read_size)
+            except Exception:
+                self.close()
+                raise
+            if chunk:
+                self._received += len(chunk)
+                if self._decompressor is not None:
+                    chunk = self._decompressor.decompress(chunk)
+            else:
+                if self._decompressor is not None:
+                    chunk = self._decompressor.flush()
+                self._finish()
+            if chunk:
+                self._decoded += len(chunk)
+                return chunk
+        return b""
+
+    def _finish(self):
+        self._done = True
+        self._transport._release(self._pool, self._conn, self._response)
+        self._pool.count_bytes(self._sent[0], self._sent[1], self._received,
+                               self._decoded)
+
+    def close(self):
+        """Stop reading, closing the connection if the body isn't read."""
+        if not self._done:
+            self._done = True
+            self._pool.discard(self._conn)
+
+
+class KeepAliveTransport(HttpTransport):
+    """A suds transport which reuses HTTP(S) connections between requests.
+
+    SOAP requests are sent over connections taken from a per-host
+    :class:`ConnectionPool`. Retrieving documents (e.g. a remote WSDL) and
+    sending through a proxy still use urllib.
+
+    When ``accept_encoding`` is set the server is asked to gzip or deflate
+    its responses, which are decompressed as they are read. When
+    ``compress_requests`` is set request bodies of at least
+    ``compress_min_size`` bytes are gzipped, which the server must support.
+    The number of bytes sent and received, before and after compression, is
+    included in :meth:`pool_statistics`.
+
+    :param context: The SSL context to use for https connections, the \
+    default context is used if not given.
+    :type context: ssl.SSLContext or None
+    :param maxsize: The maximum number of connections per host.
+    :type maxsize: int
+    :param idle_timeout: Seconds after which an idle connection is closed.
+    :type idle_timeout: int
+    :param accept_encoding: Whether to accept compressed responses.
+    :type accept_encoding: bool
+    :param compress_requests: Whether to compress request bodies.
+    :type compress_requests: bool
+
+    """
+    read_size = 65536
+    compress_min_size = 1024
+
+    def __init__(self, context=None, maxsize=4, idle_timeout=60,
+                 accept_encoding=False, compress_requests=False, **kwargs):
+        HttpTransport.__init__(self, **kwargs)
+        self.accept_encoding = accept_encoding
+        self.compress_requests = compress_requests
+        if context is None:
+            # This honours any override of the default context, e.g. to
+            # accept the self-signed certificates of a fresh vCenter
+            context = ssl._create_default_https_context()
+        self.context = context
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+
+    def _get_pool(self, scheme, host):
+        with self._pools_lock:
+            try:
+                return self._pools[(scheme, host)]
+            except KeyError:
+                pool = ConnectionPool(scheme, host, self.context,
+                                      self.maxsize, self.idle_timeout)
+                self._pools[(scheme, host)] = pool
+                return pool
+
+    def send(self, request):
+        if self.options.proxy:
+            return HttpTransport.send(self, request)
+
+        pool, conn, response, u2request, body = self._request(request)
+        try:
+            message, received = self._read_body(response)
+        except Exception:
+            pool.discard(conn)
+            raise
+        self._release(pool, conn, response)
+        pool.count_bytes(len(body), len(request.message or b""), received,
+                         len(message))
+        return self._reply(request, response, u2request, message)
+
+    def send_streaming(self, request):
+        """Send a request and return the reply before its body is read.
+
+        The message of the reply is a file-like object which reads and
+        decodes the body from the connection as it is read from. The
+        connection is returned to its pool once the body has been read to
+        the end, or closed if it is closed before then.
+
+        :param request: The request to send.
+        :type request: suds.transport.Request
+        :rtype: suds.transport.Reply
+
+        """
+        if self.options.proxy:
+            reply = HttpTransport.send(self, request)
+            reply.message = io.BytesIO(reply.message)
+            return reply
+
+        pool, conn, response, u2request, body = self._request(request)
+        if response.status >= 300:
+            # Errors are small, read them as send would
+            try:
+                message, received = self._read_body(response)
+            except Exception:
+                pool.discard(conn)
+                raise
+            self._release(pool, conn, response)
+            return self._reply(request, response, u2request, message)
+        stream = _StreamingBody(self, pool, conn, response,
+                                len(body), len(request.message or b""))
+        return self._reply(request, response, u2request, stream)
+
+    def _request(self, request):
+        """Send a request over a pooled connection and get the response.
+
+        :returns: The pool, the connection, the response, the urllib \
+        request used for cookies and the body as it was sent.
+        :rtype: tuple
+
+        """
+        url = urlsplit(request.url)
+        path = url.path or "/"
+        if url.query:
+            path += "?" + url.query
+        u2request = Request(request.url, request.message,
+                            dict(request.headers))
+        self.addcookies(u2request)
+        headers = dict(u2request.header_items())
+        timeout = request.timeout or self.options.timeout
+
+        body = request.message or b""
+        if self.accept_encoding:
+            headers["Accept-Encoding"] = "gzip, deflate"
+        if self.compress_requests and len(body) >= self.compress_min_size:
+            body = _compress(body)
+            headers["Content-Encoding"] = "gzip"
+
+        pool = self._get_pool(url.scheme, url.netloc)
+        conn, reused = pool.get(timeout)
+        try:
+            sent = False
+            try:
+                conn.request("POST", path, body, headers)
+                sent = True
+                response = conn.getresponse()
+            except Exception as e:
+                if not (reused and _can_resend(e, sent)):
+                    raise
+                # The server closed the kept-alive connection before it
+                # handled our request, so it's safe to send it again
+                logger.debug("Connection to %s was closed, reconnecting",
+                             url.netloc)
+                conn.close()
+                conn.request("POST", path, body, headers)
+                response = conn.getresponse()
+        except Exception:
+            pool.discard(conn)
+            raise
+        return pool, conn, response, u2request, body
+
+    def _release(self, pool, conn, response):
+        """Return a connection whose response has been read to its pool."""
+        if response.will_close:
+            pool.discard(conn)
+        else:
+            pool.put(conn)
+
+    def _reply(self, request, response, u2request, message):
+        self.cookiejar.extract_cookies(_CookieResponse(response), u2request)
+        reply_headers = dict(response.getheaders())
+        logger.debug("Received HTTP %s from %s", response.status,
+                     urlsplit(request.url).netloc)
+        if response.status in (http_client.ACCEPTED,
+                               http_client.NO_CONTENT):
+            return None
+        if response.status >= 300:
+            raise TransportError(response.reason, response.status,
+                                 io.BytesIO(message))
+        return Reply(response.status, reply_headers, message)
+
+    def _read_body(self, response):
+        """Read and decode a response body.
+
+        :returns: The decoded body and the number of bytes received.
+        :rtype: tuple
+
+        """
+        encoding = (response.getheader("Content-Encoding") or "").lower()
+        decompressor = None
+        if encoding in ("gzip", "deflate"):
+            decompressor = _Decompressor(encoding)
+
+        chunks = []
+        received = 0
+        while True:
+            chunk = response.read(self.read_size)
+            if not chunk:
+                break
+            received += len(chunk)
+            if decompressor is not None:
+                chunk = decompressor.decompress(chunk)
+            chunks.append(chunk)
+        if decompressor is not None:
+            chunks.append(decompressor.flush())
+        return b"".join(chunks), received
+
+    def pool_statistics(self):
+        """Return the statistics of every connection pool, keyed by host."""
+        with self._pools_lock:
+            pools = list(self._pools.values())
+        return dict(("%s://%s" % (pool.scheme, pool.host), pool.statistics())
+                    for pool in pools)
+
+    def evict_idle(self):
+        """Close idle connections that have exceeded the idle timeout."""
+        with self._pools_lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.evict_idle()
+
+    def close(self):
+        """Close all idle connections."""
+        with self._pools_lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.close()
+
+
+class HTTPSClientContextTransport(KeepAliveTransport):
+    def __init__(self, context, *args, **kwargs):
+        KeepAliveTransport.__init__(self, context, *args, **kwargs)
+
+    def u2open(self, u2request, timeout=None):
+        """
+        Open a connection.
+        @param u2request: A urllib2 request.
+        @type u2request: urllib2.Requet.
+        @return: The opened file-like urllib2 object.
+        @rtype: fp
+        """
+        tm = timeout or self.options.timeout
+        url = build_opener(HTTPSClientAuthHandler(self.context))
+        if self.u2ver() < 2.6:
+            socket.setdefaulttimeout(tm)
+            return url.open(u2request)
+        else:
+            return url.open(u2request, timeout=tm)
@@ -0,0 +1,381 @@
+"""
+:mod:`psphere.wsdlcache` - Caching of the parsed vSphere WSDL
+=============================================================
+
+.. module:: wsdlcache
+
+Parsing the bundled vimService.wsdl and the schemas it imports takes a
+noticeable amount of time, which dominates the run time of short lived
+scripts. This module stores the fully resolved suds service model on disk
+so that later processes can load it instead of parsing the WSDL again, and
+keeps a process-wide registry so that the model is only loaded once no
+matter how many clients are created.
+
+"""
+
+# Copyright 2010 Jonathan Kinred
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at:
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from __future__ import absolute_import, division, print_function
+
+import gc
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+
+import suds
+import suds.cache
+import suds.client
+from suds.bindings.multiref import MultiRef
+from suds.options import Options
+from suds.plugin import PluginContainer
+
+logger = logging.getLogger(__name__)
+
+WSDL_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), "wsdl")
+
+
+def _psphere_version():
+    """Return the installed psphere version, or "unknown"."""
+    try:
+        from importlib.metadata import version
+    except ImportError:
+        # Python 2 doesn't have importlib.metadata
+        try:
+            import pkg_resources
+            return pkg_resources.get_distribution("psphere").version
+        except Exception:
+            return "unknown"
+    try:
+        return version("psphere")
+    except Exception:
+        return "unknown"
+
+
+def wsdl_digest(wsdl_dir=WSDL_DIR):
+    """Hash the contents of every file making up the WSDL.
+
+    :param wsdl_dir: The directory containing the WSDL and its schemas.
+    :type wsdl_dir: str
+    :returns: A hex digest which changes whenever any of the files change.
+    :rtype: str
+
+    """
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(wsdl_dir)):
+        path = os.path.join(wsdl_dir, name)
+        if not os.path.isfile(path):
+            continue
+        digest.update(name.encode("utf-8"))
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def operation_names(wsdl):
+    """Return the names of every operation a WSDL defines.
+
+    :param wsdl: The parsed WSDL, i.e. the ``wsdl`` of a suds client.
+    :type wsdl: suds.wsdl.Definitions
+    :rtype: frozenset
+
+    """
+    names = set()
+    for service in wsdl.services:
+        for port in service.ports:
+            names.update(port.methods)
+    return frozenset(names)
+
+
+class _ThreadLocalMultiRef(object):
+    """Stands in for the MultiRef of a suds binding.
+
+    A binding is shared by every call of its methods, but its MultiRef
+    keeps the reply it is processing on itself, so replies processed at
+    the same time by different threads get mixed up. Each thread gets a
+    MultiRef of its own instead.
+
+    """
+    def __init__(self):
+        self._local = threading.local()
+
+    def __reduce__(self):
+        return (_ThreadLocalMultiRef, ())
+
+    def process(self, body):
+        multiref = getattr(self._local, "multiref", None)
+        if multiref is None:
+            multiref = self._local.multiref = MultiRef()
+        return multiref.process(body)
+
+
+def make_thread_safe(wsdl):
+    """Make a WSDL's bindings safe to use from several threads at once.
+
+    :param wsdl: The parsed WSDL, i.e. the ``wsdl`` of a suds client.
+    :type wsdl: suds.wsdl.Definitions
+
+    """
+    for service in wsdl.services:
+        for port in service.ports:
+            for method in port.methods.values():
+                for binding in (method.binding.input, method.binding.output):
+                    if not isinstance(binding.multiref, _ThreadLocalMultiRef):
+                        binding.multiref = _ThreadLocalMultiRef()
+
+
+class WsdlCache(suds.cache.Cache):
+    """A suds object cache for the parsed WSDL model.
+
+    Entries are stored below a sub-directory of ``location`` whose name
+    is derived from the psphere version, the suds version, the Python
+    version and a hash of the WSDL files. Any change to one of those
+    selects a new sub-directory so stale models are never loaded, and
+    :meth:`prune` can be used to remove the ones left behind.
+
+    Use it with ``cachingpolicy=1`` so that suds caches the resolved
+    Definitions object rather than the raw XML documents.
+
+    :param location: The directory to store the cache in.
+    :type location: str
+    :param wsdl_dir: The directory containing the WSDL files.
+    :type wsdl_dir: str
+
+    """
+    protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, wsdl_dir=WSDL_DIR):
+        self.root = os.path.expanduser(location)
+        self.key = "%s-%s-py%s.%s-%s" % (_psphere_version(), suds.__version__,
+                                         sys.version_info[0],
+                                         sys.version_info[1],
+                                         wsdl_digest(wsdl_dir))
+        self.location = os.path.join(self.root, self.key)
+
+    def _filename(self, id):
+        return os.path.join(self.location, "%s.pickle" % id)
+
+    def get(self, id):
+        filename = self._filename(id)
+        try:
+            f = open(filename, "rb")
+        except IOError:
+            logger.debug("No cached WSDL model at %s", filename)
+            return None
+
+        # The model consists of a very large number of small objects and
+        # the cyclic garbage collector repeatedly scans them while they
+        # are being created. Disabling it makes loading several times faster.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            obj = pickle.load(f)
+        except Exception:
+            logger.warning("Discarding unreadable WSDL cache %s", filename,
+                           exc_info=True)
+            obj = None
+        finally:
+            if gc_enabled:
+                gc.enable()
+            f.close()
+
+        if obj is None:
+            self.purge(id)
+        else:
+            logger.debug("Loaded cached WSDL model from %s", filename)
+        return obj
+
+    def put(self, id, obj):
+        try:
+            if not os.path.isdir(self.location):
+                os.makedirs(self.location)
+            data = pickle.dumps(obj, self.protocol)
+            # Write to a temporary file and rename it into place so that
+            # concurrent processes never see a partially written entry
+            fd, tmp_name = tempfile.mkstemp(dir=self.location)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.rename(tmp_name, self._filename(id))
+            except Exception:
+                os.remove(tmp_name)
+                raise
+        except Exception:
+            logger.warning("Failed to write WSDL cache to %s", self.location,
+                           exc_info=True)
+        return obj
+
+    def purge(self, id):
+        try:
+            os.remove(self._filename(id))
+        except OSError:
+            pass
+
+    def clear(self):
+        """Remove every entry cached for the current key."""
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    def prune(self):
+        """Remove entries cached for any key other than the current one."""
+        if not os.path.isdir(self.root):
+            return
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name != self.key and os.path.isdir(path):
+                logger.info("Removing stale WSDL cache %s", path)
+                shutil.rmtree(path, ignore_errors=True)
+
+
+class SharedWsdl(object):
+    """A parsed service definition shared by every client in the process.
+
+    Only the parts of a suds client which are derived from the WSDL are
+    held here; options, transport and plugins remain per-client, with two
+    caveats:
+
+    - suds reads some options (soapheaders, wsse, prefixes, xstq and the
+      like) from the WSDL rather than the client. The shared WSDL reads
+      them from the client whose call is in progress, which a call must
+      announce with :class:`calling_client`, as ``psphere.client.Client``
+      does. Otherwise they're read from the options the WSDL was loaded
+      with, never from another client's.
+    - The WSDL is only parsed once, so the ``document.loaded`` and
+      ``document.parsed`` hooks of plugins aren't called for the clients
+      it is bound to. Their ``init.initialized`` hook is.
+
+    :param url: The URL of the WSDL.
+    :type url: str
+    :param cache_dir: A directory to load the model from, as used by \
+    :class:`WsdlCache`, or None to always parse the WSDL.
+    :type cache_dir: str or None
+
+    """
+    def __init__(self, url, cache_dir=None):
+        kwargs = {"cache": suds.cache.NoCache()}
+        if cache_dir is not None:
+            kwargs = {"cache": WsdlCache(cache_dir), "cachingpolicy": 1}
+        loader = suds.client.Client(url, **kwargs)
+        self.url = url
+        self.wsdl = loader.wsdl
+        self.factory = loader.factory
+        self.sd = loader.sd
+        self.operations = operation_names(self.wsdl)
+        make_thread_safe(self.wsdl)
+        self.wsdl.options = _CallerOptions(self.wsdl.options)
+
+    def bind(self, client, **kwargs):
+        """Initialise a suds client to use this definition.
+
+        This does the same as ``suds.client.Client.__init__`` but without
+        reading the WSDL.
+
+        :param client: The (uninitialised) suds client.
+        :type client: suds.client.Client
+        :param kwargs: Options for the client, as accepted by \
+        ``suds.client.Client``.
+
+        """
+        client.options = Options()
+        client.set_options(**kwargs)
+        PluginContainer(client.options.plugins).init.initialized(
+            wsdl=self.wsdl)
+        client.wsdl = self.wsdl
+        client.factory = self.factory
+        client.service = suds.client.ServiceSelector(client,
+                                                     self.wsdl.services)
+        client.sd = self.sd
+        client.messages = dict(tx=None, rx=None)
+
+
+class _CallerOptions(object):
+    """Stands in for the options of a shared WSDL.
+
+    Reads the options of the client in :class:`calling_client` in the
+    current thread, or else the options the WSDL was loaded with.
+
+    """
+    def __init__(self, options):
+        self._default = options
+        self._local = threading.local()
+
+    def __reduce__(self):
+        return (_CallerOptions, (self._default,))
+
+    def __getattr__(self, name):
+        options = getattr(self._local, "options", None)
+        if options is None:
+            options = self._default
+        return getattr(options, name)
+
+
+class calling_client(object):
+    """Read the options of a client during the calls made in a block.
+
+    The bindings of a shared WSDL read options such as soapheaders from
+    the WSDL, see :class:`SharedWsdl`, so calls through a client bound to
+    it must be made within this for its options to take effect.
+
+    >>> with calling_client(client):
+    ...     client.service.CurrentTime(_this=si)
+
+    :param client: The client making the calls.
+    :type client: suds.client.Client
+
+    """
+    def __init__(self, client):
+        self.client = client
+        self._previous = None
+
+    def __enter__(self):
+        options = self.client.wsdl.options
+        if isinstance(options, _CallerOptions):
+            self._previous = getattr(options._local, "options", None)
+            options._local.options = self.client.options
+        return self.client
+
+    def __exit__(self, *exc_info):
+        options = self.client.wsdl.options
+        if isinstance(options, _CallerOptions):
+            options._local.options = self._previous
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_wsdl(url, cache_dir=None):
+    """Get the :class:`SharedWsdl` for a URL, loading it on first use.
+
+    Loading is serialised so that threads creating clients at the same
+    time still only parse the WSDL once.
+
+    :param url: The URL of the WSDL.
+    :type url: str
+    :param cache_dir: The on-disk cache to load the model from.
+    :type cache_dir: str or None
+    :rtype: SharedWsdl
+
+    """
+    with _shared_lock:
+        try:
+            return _shared[url]
+        except KeyError:
+            logger.debug("Loading shared WSDL from %s", url)
+            shared = _shared[url] = SharedWsdl(url, cache_dir)
+            return shared
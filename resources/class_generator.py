@@ -20,9 +20,8 @@ if __name__ == '__main__':
         for prop in mo["properties"]:
             props.append("%s" % prop["name"])
         body_text += "    _valid_attrs = set(%s)\n" % props
-        body_text += "    def __init__(self, mo_ref, client):\n"
-        body_text += "        %s.__init__(self, mo_ref, client)\n" % (mo["extends"])
-        body_text += ("        self._valid_attrs = set.union(self._valid_attrs, %s._valid_attrs)\n" % mo["extends"])
+        # _valid_attrs is merged with the base classes' by the metaclass
+        body_text += "    __slots__ = ()\n"
         for prop in mo["properties"]:
             body_text += "    @cached_property\n"
             body_text += "    def %s(self):\n" % prop["name"]
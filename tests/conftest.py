@@ -0,0 +1,50 @@
+from __future__ import absolute_import, division, print_function
+
+import pytest
+
+import psphere.client
+from fakeserver import FakeServer, FakeTransport
+
+
+@pytest.fixture
+def server():
+    return FakeServer()
+
+
+@pytest.fixture
+def client(server, monkeypatch):
+    class Transport(FakeTransport):
+        def __init__(self, **kwargs):
+            FakeTransport.__init__(self, server)
+
+    monkeypatch.setattr(psphere.client, "KeepAliveTransport", Transport)
+    return psphere.client.Client("vcenter", "user", "pass")
+
+
+@pytest.fixture
+def inventory(server):
+    """A datacenter containing a host running ten powered on VMs."""
+    vm_folder = server.add("Folder", "group-v1", name="vm", childEntity=[])
+    host_folder = server.add("Folder", "group-h1", name="host",
+                             childEntity=[])
+    datacenter = server.add("Datacenter", "datacenter-1", name="dc",
+                            vmFolder=vm_folder, hostFolder=host_folder)
+    server.objects[server.root]["childEntity"].append(datacenter)
+    compute_resource = server.add("ComputeResource", "domain-s1",
+                                  name="cluster", host=[])
+    server.objects[host_folder]["childEntity"].append(compute_resource)
+    host = server.add("HostSystem", "host-1", name="esx1", vm=[],
+                      parent=compute_resource)
+    server.objects[compute_resource]["host"].append(host)
+    for i in range(10):
+        runtime = {"_type": "VirtualMachineRuntimeInfo",
+                   "powerState": "poweredOn", "host": host}
+        config = {"_type": "VirtualMachineConfigInfo",
+                  "uuid": "uuid-%s" % i}
+        guest = {"_type": "GuestInfo", "ipAddress": "10.0.0.%s" % i}
+        vm = server.add("VirtualMachine", "vm-%s" % i, name="vm%s" % i,
+                        runtime=runtime, config=config, guest=guest,
+                        parent=vm_folder)
+        server.objects[vm_folder]["childEntity"].append(vm)
+        server.objects[host]["vm"].append(vm)
+    return server
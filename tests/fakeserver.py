@@ -0,0 +1,505 @@
+"""A tiny in-memory stand-in for a vSphere server.
+
+It understands just enough of the vim25 API to exercise the client: the
+inventory is a dict of managed objects and their properties, traversal
+specs are followed over that inventory and every call is recorded so that
+tests can count round trips.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import itertools
+import xml.etree.ElementTree as ET
+from io import BytesIO
+
+from suds.transport import Reply, Transport, TransportError
+from xml.sax.saxutils import escape
+
+from psphere.managedobjects import classmapper
+
+VIM = "{urn:vim25}"
+XSI_TYPE = "{http://www.w3.org/2001/XMLSchema-instance}type"
+
+
+class MOR(tuple):
+    """A reference to an object in the fake inventory."""
+    def __new__(cls, type_, value):
+        return tuple.__new__(cls, (type_, value))
+
+
+def _is_a(type_, base):
+    return issubclass(classmapper(type_), classmapper(base))
+
+
+def _value_xml(tag, value):
+    if isinstance(value, MOR):
+        return '<%s type="%s" xsi:type="ManagedObjectReference">%s</%s>' % (
+            tag, value[0], value[1], tag)
+    if isinstance(value, list):
+        if value and isinstance(value[0], MOR):
+            items = "".join('<ManagedObjectReference type="%s" '
+                            'xsi:type="ManagedObjectReference">%s'
+                            '</ManagedObjectReference>' % v for v in value)
+            return ('<%s xsi:type="ArrayOfManagedObjectReference">%s</%s>' %
+                    (tag, items, tag))
+        items = "".join("<string>%s</string>" % escape(v) for v in value)
+        return '<%s xsi:type="ArrayOfString">%s</%s>' % (tag, items, tag)
+    if isinstance(value, bool):
+        return '<%s xsi:type="xsd:boolean">%s</%s>' % (
+            tag, str(value).lower(), tag)
+    if isinstance(value, int):
+        return '<%s xsi:type="xsd:int">%s</%s>' % (tag, value, tag)
+    if isinstance(value, dict):
+        # A data object, the dict must contain its xsi:type as "_type"
+        fields = "".join(_value_xml(k, v) for k, v in value.items()
+                         if k != "_type")
+        return '<%s xsi:type="%s">%s</%s>' % (tag, value["_type"], fields,
+                                              tag)
+    return '<%s xsi:type="xsd:string">%s</%s>' % (tag, escape(value), tag)
+
+
+def _mor_xml(tag, mor):
+    return '<%s type="%s">%s</%s>' % (tag, mor[0], mor[1], tag)
+
+
+def _text(elem, name):
+    child = elem.find(VIM + name)
+    return None if child is None else child.text
+
+
+def _mor(elem):
+    return MOR(elem.get("type"), elem.text)
+
+
+class Fault(Exception):
+    """Raised by a handler to return a vSphere fault."""
+    def __init__(self, fault_type):
+        Exception.__init__(self, fault_type)
+        self.fault_type = fault_type
+
+
+class FakeServer(object):
+    """An inventory plus the handful of methods needed to query it."""
+    def __init__(self):
+        self.calls = []
+        self.objects = {}
+        self.results = {}
+        self.filters = {}
+        self.version = 0
+        # WaitForUpdatesEx fails with InvalidCollectorVersion below this
+        self.min_version = 0
+        # Called at the start of each WaitForUpdatesEx
+        self.on_wait = []
+        # Login fails with InvalidLogin while this is set
+        self.fail_logins = False
+        self._ids = itertools.count(1)
+        self.root = self.add("Folder", "group-d1", name="Datacenters",
+                             childEntity=[])
+        for name in ("PropertyCollector", "SessionManager", "SearchIndex",
+                     "ViewManager"):
+            self.add(name, name[0].lower() + name[1:])
+
+    def add(self, type_, value, **props):
+        mor = MOR(type_, value)
+        self.objects[mor] = props
+        return mor
+
+    def set(self, mor, **props):
+        """Change properties, recording the change for WaitForUpdatesEx.
+
+        Nested properties can be changed with dotted names, e.g.
+        set(vm, **{"runtime.powerState": "poweredOff"}).
+        """
+        for name, value in props.items():
+            obj = self.objects[mor]
+            parts = name.split(".")
+            for part in parts[:-1]:
+                obj = obj[part]
+            obj[parts[-1]] = value
+        self.version += 1
+        for filter_ in self.filters.values():
+            filter_["changes"].append((mor, props))
+
+    def count(self, method):
+        return self.calls.count(method)
+
+    def handle(self, message):
+        envelope = ET.fromstring(message)
+        body = envelope.find("{http://schemas.xmlsoap.org/soap/envelope/}Body")
+        request = body[0]
+        method = request.tag.replace(VIM, "")
+        self.calls.append(method)
+        handler = getattr(self, "do_%s" % method)
+        try:
+            this = request.find(VIM + "_this")
+            if (this is not None and this.text.startswith("session[") and
+                    _mor(this) not in self.objects):
+                raise Fault("ManagedObjectNotFound")
+            returnval = handler(request)
+        except Fault as e:
+            body = ('<soapenv:Fault><faultcode>ServerFaultCode</faultcode>'
+                    '<faultstring>%s</faultstring><detail>'
+                    '<%sFault xmlns="urn:vim25" xsi:type="%s"/>'
+                    '</detail></soapenv:Fault>' % ((e.fault_type,) * 3))
+            raise TransportError(e.fault_type, 500,
+                                 BytesIO(self._envelope(body)))
+        if returnval is None:
+            returnval = ""
+        return self._envelope(
+            '<%sResponse xmlns="urn:vim25">%s</%sResponse>' % (
+                method, returnval, method))
+
+    def _envelope(self, body):
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<soapenv:Envelope '
+            'xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" '
+            'xmlns:xsd="http://www.w3.org/2001/XMLSchema" '
+            'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+            '<soapenv:Body>%s</soapenv:Body></soapenv:Envelope>' % body
+        ).encode("utf-8")
+
+    def do_RetrieveServiceContent(self, request):
+        return ("<returnval>%s%s%s%s%s</returnval>" % (
+            _mor_xml("rootFolder", self.root),
+            _mor_xml("propertyCollector",
+                     MOR("PropertyCollector", "propertyCollector")),
+            _mor_xml("viewManager", MOR("ViewManager", "viewManager")),
+            _mor_xml("sessionManager",
+                     MOR("SessionManager", "sessionManager")),
+            _mor_xml("searchIndex", MOR("SearchIndex", "searchIndex"))))
+
+    def _start_session(self, key, user_name):
+        self.objects[MOR("SessionManager", "sessionManager")][
+            "currentSession"] = {"_type": "UserSession", "key": key,
+                                 "userName": user_name}
+        return ("<returnval><key>%s</key><userName>%s</userName>"
+                "</returnval>" % (key, user_name))
+
+    def do_Login(self, request):
+        if self.fail_logins:
+            raise Fault("InvalidLogin")
+        return self._start_session("session", _text(request, "userName"))
+
+    def do_Logout(self, request):
+        self.objects[MOR("SessionManager", "sessionManager")].pop(
+            "currentSession", None)
+        # The server destroys the objects belonging to the session
+        for mor in list(self.objects):
+            if mor[1].startswith("session["):
+                del self.objects[mor]
+        for filter_ in list(self.filters):
+            if self.filters[filter_]["collector"] not in self.objects:
+                del self.filters[filter_]
+
+    def do_AcquireCloneTicket(self, request):
+        return "<returnval>ticket-%s</returnval>" % next(self._ids)
+
+    def do_CloneSession(self, request):
+        return self._start_session("session-%s" % _text(request,
+                                                        "cloneTicket"),
+                                   "user")
+
+    def do_CurrentTime(self, request):
+        return "<returnval>2010-01-01T00:00:00Z</returnval>"
+
+    def _lookup(self, path):
+        """Find the first object with a (possibly nested) property value."""
+        for obj, props in sorted(self.objects.items()):
+            value = props
+            for part in path.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            yield obj, value
+
+    def _find(self, request, types, value):
+        if _text(request, "vmSearch") == "true":
+            type_, path = types[0]
+        else:
+            type_, path = types[1]
+        for obj, found in self._lookup(path):
+            if obj[0] == type_ and found == value:
+                return _mor_xml("returnval", obj)
+        return None
+
+    def do_FindByUuid(self, request):
+        path = "config.uuid"
+        if _text(request, "instanceUuid") == "true":
+            path = "config.instanceUuid"
+        return self._find(request, [("VirtualMachine", path),
+                                    ("HostSystem", "hardware.systemInfo.uuid")],
+                          _text(request, "uuid"))
+
+    def do_FindByIp(self, request):
+        return self._find(request, [("VirtualMachine", "guest.ipAddress"),
+                                    ("HostSystem", "ipAddress")],
+                          _text(request, "ip"))
+
+    def do_FindByDnsName(self, request):
+        return self._find(request, [("VirtualMachine", "guest.hostName"),
+                                    ("HostSystem", "name")],
+                          _text(request, "dnsName"))
+
+    def do_FindByInventoryPath(self, request):
+        obj = self.root
+        for name in _text(request, "inventoryPath").split("/"):
+            children = []
+            for prop in ("childEntity", "vmFolder", "hostFolder", "host",
+                         "vm"):
+                value = self.objects[obj].get(prop, [])
+                children.extend([value] if isinstance(value, MOR) else value)
+            for child in children:
+                if self.objects[child].get("name") == name:
+                    obj = child
+                    break
+            else:
+                return None
+        return _mor_xml("returnval", obj)
+
+    def _traverse(self, obj, select_set, specs, found):
+        for select in select_set:
+            if select.find(VIM + "path") is None:
+                select = specs[_text(select, "name")]
+            if not _is_a(obj[0], _text(select, "type")):
+                continue
+            targets = self.objects[obj].get(_text(select, "path"), [])
+            if isinstance(targets, MOR):
+                targets = [targets]
+            for target in targets:
+                if target not in found:
+                    found.append(target)
+                    self._traverse(target, select.findall(VIM + "selectSet"),
+                                   specs, found)
+
+    def _select(self, spec_set):
+        """Find the objects and properties matched by a PropertyFilterSpec."""
+        prop_specs = spec_set.findall(VIM + "propSet")
+        selected = []
+        for object_spec in spec_set.findall(VIM + "objectSet"):
+            obj = _mor(object_spec.find(VIM + "obj"))
+            select_set = object_spec.findall(VIM + "selectSet")
+            specs = {}
+            for select in select_set:
+                for spec in select.iter(VIM + "selectSet"):
+                    if spec.find(VIM + "path") is not None:
+                        specs[_text(spec, "name")] = spec
+                if select.find(VIM + "path") is not None:
+                    specs[_text(select, "name")] = select
+            found = [] if _text(object_spec, "skip") == "true" else [obj]
+            self._traverse(obj, select_set, specs, found)
+            for found_obj in found:
+                # The properties of every matching PropertySpec are used
+                paths = []
+                matched = False
+                for prop_spec in prop_specs:
+                    if not _is_a(found_obj[0], _text(prop_spec, "type")):
+                        continue
+                    matched = True
+                    if _text(prop_spec, "all") == "true":
+                        new_paths = list(self.objects[found_obj].keys())
+                    else:
+                        new_paths = [p.text for p in
+                                     prop_spec.findall(VIM + "pathSet")]
+                    paths.extend(p for p in new_paths if p not in paths)
+                if matched:
+                    selected.append((found_obj, paths))
+        return selected
+
+    def _get(self, obj, path):
+        value = self.objects[obj]
+        for part in path.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+
+    def _object_content(self, obj, paths, tag="objects"):
+        props = []
+        if obj not in self.objects:
+            raise KeyError(obj)
+        for path in paths:
+            value = self._get(obj, path)
+            if value is not None:
+                props.append("<propSet><name>%s</name>%s</propSet>" %
+                             (path, _value_xml("val", value)))
+        return "<%s>%s%s</%s>" % (tag, _mor_xml("obj", obj), "".join(props),
+                                  tag)
+
+    def do_RetrieveProperties(self, request):
+        selected = []
+        for spec_set in request.findall(VIM + "specSet"):
+            selected.extend(self._select(spec_set))
+        return "".join(self._object_content(obj, paths, "returnval")
+                       for obj, paths in selected)
+
+    def _page(self, selected, max_objects):
+        page, rest = selected[:max_objects], selected[max_objects:]
+        token = ""
+        if rest:
+            token_value = "token-%s" % next(self._ids)
+            self.results[token_value] = (rest, max_objects)
+            token = "<token>%s</token>" % token_value
+        return "<returnval>%s%s</returnval>" % (token, "".join(
+            self._object_content(obj, paths) for obj, paths in page))
+
+    def do_RetrievePropertiesEx(self, request):
+        selected = []
+        for spec_set in request.findall(VIM + "specSet"):
+            selected.extend(self._select(spec_set))
+        if not selected:
+            return None
+        max_objects = request.find(VIM + "options").find(VIM + "maxObjects")
+        max_objects = int(max_objects.text) if max_objects is not None else 100
+        return self._page(selected, max_objects)
+
+    def do_ContinueRetrievePropertiesEx(self, request):
+        selected, max_objects = self.results.pop(_text(request, "token"))
+        return self._page(selected, max_objects)
+
+    def do_CancelRetrievePropertiesEx(self, request):
+        self.results.pop(_text(request, "token"))
+        return None
+
+
+    def do_CreatePropertyCollector(self, request):
+        collector = self.add("PropertyCollector",
+                             "session[%s]" % next(self._ids))
+        return _mor_xml("returnval", collector)
+
+    def do_DestroyPropertyCollector(self, request):
+        collector = _mor(request.find(VIM + "_this"))
+        for filter_ in list(self.filters):
+            if self.filters[filter_]["collector"] == collector:
+                del self.filters[filter_]
+        del self.objects[collector]
+
+    def do_CreateFilter(self, request):
+        collector = _mor(request.find(VIM + "_this"))
+        filter_ = self.add("PropertyFilter", "filter-%s" % next(self._ids))
+        self.filters[filter_] = {"collector": collector, "changes": [],
+                                 "spec": request.find(VIM + "spec"),
+                                 "seen": set()}
+        return _mor_xml("returnval", filter_)
+
+    def do_DestroyPropertyFilter(self, request):
+        filter_ = _mor(request.find(VIM + "_this"))
+        del self.filters[filter_]
+        del self.objects[filter_]
+
+    def _change_set(self, obj, paths, changed):
+        """The changeSet for changes to properties of an object."""
+        changes = []
+        for path in paths:
+            for name in changed:
+                if name == path or name.startswith(path + "."):
+                    change = name
+                elif path.startswith(name + "."):
+                    change = path
+                else:
+                    continue
+                value = self._get(obj, change)
+                if value is None:
+                    changes.append("<changeSet><name>%s</name><op>remove</op>"
+                                   "</changeSet>" % change)
+                else:
+                    changes.append("<changeSet><name>%s</name><op>assign</op>"
+                                   "%s</changeSet>" % (
+                                       change, _value_xml("val", value)))
+        return "".join(changes)
+
+    def _filter_update(self, filter_, reset):
+        selected = dict(self._select(filter_["spec"]))
+        changes, filter_["changes"] = filter_["changes"], []
+        if reset:
+            filter_["seen"] = set()
+        updates = []
+        for obj in sorted(filter_["seen"] - set(selected)):
+            updates.append("<objectSet><kind>leave</kind>%s</objectSet>" %
+                           _mor_xml("obj", obj))
+        for obj, paths in sorted(selected.items()):
+            if obj not in filter_["seen"]:
+                updates.append(
+                    "<objectSet><kind>enter</kind>%s%s</objectSet>" % (
+                        _mor_xml("obj", obj),
+                        self._change_set(obj, paths, paths)))
+                continue
+            changed = [name for mor, props in changes if mor == obj
+                       for name in props]
+            change_set = self._change_set(obj, paths, changed)
+            if change_set:
+                updates.append(
+                    "<objectSet><kind>modify</kind>%s%s</objectSet>" % (
+                        _mor_xml("obj", obj), change_set))
+        filter_["seen"] = set(selected)
+        return "".join(updates)
+
+    def do_WaitForUpdatesEx(self, request):
+        collector = _mor(request.find(VIM + "_this"))
+        version = _text(request, "version")
+        if version and int(version) < self.min_version:
+            raise Fault("InvalidCollectorVersion")
+        for hook in self.on_wait:
+            hook()
+
+        filter_sets = []
+        for mor, filter_ in sorted(self.filters.items()):
+            if filter_["collector"] != collector:
+                continue
+            updates = self._filter_update(filter_, not version)
+            if updates:
+                filter_sets.append("<filterSet>%s%s</filterSet>" % (
+                    _mor_xml("filter", mor), updates))
+        if not filter_sets:
+            return None
+        return ("<returnval><version>%s</version>%s"
+                "<truncated>false</truncated></returnval>" % (
+                    self.version, "".join(filter_sets)))
+
+    def _contents(self, container):
+        """The objects directly inside a container, as a ContainerView sees
+        them."""
+        props = ["childEntity", "vmFolder", "hostFolder", "datastoreFolder",
+                 "host", "resourcePool"]
+        if _is_a(container[0], "ResourcePool"):
+            props.append("vm")
+        for prop in props:
+            value = self.objects[container].get(prop, [])
+            for child in [value] if isinstance(value, MOR) else value:
+                yield child
+
+    def do_CreateContainerView(self, request):
+        container = _mor(request.find(VIM + "container"))
+        types = [t.text for t in request.findall(VIM + "type")]
+        recursive = _text(request, "recursive") == "true"
+        view, pending = [], list(self._contents(container))
+        while pending:
+            obj = pending.pop(0)
+            if any(_is_a(obj[0], type_) for type_ in types):
+                view.append(obj)
+            if recursive:
+                pending.extend(self._contents(obj))
+        container_view = self.add("ContainerView",
+                                  "session[%s]" % next(self._ids),
+                                  container=container, type=types,
+                                  recursive=recursive, view=view)
+        return _mor_xml("returnval", container_view)
+
+    def do_DestroyView(self, request):
+        del self.objects[_mor(request.find(VIM + "_this"))]
+
+    def do_PowerOnVM_Task(self, request):
+        vm = _mor(request.find(VIM + "_this"))
+        task = self.add("Task", "task-%s" % next(self._ids), info={
+            "_type": "TaskInfo", "key": "task", "entity": vm,
+            "state": "running", "progress": 0})
+        return _mor_xml("returnval", task)
+
+
+class FakeTransport(Transport):
+    """A suds transport which sends every request to a FakeServer."""
+    def __init__(self, server, **kwargs):
+        Transport.__init__(self)
+        self.server = server
+
+    def send(self, request):
+        return Reply(200, {}, self.server.handle(request.message))
+
+    def close(self):
+        pass
@@ -0,0 +1,72 @@
+from __future__ import absolute_import, division, print_function
+
+import pytest
+
+from psphere import cache as cache_module
+from psphere.cache import PropertyCache
+from psphere.managedobjects import VirtualMachine
+
+
+def test_ttls_and_eviction(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache = PropertyCache(ttl=300, ttls={"runtime": 10, "name": 0},
+                          max_entries=3)
+    vm = ("VirtualMachine", "vm-1")
+    cache.set(vm, "name", "vm1")
+    cache.set(vm, "runtime", "on")
+    cache.set(vm, "config", "config")
+    now[0] += 60
+    assert cache.get(vm, "name") == "vm1"
+    with pytest.raises(KeyError):
+        cache.get(vm, "runtime")
+    assert cache.names(vm) == set(["name", "config"])
+
+    # name was used most recently so config is evicted first
+    cache.set(vm, "guest", "guest")
+    cache.set(vm, "summary", "summary")
+    assert cache.names(vm) == set(["name", "guest", "summary"])
+    assert cache.statistics()["evictions"] == 1
+    assert cache.statistics()["expirations"] == 1
+
+    cache.invalidate(vm, ["guest"])
+    assert cache.names(vm) == set(["name", "summary"])
+    cache.invalidate_type("VirtualMachine")
+    assert len(cache) == 0
+
+
+def test_size_is_unlimited_by_default():
+    cache = PropertyCache()
+    for i in range(200000):
+        cache.set(("VirtualMachine", "vm-%s" % i), "name", "vm%s" % i)
+    assert len(cache) == 200000
+    assert cache.statistics()["evictions"] == 0
+
+
+def test_views_use_the_client_cache(client, inventory, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    client.cache.ttls["runtime"] = 10
+    vm = VirtualMachine.get(client, name="vm0")
+    calls = len(inventory.calls)
+    assert vm.name == "vm0"
+    vm.runtime
+    now[0] += 60
+    vm.runtime
+    assert inventory.calls[calls:] == ["RetrieveProperties"] * 2
+
+    vm.flush_cache(["name"])
+    assert vm.name == "vm0"
+    assert inventory.calls[calls:] == ["RetrieveProperties"] * 3
+
+
+def test_values_evicted_once_loaded_are_returned(client, inventory):
+    # Larger than the cache, so it's evicted as soon as it's stored
+    client.cache = PropertyCache(max_bytes=50)
+    vm = VirtualMachine.get(client, name="vm0")
+    assert vm.config.uuid == "uuid-0"
+
+    # Loading name for every VM evicts most of them again
+    client.cache = PropertyCache(max_entries=3)
+    vms = VirtualMachine.all(client)
+    assert vms[0].name == "vm0"
@@ -1,6 +1,328 @@
 from __future__ import absolute_import, division, print_function
 
+import sys
+from multiprocessing.pool import ThreadPool
+
+import pytest
+from fakeserver import MOR
+
+import psphere.client
+from psphere.errors import ObjectNotFoundError
+from psphere.managedobjects import VirtualMachine
+from psphere.soap import ManagedObjectReference
+
 
 def test_imports():
     from psphere.client import Client
     assert Client
+
+
+def test_iter_entity_views_pages(client, inventory):
+    views = list(client.iter_entity_views("VirtualMachine",
+                                          properties=["name"], page_size=3))
+    assert sorted(view.name for view in views) == ["vm%s" % i
+                                                   for i in range(10)]
+    assert inventory.count("RetrievePropertiesEx") == 1
+    assert inventory.count("ContinueRetrievePropertiesEx") == 3
+    assert inventory.count("RetrieveProperties") == 0
+
+
+def test_iter_entity_views_streams_pages(client, inventory, monkeypatch):
+    streams = []
+    base = psphere.client.ObjectContentStream
+
+    class Stream(base):
+        def __iter__(self):
+            streams.append(self)
+            return base.__iter__(self)
+
+    monkeypatch.setattr(psphere.client, "ObjectContentStream", Stream)
+    client.stream_results = True
+    views = list(client.iter_entity_views("VirtualMachine",
+                                          properties=["name", "runtime"],
+                                          page_size=3))
+    assert sorted(view.name for view in views) == ["vm%s" % i
+                                                   for i in range(10)]
+    assert views[0].runtime.host.name == "esx1"
+    assert inventory.count("ContinueRetrievePropertiesEx") == 3
+    assert inventory.count("RetrieveProperties") == 1
+    assert views[3]._siblings == views[3:6]
+    assert len(streams) == 4
+
+    for view in client.iter_entity_views("VirtualMachine", page_size=3):
+        break
+    assert inventory.count("CancelRetrievePropertiesEx") == 1
+    assert not inventory.results
+
+
+def test_iter_entity_views_cancels_on_early_exit(client, inventory):
+    for view in client.iter_entity_views("VirtualMachine", page_size=3):
+        break
+    assert inventory.count("CancelRetrievePropertiesEx") == 1
+    assert not inventory.results
+
+
+def test_all_is_a_single_round_trip(client, inventory):
+    calls = len(inventory.calls)
+    vms = VirtualMachine.all(client, properties=["runtime"])
+    assert len(vms) == 10
+    assert [vm.runtime.powerState for vm in vms] == ["poweredOn"] * 10
+    assert inventory.calls[calls:] == ["RetrievePropertiesEx"]
+
+
+def test_get_uses_search_index(client, inventory):
+    calls = len(inventory.calls)
+    vm = VirtualMachine.get(client, **{"config.uuid": "uuid-7"})
+    assert vm.name == "vm7"
+    assert inventory.calls[calls:] == ["FindByUuid", "RetrieveProperties"]
+
+    vm = VirtualMachine.get(client, **{"guest.ipAddress": "10.0.0.3"})
+    assert vm.name == "vm3"
+
+
+def test_get_uses_name_index(client, inventory):
+    client.name_index = True
+    for i in range(10):
+        vm = VirtualMachine.get(client, name="vm%s" % i)
+        assert vm._mo_ref.value == "vm-%s" % i
+    assert inventory.count("WaitForUpdatesEx") == 1
+    assert inventory.count("RetrievePropertiesEx") == 0
+
+    # A renamed VM is found again after the index is updated
+    inventory.set(MOR("VirtualMachine", "vm-9"), name="renamed")
+    assert VirtualMachine.get(client, name="renamed")._mo_ref.value == "vm-9"
+    assert inventory.count("WaitForUpdatesEx") == 2
+
+    # Misses only ask for the changes, they don't traverse the inventory
+    calls = len(inventory.calls)
+    for i in range(3):
+        with pytest.raises(ObjectNotFoundError):
+            VirtualMachine.get(client, name="vm9")
+    assert inventory.calls[calls:] == ["WaitForUpdatesEx"] * 3
+    assert inventory.count("CreateFilter") == 1
+
+    # The index's collector ends with an expired session
+    inventory.do_Logout(None)
+    client.login()
+    inventory.set(MOR("VirtualMachine", "vm-3"), name="moved")
+    assert VirtualMachine.get(client, name="moved")._mo_ref.value == "vm-3"
+
+    client.logout()
+    assert inventory.count("DestroyPropertyCollector") == 1
+
+
+def test_find_by_inventory_path(client, inventory):
+    vm = client.find_by_inventory_path("dc/vm/vm4", properties=["name"])
+    assert vm.name == "vm4"
+    with pytest.raises(ObjectNotFoundError):
+        client.find_by_inventory_path("dc/vm/missing")
+
+
+def test_get_many_is_a_single_traversal(client, inventory):
+    calls = len(inventory.calls)
+    vms = VirtualMachine.get_many(client, name=["vm2", "vm5", "missing"],
+                                  properties=["runtime"])
+    assert vms["vm2"]._mo_ref.value == "vm-2"
+    assert vms["vm5"].runtime.powerState == "poweredOn"
+    assert vms["missing"] is None
+    assert inventory.calls[calls:] == ["RetrievePropertiesEx"]
+
+
+def test_search_traversals_can_be_narrowed(client, inventory):
+    hosts = ["folder_traversal_spec", "datacenter_host_traversal_spec",
+             "compute_resource_host_traversal_spec"]
+    assert client.find_entity_views("VirtualMachine", traversals=hosts) == []
+    views = client.find_entity_views("HostSystem", traversals=hosts)
+    assert [view._mo_ref.value for view in views] == ["host-1"]
+
+    host = views[0]
+    vms = client.find_entity_views("VirtualMachine", begin_entity=host,
+                                   traversals=["host_vm_traversal_spec"])
+    assert len(vms) == 10
+
+    property_spec = client.create("PropertySpec", type="HostSystem")
+    pfs = client.get_search_filter_spec(host, property_spec,
+                                        traversals=hosts)
+    assert pfs.objectSet[0].selectSet == []
+    pfs = client.get_search_filter_spec(host, property_spec)
+    assert [spec.name for spec in pfs.objectSet[0].selectSet][:2] == [
+        "folder_traversal_spec", "datacenter_vm_traversal_spec"]
+    assert client.get_search_filter_spec(
+        host, property_spec).objectSet[0].selectSet is \
+        pfs.objectSet[0].selectSet
+    with pytest.raises(ValueError):
+        client.find_entity_views("HostSystem", traversals=["missing"])
+
+
+def test_container_view_search(client, inventory):
+    views = client.find_entity_views("VirtualMachine", properties=["name"],
+                                     search_engine="container_view")
+    assert sorted(view.name for view in views) == [
+        "vm%s" % i for i in range(10)]
+    assert inventory.count("CreateContainerView") == 1
+
+    # The view is reused by later searches of the type
+    client.search_engine = "container_view"
+    vm = client.find_entity_view("VirtualMachine", filter={"name": "vm3"})
+    assert vm._mo_ref.value == "vm-3"
+    hosts = client.find_entity_views("HostSystem")
+    assert [host._mo_ref.value for host in hosts] == ["host-1"]
+    assert inventory.count("CreateContainerView") == 2
+    with pytest.raises(ValueError):
+        client.find_entity_views("HostSystem", traversals=["missing"])
+
+    client.logout()
+    assert inventory.count("DestroyView") == 2
+    assert not [obj for obj in inventory.objects
+                if obj[0] == "ContainerView"]
+
+
+def test_references_share_one_view(client, inventory):
+    vms = VirtualMachine.all(client, properties=["runtime"])
+    hosts = set(id(vm.runtime.host) for vm in vms)
+    assert len(hosts) == 1
+
+    calls = len(inventory.calls)
+    assert [vm.runtime.host.name for vm in vms] == ["esx1"] * 10
+    assert inventory.calls[calls:] == ["RetrieveProperties"]
+    assert client.get_view(vms[0]._mo_ref) is vms[0]
+
+
+def test_lazy_loading_is_coalesced(client, inventory):
+    host = client.find_entity_view("HostSystem", filter={"name": "esx1"},
+                                   properties=["vm"])
+    calls = len(inventory.calls)
+    assert [vm.name for vm in host.vm] == ["vm%s" % i for i in range(10)]
+    assert [vm.runtime.powerState for vm in host.vm] == ["poweredOn"] * 10
+    assert inventory.calls[calls:] == ["RetrievePropertiesEx"] * 2
+
+    client.coalesce_loading = False
+    vms = VirtualMachine.all(client)
+    calls = len(inventory.calls)
+    [vm.guest for vm in vms]
+    assert inventory.calls[calls:] == ["RetrieveProperties"] * 10
+
+
+def test_sibling_groups_are_capped(client, inventory):
+    client.get_views_batch_size = 4
+    vms = client.find_entity_views("VirtualMachine")
+    assert [len(vm._siblings) for vm in vms] == [4] * 8 + [2] * 2
+    calls = len(inventory.calls)
+    assert sorted(vm.name for vm in vms) == ["vm%s" % i for i in range(10)]
+    assert len(inventory.calls) - calls == 3
+
+
+def test_nested_preload_is_a_single_call(client, inventory):
+    cluster = client.find_entity_view("ComputeResource",
+                                      filter={"name": "cluster"})
+    calls = len(inventory.calls)
+    cluster.preload({"host": {"props": ["name"],
+                              "vm": ["name", "runtime.powerState"]}})
+    assert inventory.calls[calls:] == ["RetrieveProperties"]
+
+    host = cluster.host[0]
+    assert host.name == "esx1"
+    assert [vm.name for vm in host.vm] == ["vm%s" % i for i in range(10)]
+    assert host.vm[0].runtime.powerState == "poweredOn"
+    assert inventory.calls[calls:] == ["RetrieveProperties"]
+
+
+def test_soap_methods_are_looked_up_once(client, inventory):
+    vm = VirtualMachine.get(client, name="vm0")
+    assert not hasattr(vm, "NotAMethod")
+    vm.PowerOnVM_Task()
+    assert "PowerOnVM_Task" in VirtualMachine.__dict__
+
+
+def host_vms_spec(client, host):
+    return client.create(
+        "PropertyFilterSpec",
+        propSet=[client.create("PropertySpec", type="HostSystem",
+                               pathSet=["vm"])],
+        objectSet=[client.create("ObjectSpec", obj=host)])
+
+
+def test_nested_references_are_unmarshalled(client, inventory):
+    host = client.find_entity_view("HostSystem", filter={"name": "esx1"})
+    vms = client.sc.propertyCollector.RetrieveProperties(
+        specSet=[host_vms_spec(client, host)])
+    assert vms[0].obj is host
+    assert vms[0].propSet[0].val[0][0].runtime.host is host
+
+
+def test_lazy_results(client, inventory):
+    host = client.find_entity_view("HostSystem", filter={"name": "esx1"})
+    result = client.sc.propertyCollector.RetrieveProperties(
+        specSet=[host_vms_spec(client, host)], _lazy=True)
+    assert len(result) == 1
+    assert result[0].obj is host
+    vms = result[0].propSet[0].val[0]
+    assert vms[0].name == "vm0"
+    assert [vm.name for vm in vms[1:3]] == ["vm1", "vm2"]
+    # The suds objects still hold the MORs
+    assert result.unwrap()[0].obj._type == "HostSystem"
+
+
+def test_property_collector_requests_are_written_directly(client, inventory):
+    sent = []
+    handle = inventory.handle
+    inventory.handle = lambda message: sent.append(message) or handle(message)
+    names = [vm.name for vm in VirtualMachine.all(client)]
+    assert b'<selectSet xsi:type="TraversalSpec">' in sent[-1]
+
+    client.fast_envelopes = False
+    assert [vm.name for vm in VirtualMachine.all(client)] == names
+    assert b'<selectSet xsi:type="TraversalSpec">' not in sent[-1]
+
+
+def test_get_views_groups_specs_by_type(client, inventory):
+    sent = []
+    handle = inventory.handle
+    inventory.handle = lambda message: sent.append(message) or handle(message)
+    host = client.find_entity_view("HostSystem", filter={"name": "esx1"})
+    mo_refs = [ManagedObjectReference("VirtualMachine", "vm-%s" % i)
+               for i in range(10)]
+    mo_refs += [mo_refs[0], host._mo_ref]
+    calls = len(inventory.calls)
+    views = client.get_views(mo_refs, ["name"], batch_size=4, concurrency=2)
+    assert [view.name for view in views] == ["vm%s" % i
+                                             for i in range(10)] + ["esx1"]
+    assert inventory.calls[calls:] == ["RetrievePropertiesEx"] * 3
+    assert sorted(message.count(b"<propSet") for message in sent[-3:]) == [
+        1, 1, 2]
+
+
+@pytest.mark.parametrize("fast_envelopes", [True, False])
+def test_concurrent_retrieve_properties(client, inventory, fast_envelopes):
+    client.fast_envelopes = fast_envelopes
+    pc = client.sc.propertyCollector
+    # Switch threads as often as possible to shake out races
+    switch = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def retrieve(i):
+        spec = client.create("PropertyFilterSpec")
+        spec.propSet = [client.create("PropertySpec", type="VirtualMachine",
+                                      all=False, pathSet=["name", "runtime"])]
+        spec.objectSet = [client.create(
+            "ObjectSpec", obj=ManagedObjectReference("VirtualMachine",
+                                                     "vm-%s" % (i % 10)))]
+        results = []
+        for j in range(20):
+            object_contents = pc.RetrieveProperties(specSet=[spec])
+            assert len(object_contents) == 1
+            obj_content = object_contents[0]
+            assert obj_content.obj._mo_ref.value == "vm-%s" % (i % 10)
+            props = dict((p.name, p.val) for p in obj_content.propSet)
+            assert props["name"] == "vm%s" % (i % 10)
+            results.append(props["runtime"].host)
+        return results
+
+    pool = ThreadPool(8)
+    try:
+        hosts = [host for results in pool.map(retrieve, range(32))
+                 for host in results]
+    finally:
+        pool.close()
+        sys.setswitchinterval(switch)
+    assert len(set(id(host) for host in hosts)) == 1
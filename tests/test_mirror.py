@@ -0,0 +1,52 @@
+from __future__ import absolute_import, division, print_function
+
+from fakeserver import MOR
+
+from psphere.mirror import InventoryMirror
+from psphere.soap import ManagedObjectReference
+
+
+def test_mirror_applies_updates(client, inventory):
+    mirror = InventoryMirror(client, {"VirtualMachine": ["name", "runtime"]})
+    mirror.start()
+    vms = mirror.views("VirtualMachine")
+    assert len(vms) == 10
+    vm = mirror.view(ManagedObjectReference("VirtualMachine", "vm-3"))
+    assert vm.runtime.powerState == "poweredOn"
+
+    inventory.set(MOR("VirtualMachine", "vm-3"),
+                  **{"runtime.powerState": "poweredOff"})
+    inventory.set(MOR("VirtualMachine", "vm-4"), name="renamed")
+    calls = len(inventory.calls)
+    assert mirror.update() == 2
+    assert inventory.calls[calls:] == ["WaitForUpdatesEx"]
+
+    # Views read the changes without contacting the server
+    calls = len(inventory.calls)
+    assert vm.runtime.powerState == "poweredOff"
+    assert "renamed" in [v.name for v in mirror.views("VirtualMachine")]
+    assert inventory.calls[calls:] == []
+    assert mirror.update() == 0
+
+    # A VM which is removed from the inventory leaves the mirror
+    inventory.objects[MOR("Folder", "group-v1")]["childEntity"].remove(
+        MOR("VirtualMachine", "vm-0"))
+    inventory.objects[MOR("HostSystem", "host-1")]["vm"].remove(
+        MOR("VirtualMachine", "vm-0"))
+    assert mirror.update() == 1
+    assert len(mirror.views("VirtualMachine")) == 9
+
+    mirror.stop()
+    assert not inventory.filters
+
+
+def test_mirror_resyncs_on_invalid_version(client, inventory):
+    mirror = InventoryMirror(client, {"VirtualMachine": ["name"]})
+    mirror.start()
+    inventory.set(MOR("VirtualMachine", "vm-1"), name="renamed")
+    inventory.min_version = inventory.version
+    mirror.update()
+    assert inventory.count("CreateFilter") == 2
+    vm = ManagedObjectReference("VirtualMachine", "vm-1")
+    assert mirror.get(vm, "name") == "renamed"
+    assert len(mirror) == 10
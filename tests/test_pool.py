@@ -0,0 +1,83 @@
+from __future__ import absolute_import, division, print_function
+
+import threading
+
+import pytest
+import suds
+
+from psphere.pool import ClientPool
+
+
+@pytest.fixture
+def pool(client, inventory):
+    # The client fixture makes new clients talk to the fake server
+    return ClientPool("vcenter", "user", "pass", size=3)
+
+
+def test_map_clones_sessions(pool, inventory):
+    assert inventory.count("Login") == 2
+    used = set()
+    lock = threading.Lock()
+    gate = threading.Barrier(3) if hasattr(threading, "Barrier") else None
+
+    def find(client, name):
+        with lock:
+            used.add(id(client))
+        if gate is not None:
+            # Hold on to the clients until all three are in use
+            gate.wait(5)
+        return client.find_entity_view("VirtualMachine",
+                                       filter={"name": name})._mo_ref.value
+
+    names = ["vm%s" % i for i in range(9)]
+    assert pool.map(find, names) == ["vm-%s" % i for i in range(9)]
+    assert len(used) == 3
+    assert inventory.count("Login") == 2
+    assert inventory.count("AcquireCloneTicket") == 2
+    assert inventory.count("CloneSession") == 2
+
+    # The sessions are reused
+    assert pool.map(lambda client, i: i, range(6), concurrency=2) == list(
+        range(6))
+    assert inventory.count("CloneSession") == 2
+
+    logouts = inventory.count("Logout")
+    pool.close()
+    assert inventory.count("Logout") - logouts == 3
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+def test_acquire_waits_for_a_release(pool, inventory):
+    clients = [pool.acquire() for i in range(3)]
+    assert len(set(clients)) == 3
+    with pytest.raises(RuntimeError):
+        pool.acquire(timeout=0.01)
+    pool.release(clients[1])
+    assert pool.acquire(timeout=0.01) is clients[1]
+
+    pool.release(clients[2], discard=True)
+    assert pool.acquire(timeout=0.01) is not clients[2]
+    assert inventory.count("CloneSession") == 3
+
+
+def test_releasing_the_base_session(pool, inventory):
+    logins = inventory.count("Login")
+    client = pool.acquire()
+    assert client is pool.client
+    # Its session is still valid, so it isn't logged in again
+    pool.release(client, discard=True)
+    assert inventory.count("Login") == logins
+
+    # An expired session is, and a failed login keeps it in the pool
+    client = pool.acquire()
+    inventory.do_Logout(None)
+    inventory.fail_logins = True
+    with pytest.raises(suds.WebFault):
+        pool.release(client, discard=True)
+    assert pool.acquire(timeout=0.01) is client
+
+    inventory.fail_logins = False
+    pool.release(client, discard=True)
+    assert inventory.count("Login") == logins + 2
+    assert pool.acquire(timeout=0.01) is client
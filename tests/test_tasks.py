@@ -0,0 +1,115 @@
+from __future__ import absolute_import, division, print_function
+
+import time
+from multiprocessing.pool import ThreadPool
+
+import pytest
+from fakeserver import MOR
+
+from psphere.errors import TaskFailedError, TaskTimeoutError
+from psphere.managedobjects import VirtualMachine
+
+
+def power_on(client, names):
+    vms = VirtualMachine.get_many(client, name=names)
+    return [vms[name].PowerOnVM_Task() for name in names]
+
+
+def mor(task):
+    return MOR(task._mo_ref._type, task._mo_ref.value)
+
+
+def finish(inventory, tasks, state="success"):
+    for task in tasks:
+        info = {"info.state": state}
+        if state == "error":
+            info["info.error"] = {"_type": "LocalizedMethodFault",
+                                  "localizedMessage": "Failed"}
+        inventory.set(mor(task), **info)
+
+
+def test_wait_for_tasks(client, inventory):
+    tasks = power_on(client, ["vm%s" % i for i in range(5)])
+    progress = []
+    steps = [lambda: None,
+             lambda: inventory.set(mor(tasks[0]),
+                                   **{"info.progress": 50}),
+             lambda: finish(inventory, tasks)]
+    inventory.on_wait.append(lambda: steps.pop(0)() if steps else None)
+
+    calls = len(inventory.calls)
+    done = client.wait_for_tasks(
+        tasks, progress_callback=lambda task, p: progress.append(p),
+        timeout=5)
+    assert [task.info.state for task in done] == ["success"] * 5
+    assert progress == [0] * 5 + [50]
+    # One filter for all of the tasks and one wait per change
+    assert inventory.calls[calls:] == (["CreatePropertyCollector",
+                                        "CreateFilter"] +
+                                       ["WaitForUpdatesEx"] * 3 +
+                                       ["DestroyPropertyFilter"])
+    assert not inventory.filters
+
+
+def test_task_failure_and_timeout(client, inventory):
+    waiter = client.task_waiter
+    failed, running = waiter.add(power_on(client, ["vm1", "vm2"]))
+    finish(inventory, [failed.task], state="error")
+    with pytest.raises(TaskFailedError):
+        failed.result(timeout=5)
+    with pytest.raises(TaskTimeoutError):
+        running.result(timeout=0.1)
+    assert not running.done()
+
+
+def test_wait_after_logging_in_again(client, inventory):
+    tasks = power_on(client, ["vm1"])
+    finish(inventory, tasks)
+    client.wait_for_tasks(tasks, timeout=5)
+
+    # The waiter's property collector ends with the session
+    client.logout()
+    assert inventory.count("DestroyPropertyCollector") == 1
+    client.login()
+    tasks = power_on(client, ["vm2"])
+    finish(inventory, tasks)
+    done = client.wait_for_tasks(tasks, timeout=5)
+    assert done[0].info.state == "success"
+    assert inventory.count("CreatePropertyCollector") == 2
+
+
+def test_tasks_outliving_the_cache(client, inventory, monkeypatch):
+    clock = time.time
+    offset = [0]
+    monkeypatch.setattr(time, "time", lambda: clock() + offset[0])
+    tasks = power_on(client, ["vm1"])
+    steps = [lambda: None,
+             lambda: offset.__setitem__(0, 400),
+             lambda: finish(inventory, tasks)]
+    inventory.on_wait.append(lambda: steps.pop(0)() if steps else None)
+
+    # The TaskInfo has expired from the cache when the task completes. The
+    # timeout is 5s after the clock has jumped.
+    done = client.wait_for_tasks(tasks, timeout=405)
+    assert done[0].info.state == "success"
+
+
+def test_threads_share_the_waiter(client, inventory):
+    tasks = power_on(client, ["vm%s" % i for i in range(4)])
+
+    def finish_when_all_watched():
+        if len(inventory.filters) == 4:
+            finish(inventory, tasks)
+    inventory.on_wait.append(finish_when_all_watched)
+
+    pool = ThreadPool(4)
+    try:
+        done = pool.map(lambda task: client.wait_for_tasks([task],
+                                                           timeout=5)[0],
+                        tasks)
+    finally:
+        pool.close()
+        pool.join()
+    assert done == tasks
+    assert inventory.count("CreatePropertyCollector") == 1
+    assert not inventory.filters
@@ -0,0 +1,135 @@
+from __future__ import absolute_import, division, print_function
+
+import socket
+import threading
+import time
+import zlib
+
+import pytest
+from six.moves import BaseHTTPServer, socketserver
+from suds.transport import Request, TransportError
+
+from psphere.transport import KeepAliveTransport
+
+
+class EchoHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # The bodies of the requests handled
+    received = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.received.append(body)
+        if body == b"slow":
+            time.sleep(1)
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        self.send_response(500 if body == b"fail" else 200)
+        if "deflate" in self.headers.get("Accept-Encoding", ""):
+            body = zlib.compress(body)
+            self.send_header("Content-Encoding", "deflate")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", "vmware_soap_session=abc; Path=/")
+        self.end_headers()
+        self.wfile.write(body)
+        if body == b"close":
+            # Close the connection without telling the client, like a
+            # server timing out an idle connection
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def server():
+    httpd = Server(("127.0.0.1", 0), EchoHandler)
+    thread = threading.Thread(target=httpd.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield "http://127.0.0.1:%s/sdk" % httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_connections_are_reused(server):
+    transport = KeepAliveTransport()
+    for i in range(5):
+        reply = transport.send(Request(server, b"message %d" % i))
+        assert reply.message == b"message %d" % i
+
+    stats = list(transport.pool_statistics().values())[0]
+    assert stats["created"] == 1
+    assert stats["reused"] == 4
+    assert stats["idle"] == 1
+    assert "vmware_soap_session" in [c.name for c in transport.cookiejar]
+    transport.close()
+
+
+def test_timed_out_requests_are_not_sent_again(server):
+    del EchoHandler.received[:]
+    transport = KeepAliveTransport()
+    transport.options.timeout = 0.2
+    transport.send(Request(server, b"fast"))
+    # The slow request goes over the kept-alive connection
+    with pytest.raises(socket.timeout):
+        transport.send(Request(server, b"slow"))
+    time.sleep(0.5)
+    assert EchoHandler.received == [b"fast", b"slow"]
+    transport.close()
+
+
+def test_closed_connections_are_reopened(server):
+    del EchoHandler.received[:]
+    transport = KeepAliveTransport()
+    transport.send(Request(server, b"close"))
+    time.sleep(0.1)
+    assert transport.send(Request(server, b"again")).message == b"again"
+    assert EchoHandler.received == [b"close", b"again"]
+    transport.close()
+
+
+def test_error_status_raises_transport_error(server):
+    transport = KeepAliveTransport()
+    with pytest.raises(TransportError) as e:
+        transport.send(Request(server, b"fail"))
+    assert e.value.httpcode == 500
+    assert e.value.fp.read() == b"fail"
+
+
+def test_compression(server):
+    transport = KeepAliveTransport(accept_encoding=True,
+                                   compress_requests=True)
+    message = b"<propSet>" * 1000
+    reply = transport.send(Request(server, message))
+    assert reply.message == message
+
+    stats = list(transport.pool_statistics().values())[0]
+    assert stats["bytes_sent_uncompressed"] == len(message)
+    assert stats["bytes_sent"] < len(message)
+    assert stats["bytes_received_uncompressed"] == len(message)
+    assert stats["bytes_received"] < len(message)
+    transport.close()
+
+
+def test_streaming_replies(server):
+    transport = KeepAliveTransport(accept_encoding=True)
+    transport.read_size = 100
+    message = b"<propSet>" * 1000
+    reply = transport.send_streaming(Request(server, message))
+    chunks = iter(lambda: reply.message.read(100), b"")
+    assert b"".join(chunks) == message
+    stats = list(transport.pool_statistics().values())[0]
+    assert stats["idle"] == 1
+
+    # A connection whose reply isn't read to the end can't be reused
+    reply = transport.send_streaming(Request(server, message))
+    reply.message.read(100)
+    reply.message.close()
+    stats = list(transport.pool_statistics().values())[0]
+    assert stats["idle"] == 0
+    assert stats["in_use"] == 0
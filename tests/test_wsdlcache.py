@@ -0,0 +1,72 @@
+from __future__ import absolute_import, division, print_function
+
+import os
+import shutil
+
+import suds.client
+from suds.sax.element import Element
+
+from psphere.wsdlcache import WSDL_DIR, WsdlCache, get_shared_wsdl
+
+
+def test_cached_model_is_reused(tmpdir):
+    url = "file://%s/vimService.wsdl" % WSDL_DIR
+    cache = WsdlCache(str(tmpdir))
+    suds.client.Client(url, cache=cache, cachingpolicy=1)
+    assert tmpdir.join(cache.key).listdir()
+
+    client = suds.client.Client(url, cache=WsdlCache(str(tmpdir)),
+                                cachingpolicy=1)
+    assert client.factory.create("ns0:PropertySpec") is not None
+
+
+def test_failed_writes_leave_no_files(tmpdir, monkeypatch):
+    cache = WsdlCache(str(tmpdir))
+
+    def rename(src, dst):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(os, "rename", rename)
+    assert cache.put("wsdl", {"model": 1}) == {"model": 1}
+    assert tmpdir.join(cache.key).listdir() == []
+
+
+def test_key_changes_with_wsdl(tmpdir):
+    wsdl_dir = tmpdir.join("wsdl")
+    shutil.copytree(WSDL_DIR, str(wsdl_dir))
+    before = WsdlCache(str(tmpdir), str(wsdl_dir))
+    wsdl_dir.join("vim.wsdl").write("<changed/>", mode="a")
+    after = WsdlCache(str(tmpdir), str(wsdl_dir))
+    assert before.location != after.location
+
+    tmpdir.join(before.key).ensure(dir=True)
+    after.prune()
+    assert not tmpdir.join(before.key).check()
+
+
+def test_shared_wsdl_is_loaded_once():
+    url = "file://%s/vimService.wsdl" % WSDL_DIR
+    shared = get_shared_wsdl(url)
+    assert get_shared_wsdl(url) is shared
+
+    first = suds.client.Client.__new__(suds.client.Client)
+    shared.bind(first, location="https://first/sdk")
+    second = suds.client.Client.__new__(suds.client.Client)
+    shared.bind(second, location="https://second/sdk")
+    assert first.factory is second.factory
+    assert first.options is not second.options
+    assert second.options.location == "https://second/sdk"
+
+
+def test_client_options_are_used_by_the_shared_bindings(client, inventory):
+    sent = []
+    handle = inventory.handle
+    inventory.handle = lambda message: sent.append(message) or handle(message)
+    header = Element("ticket", ns=("t", "urn:test")).setText("abc")
+    client.set_options(soapheaders=header)
+    client.si.CurrentTime()
+    assert b"<t:ticket" in sent[-1]
+    client.find_entity_views("HostSystem")
+    assert b"<t:ticket" in sent[-1]
+    # The options the WSDL was loaded with are untouched
+    assert client.wsdl.options._default.soapheaders == ()